@@ -1,30 +1,98 @@
 import asyncio
-import random
-import json
+import logging
+import time
+from urllib.parse import urlsplit
 
 import aiohttp
 from aiohttp import ClientTimeout, ClientConnectionError
+from aiohttp_socks import ProxyError, ProxyConnectionError, ProxyTimeoutError
 
 from config import Config
-from errors import AuthorizationError, RootIDError, UpdateCardsError
-from utils.helpers_rate import HostRateLimiter
+from errors import AuthorizationError, RootIDError, UpdateCardsError, CircuitOpenError
+from utils.batch_sizer import get_batch_sizer
+from utils.circuit_breaker import get_breaker
+from utils.hedging import LatencyWindow, HedgeBudget, hedged
+from utils.helpers_rate import get_host_limiter, get_key_limiter
+from utils.log_utils import sampler
+from utils.offload import encode_json_array, decode_json
+from utils.proxy_pool import EgressProxy, get_proxy_pool, OK, ANTIBOT as EGRESS_ANTIBOT, \
+    RATE_LIMITED as EGRESS_RATE_LIMITED, ERROR as EGRESS_ERROR
+from utils.quota_manager import get_quota_manager
+from utils.metrics import WB_REQUEST_SECONDS, WB_ANTIBOT, WB_RATE_LIMITED
+from utils.retry_policy import Retrier, CATALOG_POLICY, CONTENT_POLICY, ANTIBOT, RATE_LIMITED, TIMEOUT, \
+    reason_for_status, retry_after_from, SERVER_ERROR
+
+logger = logging.getLogger(__name__)
+
+# сетевые сбои каталога: и прямые, и на стороне прокси (aiohttp_socks)
+_NETWORK_ERRORS = (asyncio.TimeoutError, ClientConnectionError, ProxyError, ProxyConnectionError, ProxyTimeoutError)
+
+HEDGE_PERCENTILE = 90      # дублируем страницу, если основной хост медленнее p90
+HEDGE_DEFAULT_DELAY = 3.0  # порог, пока окно латентностей не набралось
+
+# общие на процесс: латентность основного хоста каталога и бюджет дублей (~10%)
+_catalog_latency = LatencyWindow()
+_hedge_budget = HedgeBudget(ratio=0.1)
+
+
+def endpoint_name(url: str) -> str:
+    """Короткое имя эндпоинта для метрик (без query и id)."""
+    if "/content/v2/get/cards/list" in url:
+        return "cards_list"
+    if "/content/v2/cards/update" in url:
+        return "cards_update"
+    if "/content/v2/cards/error/list" in url:
+        return "cards_errors"
+    internal = "_internal" if "/__internal/" in url else ""
+    if "/sellers/v4/catalog" in url:
+        return f"catalog{internal}"
+    if "/sellers/v8/filters" in url:
+        return f"filters{internal}"
+    return "other"
+
+
+def _observe(endpoint: str, status, started: float) -> None:
+    WB_REQUEST_SECONDS.labels(endpoint, status).observe(time.perf_counter() - started)
+
+
+def _is_html_block(text: str, content_type: str | None) -> bool:
+    if content_type and "application/json" in (content_type or "").lower():
+        return False
+    t = text.strip().lower()
+    return t.startswith("<!doctype html") or t.startswith("<html")
+
+
+async def _probe_url(url: str, headers: dict, egress: EgressProxy | None = None) -> bool:
+    """
+    Пробный запрос предохранителя: своя короткая сессия (клиент, открывший
+    предохранитель, к этому времени уже закрыт) через тот же выход, что был
+    заблокирован. True — ответ без антибота.
+    """
+    connector = egress.connector() if egress is not None else None
+    try:
+        async with aiohttp.ClientSession(timeout=ClientTimeout(total=20), headers=headers, connector=connector) as session:
+            async with session.get(url) as resp:
+                if resp.status != 200:
+                    return False
+                return not _is_html_block(await resp.text(), resp.headers.get("Content-Type"))
+    except _NETWORK_ERRORS:
+        return False
 
 
 class WBClientAPI:
     def __init__(self):
         self.api_base_url = Config.API_URL
         self.catalog_base_url = Config.CATALOG_URL
+        self.catalog_fallback_url = Config.CATALOG_FALLBACK_URL
 
+        # общий таймаут сессии; на каждый запрос его сужает Retrier.timeout() под срок запуска
         self.timeout = ClientTimeout(total=40, connect=10, sock_read=30)
-        self.max_retries = 15
-        self.retry_delay = 2  # базовый backoff
 
         # ОДНА сессия на весь класс + один коннектор (и нормальное закрытие)
         self._connector: aiohttp.TCPConnector | None = None
         self._session: aiohttp.ClientSession | None = None
-
-        # лимитер на весь класс
-        self._limiter = HostRateLimiter(max_concurrent=2, base_min_interval=0.5, max_min_interval=2.5)
+        # сессии выходов пула прокси (utils/proxy_pool.py): своя на каждый прокси, живут как основная
+        self._egress_sessions: dict[str, aiohttp.ClientSession] = {}
 
         self._default_headers = {
             "User-Agent": ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
@@ -48,6 +116,10 @@ class WBClientAPI:
         Гарантированно закрывает session/connector, чтобы не было:
         Unclosed client session / Unclosed connector
         """
+        for egress_session in self._egress_sessions.values():
+            await egress_session.close()
+        self._egress_sessions.clear()
+
         if self._session is not None:
             await self._session.close()
             self._session = None
@@ -70,6 +142,19 @@ class WBClientAPI:
                 headers=self._default_headers,
             )
 
+    def _egress_session(self, egress: EgressProxy | None) -> aiohttp.ClientSession:
+        """Сессия через выход пула; direct и «без пула» — основная сессия клиента."""
+        if egress is None or egress.is_direct:
+            return self.session
+        egress_session = self._egress_sessions.get(egress.label)
+        if egress_session is None or egress_session.closed:
+            egress_session = self._egress_sessions[egress.label] = aiohttp.ClientSession(
+                timeout=self.timeout,
+                connector=egress.connector(),
+                headers=self._default_headers,
+            )
+        return egress_session
+
     @property
     def session(self) -> aiohttp.ClientSession:
         """
@@ -90,161 +175,282 @@ class WBClientAPI:
         if referer:
             headers["Referer"] = referer
 
-        for attempt in range(1, self.max_retries + 1):
+        host = urlsplit(url).netloc
+        endpoint = endpoint_name(url)
+        pool = get_proxy_pool()
+        retry = Retrier(CATALOG_POLICY, endpoint)
+        probe_headers = {**self._default_headers, **headers}
+
+        while True:
+            retry.check_deadline()
+
+            # без пула — напрямую, лимитер и предохранитель на хост; с пулом — на выход (IP)
+            egress = pool.pick(host, endpoint) if pool is not None else None
+            if egress is None:
+                limiter = get_host_limiter(url)
+                breaker = get_breaker(host, endpoint)
+                # открытый предохранитель — отказываем сразу, без сна
+                if not breaker.allow():
+                    raise CircuitOpenError(
+                        f"{endpoint} на {host} заблокирован антиботом, проба через {breaker.retry_in():.0f}s"
+                    )
+            else:
+                limiter = egress.limiter(host)
+                breaker = egress.breaker(host, endpoint)
+
+            def probe(egress=egress):
+                return _probe_url(url, probe_headers, egress)
+
+            async def again(reason: str, outcome: str | None, retry_after: float | None = None) -> bool:
+                """Учесть исход выхода и решить, повторять ли: через другой прокси сразу или после паузы."""
+                if egress is not None:
+                    if outcome is not None:
+                        egress.record(outcome)
+                    # 5xx — беда сервера, а не IP: смена выхода не поможет
+                    if reason != SERVER_ERROR and pool.has_alternative(host, endpoint, egress):
+                        return retry.switch(reason)
+                return await retry.backoff(reason, retry_after=retry_after)
+
+            async def on_antibot() -> bool:
+                WB_ANTIBOT.labels(endpoint).inc()
+                limiter.punish()
+                opened = breaker.record_antibot(probe)
+                if opened and egress is None:
+                    raise CircuitOpenError(
+                        f"{endpoint} на {host} заблокирован антиботом, проба через {breaker.retry_in():.0f}s"
+                    )
+                # с пулом открытый предохранитель выключает только этот выход — pick() возьмёт другой
+                return await again(ANTIBOT, EGRESS_ANTIBOT)
+
+            via = {"proxy": egress.label} if egress is not None else {}
+            started = time.perf_counter()
             try:
-                # Если HostRateLimiter поддерживает async context manager — норм.
-                # Если у тебя другая реализация, убери блок async with и просто делай get.
-                try:
-                    async with self._limiter.limit(url):
-                        resp = await self.session.get(url, headers=headers)
-                except AttributeError:
-                    resp = await self.session.get(url, headers=headers)
+                async with limiter.limit(url):
+                    started = time.perf_counter()
+                    resp = await self._egress_session(egress).get(url, headers=headers, timeout=retry.timeout())
 
                 async with resp:
                     ct = resp.headers.get("Content-Type", "")
 
                     # 498 или HTML-заглушка → долгий сон
                     if resp.status == 498:
+                        _observe(endpoint, 498, started)
                         text = (await resp.text())[:200]
-                        print(f"🛑 498 anti-bot for {url}: {text[:80]}...")
-                        delay = min(15 * attempt, 90) + random.random()
-                        await asyncio.sleep(delay)
-                        continue
+                        logger.warning("🛑 498 anti-bot for %s: %s...", url, text[:80],
+                                       extra={"attempt": retry.attempt, **via})
+                        if await on_antibot():
+                            continue
+                        return None
 
                     if resp.status == 200:
                         # иногда отдают HTML антибот
-                        peek = await resp.text()
-                        if self._is_html_block(peek, ct):
-                            print(f"🧱 Anti-bot HTML for {url} (CT={ct or 'n/a'})")
-                            delay = min(15 * attempt, 90) + random.random()
-                            await asyncio.sleep(delay)
+                        raw = await resp.read()
+                        if _is_html_block(raw[:512].decode("utf-8", "ignore"), ct):
+                            _observe(endpoint, "html", started)
+                            logger.warning("🧱 Anti-bot HTML for %s (CT=%s)", url, ct or "n/a",
+                                           extra={"attempt": retry.attempt, **via})
+                            if await on_antibot():
+                                continue
+                            return None
+
+                        _observe(endpoint, 200, started)
+                        limiter.relax()
+                        breaker.record_success()
+                        if egress is not None:
+                            egress.record(OK)
+                        # это JSON или текст JSON; большие страницы разбираем вне loop
+                        return await decode_json(raw)
+
+                    _observe(endpoint, resp.status, started)
+                    reason = reason_for_status(resp.status)
+
+                    if reason == RATE_LIMITED:
+                        WB_RATE_LIMITED.labels(endpoint).inc()
+                        limiter.punish()
+
+                    if reason is not None:
+                        logger.warning("⚠️ %s for %s", resp.status, url, extra={"attempt": retry.attempt, **via})
+                        outcome = EGRESS_RATE_LIMITED if reason == RATE_LIMITED else None
+                        if await again(reason, outcome, retry_after_from(resp.headers)):
                             continue
-
-                        # это JSON или текст JSON
-                        try:
-                            return await resp.json()
-                        except Exception:
-                            return json.loads(peek)
-
-                    if resp.status == 429:
-                        ra = resp.headers.get("Retry-After")
-                        if ra and ra.isdigit():
-                            delay = float(ra)
-                        else:
-                            delay = min(5 * attempt, 90) + random.random()
-                        print(f"⏳ 429 for {url} → sleep {delay:.1f}s")
-                        await asyncio.sleep(delay)
-                        continue
-
-                    if resp.status in (408, 425, 500, 502, 503, 504):
-                        delay = min(5 * attempt, 60) + random.random()
-                        print(f"⚠️ {resp.status} for {url} → retry in {delay:.1f}s")
-                        await asyncio.sleep(delay)
-                        continue
+                        logger.error("❌ exhausted for %s: %s", url, resp.status)
+                        return None
 
                     text = (await resp.text())[:300]
-                    print(f"❌ {resp.status} for {url}: {text}")
+                    logger.error("❌ %s for %s: %s", resp.status, url, text)
                     return None
 
-            except (asyncio.TimeoutError, ClientConnectionError) as e:
-                if attempt == self.max_retries:
-                    print(f"❌ exhausted for {url}: {e}")
-                    return None
-                delay = min(5 * attempt, 60) + random.random()
-                print(f"⏱️ {e} → retry in {delay:.1f}s")
-                await asyncio.sleep(delay)
-
-        return None
-
-    async def get_all_data_by_company_id(self, company_id: int) -> list[dict]:
+            except _NETWORK_ERRORS as e:
+                _observe(endpoint, "timeout" if isinstance(e, asyncio.TimeoutError) else "conn_error", started)
+                logger.warning("⏱️ %s: %s", url, e or type(e).__name__, extra={"attempt": retry.attempt, **via})
+                if await again(TIMEOUT, EGRESS_ERROR):
+                    continue
+                retry.check_deadline()
+                logger.error("❌ exhausted for %s: %s", url, e)
+                return None
+            finally:
+                if egress is not None:
+                    pool.release(egress)
+
+    def _catalog_url(self, base_url: str, company_id: int, page: int, *, hide_dtype: str, fbrand: str | None) -> str:
+        url = (
+            f"{base_url}/sellers/v4/catalog"
+            f"?ab_testing=false&appType=1&curr=rub&dest=-1257786"
+            f"&hide_dtype={hide_dtype}&lang=ru&page={page}&sort=popular&spp=30"
+            f"&supplier={company_id}"
+        )
+        if fbrand:
+            url += f"&fbrand={fbrand}"
+        return url
+
+    async def _primary_catalog_get(self, url: str) -> dict | None:
+        started = time.perf_counter()
+        data = await self._get_with_retries(url)
+        if data is not None:
+            _catalog_latency.observe(time.perf_counter() - started)
+        return data
+
+    async def _catalog_page(self, company_id: int, page: int, fbrand: str | None) -> dict | None:
         """
-        Пагинация по каталогу WB с ретраями и паузами при 429/5xx.
+        Страница каталога с хеджированием: если основной хост не ответил за
+        перцентиль своей латентности — та же страница уходит на фолбэк
+        (__internal/u-catalog), берём первый ответ.
         """
-        await self._ensure_session()
+        primary_url = self._catalog_url(self.catalog_base_url, company_id, page, hide_dtype="13;14", fbrand=fbrand)
+        fallback_url = self._catalog_url(self.catalog_fallback_url, company_id, page, hide_dtype="11", fbrand=fbrand)
+        delay = _catalog_latency.percentile(HEDGE_PERCENTILE) or HEDGE_DEFAULT_DELAY
+
+        return await hedged(
+            lambda: self._primary_catalog_get(primary_url),
+            lambda: self._get_with_retries(fallback_url),
+            delay=delay,
+            budget=_hedge_budget,
+            endpoint="catalog",
+            ok=lambda data: data is not None,
+            timeout=CATALOG_POLICY.request_timeout,
+        )
 
+    async def _scan_catalog(
+        self, company_id: int, fbrand: str | None, fetch_page, *, max_pages: int | None = None
+    ) -> list[dict]:
+        """
+        Страницы каталога по порядку до первой пустой (или до max_pages). С пулом
+        прокси берём сразу окно из стольких страниц, сколько здоровых выходов, —
+        каждая уходит через свой IP; без пула окно = 1, как раньше.
+        """
         all_products: list[dict] = []
+        seen: set = set()
         page = 1
+        pool = get_proxy_pool()
 
         while True:
-            url = (
-                f"{self.catalog_base_url}/sellers/v4/catalog"
-                f"?ab_testing=false&appType=1&curr=rub&dest=-1257786"
-                f"&hide_dtype=13;14&lang=ru&page={page}&sort=popular&spp=30"
-                f"&supplier={company_id}"
+            width = pool.width() if pool is not None else 1
+            if max_pages is not None:
+                width = min(width, max_pages - page + 1)
+            results = await asyncio.gather(
+                *(fetch_page(company_id, p, fbrand) for p in range(page, page + width)),
+                return_exceptions=True,
             )
 
-            data = await self._get_with_retries(url)
-            if not data:
-                break
+            done = False
+            for data in results:
+                if isinstance(data, BaseException):
+                    raise data
+                products = (data or {}).get("products", [])
+                if not products:
+                    # конец каталога (или страница не получена) — хвост окна не нужен
+                    done = True
+                    break
 
-            products = data.get("products", [])
-            if not products:
+                # страницы могут прийти с разных хостов — дубли на стыке отбрасываем
+                for product in products:
+                    product_id = product.get("id")
+                    if product_id is None or product_id not in seen:
+                        seen.add(product_id)
+                        all_products.append(product)
+            page += width
+            if done or (max_pages is not None and page > max_pages):
                 break
-
-            all_products.extend(products)
-            page += 1
             await asyncio.sleep(0.2)
 
-        if not all_products:
-            print(f"🔁 Фолбэк на https://www.wildberries.ru/__internal/u-catalog для company_id={company_id}")
-            page = 1
-            while True:
-                url = (
-                    f"https://www.wildberries.ru/__internal/u-catalog/sellers/v4/catalog"
-                    f"?ab_testing=false&appType=1&curr=rub&dest=-1257786"
-                    f"&hide_dtype=11&lang=ru&page={page}&sort=popular&spp=30"
-                    f"&supplier={company_id}"
-                )
-
-                data = await self._get_with_retries(url)
-                if not data:
-                    break
+        return all_products
 
-                products = data.get("products", [])
-                if not products:
-                    break
+    async def _fallback_catalog_page(self, company_id: int, page: int, fbrand: str | None) -> dict | None:
+        url = self._catalog_url(self.catalog_fallback_url, company_id, page, hide_dtype="11", fbrand=fbrand)
+        return await self._get_with_retries(url)
+
+    async def get_all_data_by_company_id(self, company_id: int) -> list[dict]:
+        """
+        Пагинация по каталогу WB с ретраями и паузами при 429/5xx.
+        """
+        await self._ensure_session()
 
-                all_products.extend(products)
-                page += 1
-                await asyncio.sleep(0.2)
+        all_products = await self._scan_catalog(company_id, None, self._catalog_page)
+
+        if not all_products:
+            logger.info("🔁 Фолбэк на %s", self.catalog_fallback_url, extra={"company_id": company_id})
+            all_products = await self._scan_catalog(company_id, None, self._fallback_catalog_page)
 
         return all_products
 
-    async def get_cards_list(self, api_key: str, root_id: int) -> list[dict]:
+    async def get_cards_list(self, api_key: str, root_id: int | None = None, *, text_search: str | None = None) -> list[dict]:
         """
-        Получает список карточек по API-ключу и root_id.
+        Получает список карточек по API-ключу и root_id (или по textSearch — артикул, nmID).
         """
         await self._ensure_session()
 
         url = f"{self.api_base_url}/content/v2/get/cards/list"
         headers = {"Authorization": api_key, "Content-Type": "application/json"}
 
+        card_filter = {"withPhoto": -1, "imtID": root_id} if text_search is None else {"withPhoto": -1, "textSearch": text_search}
         payload = {
             "settings": {
                 "cursor": {"limit": 100},
-                "filter": {"withPhoto": -1, "imtID": root_id},
+                "filter": card_filter,
             }
         }
 
-        for attempt in range(1, self.max_retries + 1):
+        limiter = get_key_limiter(api_key)
+        quota = get_quota_manager()
+        retry = Retrier(CONTENT_POLICY, "cards_list")
+
+        while True:
+            retry.check_deadline()
+            started = time.perf_counter()
             try:
-                async with self.session.post(url, headers=headers, json=payload) as response:
+                async with limiter.limit():
+                    await quota.reserve(api_key)
+                    started = time.perf_counter()
+                    response = await self.session.post(url, headers=headers, json=payload, timeout=retry.timeout())
+
+                async with response:
+                    _observe("cards_list", response.status, started)
+
                     if response.status == 200:
+                        limiter.relax()
+                        await quota.relax(api_key)
                         data = await response.json()
                         return data.get("cards", [])
 
                     if response.status == 401:
-                        print("❌ Ошибка авторизации (401): Неверный или просроченный токен.")
+                        logger.error("❌ Ошибка авторизации (401): Неверный или просроченный токен.")
                         raise AuthorizationError("Неверный токен (401)")
 
-                    if response.status == 429:
-                        print(f"⏳ Превышен лимит запросов (429). Попытка {attempt}/{self.max_retries}")
-                        await asyncio.sleep(self.retry_delay * attempt)
-                        continue
+                    reason = reason_for_status(response.status)
 
-                    if response.status >= 500:
+                    if reason == RATE_LIMITED:
+                        WB_RATE_LIMITED.labels("cards_list").inc()
+                        limiter.punish()
+                        await quota.penalize(api_key)
+                        sampler.throttle(logger, "cards_list_429", 5.0, logging.WARNING,
+                                         "⏳ Превышен лимит запросов (429). Попытка %s/%s",
+                                         retry.attempt, CONTENT_POLICY.max_attempts)
+
+                    if reason is not None:
+                        if await retry.backoff(reason, retry_after=retry_after_from(response.headers)):
+                            continue
                         text = await response.text()
-                        print(f"❌ root_id={root_id} — ошибка {response.status}: {text.strip()}")
+                        logger.error("❌ root_id=%s — ошибка %s: %s", root_id, response.status, text.strip())
                         return []
 
                     text = await response.text()
@@ -252,13 +458,13 @@ class WBClientAPI:
                     raise RootIDError(msg)
 
             except (asyncio.TimeoutError, ClientConnectionError) as e:
-                print(f"⏱️ Попытка {attempt}/{self.max_retries} — таймаут: {e}")
-                if attempt == self.max_retries:
-                    print(f"❌ root_id={root_id}: превышено число повторов. Пропускаем.")
-                    return []
-                await asyncio.sleep(self.retry_delay * attempt)
-
-        return []
+                _observe("cards_list", "timeout" if isinstance(e, asyncio.TimeoutError) else "conn_error", started)
+                logger.warning("⏱️ Попытка %s/%s — таймаут: %s", retry.attempt, CONTENT_POLICY.max_attempts, e)
+                if await retry.backoff(TIMEOUT):
+                    continue
+                retry.check_deadline()
+                logger.error("❌ root_id=%s: превышено число повторов. Пропускаем.", root_id)
+                return []
 
     async def update_cards(self, api_key: str, cards: list[dict]) -> tuple[bool, dict]:
         await self._ensure_session()
@@ -266,36 +472,130 @@ class WBClientAPI:
         url = f"{self.api_base_url}/content/v2/cards/update"
         headers = {"Authorization": f"{api_key}", "Content-Type": "application/json"}
 
-        payload = cards
-        last_response_json: dict = {}
+        # кодируем один раз на все попытки и не на loop: батч до 3000 карточек — это мегабайты
+        body = await encode_json_array(cards)
 
-        for attempt in range(1, self.max_retries + 1):
+        limiter = get_key_limiter(api_key)
+        quota = get_quota_manager()
+        sizer = get_batch_sizer(api_key)
+        retry = Retrier(CONTENT_POLICY, "cards_update")
+
+        # пауза между батчами токена — от менеджера квот (общая для воркеров)
+        await quota.reserve_update(api_key)
+
+        while True:
+            retry.check_deadline()
+            started = time.perf_counter()
             try:
-                async with self.session.post(url, headers=headers, json=payload) as response:
+                async with limiter.limit():
+                    await quota.reserve(api_key)
+                    started = time.perf_counter()
+                    response = await self.session.post(url, headers=headers, data=body, timeout=retry.timeout())
+
+                async with response:
+                    _observe("cards_update", response.status, started)
+
                     if response.status == 200:
-                        print(f"Карточки успешно обновлены. Кол-во: {len(cards)}")
+                        limiter.relax()
+                        await quota.relax(api_key)
+                        await quota.relax_update(api_key)
+                        sizer.success(time.perf_counter() - started)
+                        logger.info("Карточки успешно обновлены. Кол-во: %s", len(cards))
                         return True, await response.json()
 
                     if response.status == 401:
-                        print("Ошибка авторизации (401): Неверный или просроченный токен.")
+                        logger.error("Ошибка авторизации (401): Неверный или просроченный токен.")
                         raise AuthorizationError("Неверный токен (401)")
 
-                    if response.status == 429:
-                        print(f"Превышен лимит запросов (429). Попытка {attempt}/{self.max_retries}.")
-                        await asyncio.sleep(self.retry_delay * attempt)
-                        continue
+                    reason = reason_for_status(response.status)
+
+                    if reason == RATE_LIMITED:
+                        WB_RATE_LIMITED.labels("cards_update").inc()
+                        limiter.punish()
+                        await quota.penalize(api_key)
+                        await quota.penalize_update(api_key)
+                        logger.warning("Превышен лимит запросов (429). Попытка %s/%s.",
+                                       retry.attempt, CONTENT_POLICY.max_attempts)
+                    elif reason == SERVER_ERROR:
+                        await quota.penalize_update(api_key)
+                        sizer.failure(f"ответ {response.status}")
 
                     text = await response.text()
+                    if reason is not None and await retry.backoff(reason, retry_after=retry_after_from(response.headers)):
+                        continue
+
                     msg = f"Ошибка отправки карточек {response.status}: {text}"
                     raise UpdateCardsError(msg)
 
             except (asyncio.TimeoutError, ClientConnectionError) as e:
-                print(f"Попытка {attempt}/{self.max_retries} — ошибка соединения: {e}")
-                if attempt == self.max_retries:
-                    raise UpdateCardsError("Превышено число попыток отправки карточек")
-                await asyncio.sleep(self.retry_delay * attempt)
+                _observe("cards_update", "timeout" if isinstance(e, asyncio.TimeoutError) else "conn_error", started)
+                logger.warning("Попытка %s/%s — ошибка соединения: %s", retry.attempt, CONTENT_POLICY.max_attempts, e)
+                await quota.penalize_update(api_key)
+                sizer.failure("таймаут" if isinstance(e, asyncio.TimeoutError) else "обрыв соединения")
+                if await retry.backoff(TIMEOUT):
+                    continue
+                retry.check_deadline()
+                raise UpdateCardsError("Превышено число попыток отправки карточек")
+
+    async def get_update_errors(self, api_key: str) -> list[dict] | None:
+        """
+        Список несозданных/необновлённых карточек токена (content/v2/cards/error/list).
+
+        WB принимает батч update целиком и применяет его асинхронно: отказ по
+        отдельной карточке виден только здесь — vendorCode, время и тексты ошибок.
+        None — список получить не удалось (проверка этого токена не состоялась).
+        """
+        await self._ensure_session()
+
+        url = f"{self.api_base_url}/content/v2/cards/error/list?locale=ru"
+        headers = {"Authorization": api_key}
+
+        limiter = get_key_limiter(api_key)
+        quota = get_quota_manager()
+        retry = Retrier(CONTENT_POLICY, "cards_errors")
+
+        while True:
+            retry.check_deadline()
+            started = time.perf_counter()
+            try:
+                async with limiter.limit():
+                    await quota.reserve(api_key)
+                    started = time.perf_counter()
+                    response = await self.session.get(url, headers=headers, timeout=retry.timeout())
+
+                async with response:
+                    _observe("cards_errors", response.status, started)
+
+                    if response.status == 200:
+                        limiter.relax()
+                        await quota.relax(api_key)
+                        data = await response.json()
+                        return data.get("data") or []
+
+                    if response.status == 401:
+                        logger.error("❌ Ошибка авторизации (401): Неверный или просроченный токен.")
+                        raise AuthorizationError("Неверный токен (401)")
+
+                    reason = reason_for_status(response.status)
+
+                    if reason == RATE_LIMITED:
+                        WB_RATE_LIMITED.labels("cards_errors").inc()
+                        limiter.punish()
+                        await quota.penalize(api_key)
+
+                    if reason is not None and await retry.backoff(reason, retry_after=retry_after_from(response.headers)):
+                        continue
+                    text = await response.text()
+                    logger.error("❌ Список ошибок карточек — ошибка %s: %s", response.status, text.strip())
+                    return None
 
-        return False, last_response_json
+            except (asyncio.TimeoutError, ClientConnectionError) as e:
+                _observe("cards_errors", "timeout" if isinstance(e, asyncio.TimeoutError) else "conn_error", started)
+                logger.warning("⏱️ Попытка %s/%s — таймаут: %s", retry.attempt, CONTENT_POLICY.max_attempts, e)
+                if await retry.backoff(TIMEOUT):
+                    continue
+                retry.check_deadline()
+                return None
 
     async def get_filters_by_supplier(self, supplier_id: int) -> dict:
         """
@@ -316,66 +616,53 @@ class WBClientAPI:
             f"&supplier={supplier_id}"
         )
 
-        for attempt in range(1, self.max_retries + 1):
+        limiter = get_host_limiter(url)
+        retry = Retrier(CATALOG_POLICY, "filters")
+
+        while True:
+            retry.check_deadline()
+            started = time.perf_counter()
             try:
-                async with self.session.get(url) as response:
+                async with limiter.limit(url):
+                    started = time.perf_counter()
+                    response = await self.session.get(url, timeout=retry.timeout())
+
+                async with response:
+                    _observe("filters", response.status, started)
+
                     if response.status == 200:
+                        limiter.relax()
                         return await response.json()
 
                     text = await response.text()
-                    print(f"⚠️ Ошибка {response.status} при запросе фильтров: {text}")
-
-                    if response.status in (408, 425, 429, 500, 502, 503, 504):
-                        await asyncio.sleep(self.retry_delay * attempt)
-                        continue
+                    logger.warning("⚠️ Ошибка %s при запросе фильтров: %s", response.status, text)
 
-                    break
+                    reason = reason_for_status(response.status)
+                    if reason == RATE_LIMITED:
+                        WB_RATE_LIMITED.labels("filters").inc()
+                        limiter.punish()
 
-            except (asyncio.TimeoutError, ClientConnectionError) as e:
-                print(f"⏱️ Попытка {attempt}/{self.max_retries} — ошибка соединения: {e}")
-                if attempt == self.max_retries:
-                    print("❌ Превышено число попыток. Возвращаем пустой словарь.")
+                    if reason is not None and await retry.backoff(reason, retry_after=retry_after_from(response.headers)):
+                        continue
                     return {}
-                await asyncio.sleep(self.retry_delay * attempt)
 
-        return {}
-
-    async def get_all_data_by_company_id_and_brands(self, company_id: int, wb_brand_ids: list[int]) -> list[dict]:
+            except (asyncio.TimeoutError, ClientConnectionError) as e:
+                _observe("filters", "timeout" if isinstance(e, asyncio.TimeoutError) else "conn_error", started)
+                logger.warning("⏱️ Попытка %s/%s — ошибка соединения: %s", retry.attempt, CATALOG_POLICY.max_attempts, e)
+                if await retry.backoff(TIMEOUT):
+                    continue
+                retry.check_deadline()
+                logger.error("❌ Превышено число попыток. Возвращаем пустой словарь.")
+                return {}
+
+    async def get_all_data_by_company_id_and_brands(
+        self, company_id: int, wb_brand_ids: list[int], *, max_pages: int | None = None
+    ) -> list[dict]:
         """
-        Получает все товары компании с заданными брендами из WB API.
+        Получает товары компании с заданными брендами из WB API (все или первые max_pages страниц).
+        Страницы хеджируются на фолбэк-хост так же, как в get_all_data_by_company_id.
         """
         await self._ensure_session()
 
-        all_products: list[dict] = []
-        page = 1
         fbrand = ";".join(map(str, wb_brand_ids)) if wb_brand_ids else None
-
-        while True:
-            url = (
-                f"{self.catalog_base_url}/sellers/v4/catalog"
-                f"?ab_testing=false&appType=1&curr=rub&dest=-1257786"
-                f"&hide_dtype=13;14&lang=ru&page={page}&sort=popular&spp=30"
-                f"&supplier={company_id}"
-            )
-            if fbrand:
-                url += f"&fbrand={fbrand}"
-
-            data = await self._get_with_retries(url)
-            if not data:
-                break
-
-            products = data.get("products", [])
-            if not products:
-                break
-
-            all_products.extend(products)
-            page += 1
-            await asyncio.sleep(0.2)
-
-        return all_products
-
-    def _is_html_block(self, text: str, content_type: str | None) -> bool:
-        if content_type and "application/json" in (content_type or "").lower():
-            return False
-        t = text.strip().lower()
-        return t.startswith("<!doctype html") or t.startswith("<html")
+        return await self._scan_catalog(company_id, fbrand, self._catalog_page, max_pages=max_pages)
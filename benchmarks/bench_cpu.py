@@ -0,0 +1,226 @@
+"""
+Микробенчмарки CPU-горячих путей, которые крутятся на event loop на каждую карточку:
+
+    split_telegram_message   — отчёт по запуску на тысячи строк
+    filter_card_top_level    — фильтрация полей карточки перед отправкой
+    split_into_batches       — нарезка на батчи по BATCH_LIMIT
+    process_brands           — цикл решения по брендам (БД подменена словарями в памяти)
+    json_payload             — json.dumps батча, как делает aiohttp для json=payload
+
+Фикстуры — карточки в формате /content/v2/get/cards/list (benchmarks.fleet.make_card).
+
+    python -m benchmarks.bench_cpu --save          # записать базовую линию
+    python -m benchmarks.bench_cpu                 # сравнить; код выхода 1 при регрессии > --threshold
+
+Время нормируется на калибровочный цикл, чтобы базовую линию можно было
+сравнивать между машинами одного класса; для точного сравнения снимайте её
+на той же машине, где гоняете проверку.
+"""
+import argparse
+import asyncio
+import gc
+import json
+import math
+import platform
+import sys
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from types import SimpleNamespace
+
+import core
+from benchmarks.fleet import generate_fleet, initial_brands, make_card
+from config import Config
+from utils.core_utils import filter_card_top_level, split_into_batches
+from utils.handlers_utils import split_telegram_message
+
+BASELINE_PATH = Path(__file__).parent / "baselines" / "bench_cpu.json"
+DEFAULT_THRESHOLD = 0.25
+
+
+def _calibrate() -> int:
+    """Чистый Python-цикл — эталон скорости интерпретатора на этой машине."""
+    acc = 0
+    for i in range(200_000):
+        acc += i % 7
+    return acc
+
+
+MIN_SERIES_SECONDS = 0.2  # короче серия — таймер и планировщик ОС шумят сильнее самого кейса
+
+
+def _measure(func, number: int, repeat: int) -> float:
+    """
+    Лучшее время одного вызова (с) из repeat серий. В серии не меньше number
+    вызовов и не меньше MIN_SERIES_SECONDS; сборщик мусора на время серий
+    выключен, как в timeit, — иначе паузы GC попадают в случайный кейс.
+    """
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        started = time.perf_counter()
+        func()
+        once = max(time.perf_counter() - started, 1e-9)
+        number = max(number, math.ceil(MIN_SERIES_SECONDS / once))
+
+        best = float("inf")
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for _ in range(number):
+                func()
+            best = min(best, (time.perf_counter() - started) / number)
+        return best
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+# ---------- фикстуры ----------
+
+def _fixture_cards(n_roots: int, cards_per_root: int):
+    fleet = generate_fleet(max(1, n_roots // 200), 200, cards_per_root, seed=7)
+    cards = []
+    for nm_id, (company, root_id, brand) in initial_brands(fleet).items():
+        card = make_card(company, root_id, nm_id, brand)
+        card["api_key"] = company.api_key
+        card["company_id"] = company.id
+        card["root"] = root_id
+        cards.append(card)
+    return cards, fleet
+
+
+def _fixture_report(cards: list[dict]) -> str:
+    lines = [f"🔸 RootID {c['root']}: '{c['brand']}' не ночной — без изменений" for c in cards[::3]]
+    # отчёт run_action: блоки по компаниям через пустую строку
+    blocks = ["\n".join(lines[i:i + 40]) for i in range(0, len(lines), 40)]
+    return "\n\n".join(blocks)
+
+
+@asynccontextmanager
+async def _no_session():
+    yield None
+
+
+def _patch_core_for(fleet) -> None:
+    """Справочники компаний и брендов — из флота в памяти, чтобы мерить только CPU."""
+    companies = {
+        c.api_key: SimpleNamespace(id=c.id, name=c.name, default_brand=SimpleNamespace(name=c.default_brand.name))
+        for c in fleet.companies
+    }
+    night = {(b.company_id, b.name) for c in fleet.companies for b in c.brands if not b.is_daytime}
+
+    async def company_by_key(_session_maker, api_key):
+        return companies.get(api_key)
+
+    async def is_night(_session, company_id, brand_name):
+        return (company_id, brand_name) in night
+
+    # staticmethod: через экземпляр config обычная функция стала бы связанным методом
+    Config.AsyncSessionLocal = staticmethod(_no_session)
+    core.get_company_by_api_key_safe = company_by_key
+    core.is_night_brand = is_night
+
+
+# ---------- кейсы ----------
+
+def build_cases(n_roots: int, cards_per_root: int) -> dict:
+    cards, fleet = _fixture_cards(n_roots, cards_per_root)
+    report = _fixture_report(cards)
+    filtered = [filter_card_top_level(c) for c in cards]
+    batch = [{k: v for k, v in c.items() if k != "api_key"} for c in filtered[:core.BATCH_LIMIT]]
+    _patch_core_for(fleet)
+    loop = asyncio.new_event_loop()
+
+    def decide(weekend: bool):
+        # process_brands пишет brand в карточки — работаем по неглубоким копиям
+        fresh = [dict(c) for c in cards]
+        return loop.run_until_complete(core.process_brands(fresh, weekend))
+
+    return {
+        "split_telegram_message": lambda: split_telegram_message(report),
+        "filter_card_top_level": lambda: [filter_card_top_level(c) for c in cards],
+        "split_into_batches": lambda: split_into_batches(filtered, core.BATCH_LIMIT),
+        "process_brands_weekday": lambda: decide(False),
+        "process_brands_weekend": lambda: decide(True),
+        "json_payload": lambda: json.dumps(batch),
+        "_meta": {"cards": len(cards), "report_chars": len(report), "batch": len(batch)},
+    }
+
+
+def run(args) -> dict:
+    cases = build_cases(args.roots, args.cards)
+    meta = cases.pop("_meta")
+    calibration = _measure(_calibrate, 5, args.repeat)
+    results = {name: _measure(func, args.number, args.repeat) for name, func in cases.items()}
+    # калибровка до и после кейсов: короткий всплеск нагрузки на машине не сдвигает все кейсы разом
+    calibration = min(calibration, _measure(_calibrate, 5, args.repeat))
+    return {
+        "machine": f"{platform.python_implementation()} {platform.python_version()} {platform.machine()}",
+        "fixtures": {**meta, "roots": args.roots, "cards_per_root": args.cards},
+        "calibration": calibration,
+        "cases": results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """Регрессии: нормированное на калибровку время выросло больше чем на threshold."""
+    regressions = []
+    scale = baseline["calibration"] / current["calibration"]
+    print(f"{'кейс':<26}{'база, ms':>12}{'сейчас, ms':>12}{'Δ':>9}")
+    for name, seconds in current["cases"].items():
+        base = baseline["cases"].get(name)
+        if base is None:
+            print(f"{name:<26}{'—':>12}{seconds * 1000:>12.3f}{'новый':>9}")
+            continue
+        ratio = seconds * scale / base - 1
+        mark = " ❌" if ratio > threshold else ""
+        print(f"{name:<26}{base * 1000:>12.3f}{seconds * 1000:>12.3f}{ratio:>+9.1%}{mark}")
+        if ratio > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Микробенчмарки CPU-горячих путей")
+    parser.add_argument("--roots", type=int, default=2000)
+    parser.add_argument("--cards", type=int, default=3, help="карточек на root")
+    parser.add_argument("--number", type=int, default=3, help="вызовов в серии")
+    parser.add_argument("--repeat", type=int, default=15, help="серий (берётся лучшая)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="допустимое замедление, доля")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save", action="store_true", help="записать результат как базовую линию")
+    args = parser.parse_args()
+
+    current = run(args)
+
+    if args.save:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(current, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        print(f"✅ Базовая линия записана в {args.baseline}")
+        for name, seconds in current["cases"].items():
+            print(f"{name:<26}{seconds * 1000:>12.3f} ms")
+        return 0
+
+    if not args.baseline.exists():
+        print(
+            f"❌ Нет базовой линии {args.baseline} — сравнивать не с чем. "
+            "Снимите её командой python -m benchmarks.bench_cpu --save и закоммитьте файл.",
+            file=sys.stderr,
+        )
+        return 2
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    if baseline.get("fixtures") != current["fixtures"]:
+        print("⚠️ Фикстуры отличаются от базовой линии — сравнение некорректно", file=sys.stderr)
+        return 2
+
+    regressions = compare(current, baseline, args.threshold)
+    if regressions:
+        print(f"\n❌ Регрессия > {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    print(f"\n✅ Регрессий нет (порог {args.threshold:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""
+Бенчмарк сервисного слоя и решения по брендам на синтетическом флоте.
+
+    python -m benchmarks.fleet_db --companies 300 --roots 400      # один раз засеять схему
+    python -m benchmarks.bench_db --companies 300 --roots 400      # те же параметры — тот же флот
+
+Флот восстанавливается из seed (без чтения БД), поэтому карточки для
+process_brands совпадают с засеянной номенклатурой. --reseed пересоздаёт схему.
+"""
+import argparse
+import asyncio
+import random
+import time
+
+import core
+from benchmarks.fleet import initial_brands
+from benchmarks.fleet_db import add_fleet_arguments, fleet_from_args, create_and_seed, bench_engine, use_engine
+from config import Config
+from services.brand_service import get_night_brands, get_night_brand_wbids, is_night_brand
+from services.company_service import get_all_companies, get_sorted_companies, get_companies_with_nomenclature, \
+    get_company_by_api_key
+from services.holiday_service import get_holiday_dates, is_date_in_holidays
+from services.schedule_service import get_all_schedules, is_schedule_still_exists
+from utils.log_utils import setup_logging
+from utils.run_stats import percentile
+
+
+async def _bench(name: str, func, repeat: int) -> None:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await func()
+        timings.append(time.perf_counter() - started)
+    print(
+        f"{name:<40} p50 {percentile(timings, 50) * 1000:9.2f} ms   "
+        f"p95 {percentile(timings, 95) * 1000:9.2f} ms   n={repeat}"
+    )
+
+
+def _cards(fleet) -> list[dict]:
+    """Минимальные карточки для process_brands: ровно те поля, что он читает."""
+    return [
+        {"nmID": nm_id, "brand": brand, "api_key": company.api_key, "company_id": company.id, "root": root_id}
+        for nm_id, (company, root_id, brand) in initial_brands(fleet).items()
+    ]
+
+
+async def run(args) -> None:
+    fleet = fleet_from_args(args)
+    if args.reseed:
+        await create_and_seed(fleet, args.schema)
+
+    engine = bench_engine(args.schema)
+    use_engine(engine)
+    session_maker = Config.AsyncSessionLocal
+    rnd = random.Random(args.seed)
+    sample_companies = rnd.sample(fleet.companies, min(50, len(fleet.companies)))
+    repeat = args.repeat
+
+    print(f"флот: компаний {len(fleet.companies)}, брендов {fleet.brands_total}, root {fleet.roots_total}, "
+          f"праздников {len(fleet.holidays)}, расписаний {len(fleet.schedules)}\n")
+
+    try:
+        async def with_session(func, *a):
+            async with session_maker() as session:
+                return await func(session, *a)
+
+        await _bench("get_all_companies", lambda: with_session(get_all_companies), repeat)
+        await _bench("get_sorted_companies", lambda: with_session(get_sorted_companies), repeat)
+        await _bench("get_companies_with_nomenclature", lambda: with_session(get_companies_with_nomenclature), repeat)
+        await _bench("get_night_brands", lambda: with_session(get_night_brands), repeat)
+
+        async def per_company(func):
+            async with session_maker() as session:
+                for c in sample_companies:
+                    await func(session, c)
+
+        await _bench(
+            f"get_company_by_api_key ×{len(sample_companies)}",
+            lambda: per_company(lambda s, c: get_company_by_api_key(s, c.api_key)), repeat,
+        )
+        await _bench(
+            f"get_night_brand_wbids ×{len(sample_companies)}",
+            lambda: per_company(lambda s, c: get_night_brand_wbids(s, c.id, c.default_brand.name)), repeat,
+        )
+        await _bench(
+            f"is_night_brand ×{len(sample_companies)}",
+            lambda: per_company(lambda s, c: is_night_brand(s, c.id, c.original_brand)), repeat,
+        )
+
+        await _bench("get_holiday_dates", lambda: with_session(get_holiday_dates), repeat)
+        if fleet.holidays:
+            day = fleet.holidays[len(fleet.holidays) // 2][0]
+            await _bench("is_date_in_holidays", lambda: with_session(is_date_in_holidays, day), repeat)
+        await _bench("get_all_schedules", lambda: with_session(get_all_schedules), repeat)
+        if fleet.schedules:
+            user_id, weekday, at, action = fleet.schedules[0]
+            await _bench(
+                "is_schedule_still_exists",
+                lambda: is_schedule_still_exists(session_maker, user_id, action, weekday, at.hour, at.minute), repeat,
+            )
+
+        print()
+        cards = _cards(fleet)
+        decide_repeat = max(1, repeat // 10)
+        for weekend in (False, True):
+            # process_brands меняет brand в карточках — каждому прогону свежая копия
+            await _bench(
+                f"process_brands weekend={weekend} ({len(cards)} карт.)",
+                lambda: core.process_brands([dict(c) for c in cards], weekend), decide_repeat,
+            )
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк сервисов БД на синтетическом флоте")
+    add_fleet_arguments(parser)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--reseed", action="store_true", help="пересоздать и засеять схему перед замером")
+    args = parser.parse_args()
+
+    setup_logging(level="WARNING")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Сквозной бенчмарк run_all_to / run_all_from против локального мока WB.
+
+Поднимает мок в отдельном процессе, засевает тот же флот в схему bench
+(рабочие таблицы не трогаются), направляет Config.API_URL/CATALOG_URL на мок
+и гоняет пайплайн. Печатает wall time, длительности фаз, число запросов
+(со стороны клиента и мока) и пиковую память.
+
+    python -m benchmarks.bench_e2e --companies 5 --roots 50 --action all_from --pacing-scale 0.01
+
+--pacing-scale масштабирует паузы core (1 c между root, 2 c между батчами токена, 10 c до проверки,
+опрос списка ошибок WB); 1.0 — как в проде.
+
+--proxies N поднимает N локальных CONNECT-прокси (benchmarks.proxy_stub) и пускает
+каталог через пул выходов; вместе с --catalog-ip-rate видно, как пропускная
+способность каталога растёт с числом выходов.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import resource
+import socket
+import sys
+import time
+import tracemalloc
+
+import aiohttp
+
+import core
+from benchmarks.fleet import generate_fleet
+from benchmarks.fleet_db import bench_engine, use_engine, recreate_schema, seed_fleet, BENCH_SCHEMA
+from benchmarks.mock_wb import add_mock_arguments, settings_from_args, serve
+from benchmarks import proxy_stub
+from config import Config
+from utils import quota_manager
+from utils.log_utils import setup_logging
+from utils.run_stats import RunStats
+
+
+def _wait_port(host: str, port: int, timeout: float = 15.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with socket.socket() as s:
+            if s.connect_ex((host, port)) == 0:
+                return
+        time.sleep(0.05)
+    raise RuntimeError(f"мок не поднялся на {host}:{port}")
+
+
+def _scale_pacing(scale: float) -> None:
+    core.REQUEST_DELAY_ONE_SECOND *= scale
+    quota_manager.UPDATE_BASE_INTERVAL *= scale
+    core.VERIFY_DELAY_SECONDS *= scale
+    Config.VERIFY_POLL_DELAY *= scale
+
+
+async def _mock_stats(base_url: str) -> dict:
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"{base_url}/__stats") as resp:
+            return await resp.json(content_type=None)
+
+
+async def run_benchmark(args, base_url: str, fleet) -> list[dict]:
+    engine = bench_engine(args.schema)
+    async with engine.begin() as conn:
+        await recreate_schema(conn, args.schema)
+        await seed_fleet(conn, fleet, args.schema)
+    use_engine(engine)
+
+    results = []
+    actions = ["all_to", "all_from"] if args.action == "both" else [args.action]
+    try:
+        for action in actions:
+            before = await _mock_stats(base_url)
+            stats = RunStats(action)
+
+            tracemalloc.start()
+            started = time.perf_counter()
+            if action == "all_to":
+                errors = await core.run_all_to(stats=stats)
+            else:
+                errors = await core.run_all_from(weekend_override=args.weekend, stats=stats)
+            wall = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            stats.finish("ok")
+
+            after = await _mock_stats(base_url)
+            server = {k: after.get(k, 0) - before.get(k, 0) for k in after}
+            results.append({
+                "action": action,
+                "wall_s": round(wall, 2),
+                "phases_s": {k: round(v, 2) for k, v in stats.phases.items()},
+                "client_requests": stats.requests,
+                "client_retries": stats.retries,
+                "server_requests": server,
+                "cards": stats.cards,
+                "errors": len(errors or []),
+                "peak_py_mb": round(peak / 1024 / 1024, 1),
+                "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            })
+    finally:
+        await engine.dispose()
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="E2E бенчмарк пайплайна против мока WB")
+    add_mock_arguments(parser)
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--action", choices=["all_to", "all_from", "both"], default="both")
+    parser.add_argument("--weekend", action=argparse.BooleanOptionalAction, default=False,
+                        help="режим all_from (по умолчанию будни)")
+    parser.add_argument("--pacing-scale", type=float, default=1.0)
+    parser.add_argument("--schema", default=BENCH_SCHEMA)
+    parser.add_argument("--json", action="store_true", help="вывести результат JSON-ом")
+    parser.add_argument("--proxies", type=int, default=0, help="локальных прокси для каталога (0 — напрямую)")
+    parser.add_argument("--proxy-port", type=int, default=18080)
+    args = parser.parse_args()
+
+    setup_logging(level="WARNING")
+
+    host = "127.0.0.1"
+    base_url = f"http://{host}:{args.port}"
+    fleet = generate_fleet(args.companies, args.roots, args.cards, seed=args.seed)
+
+    server = multiprocessing.Process(
+        target=serve, args=(fleet, settings_from_args(args), host, args.port), daemon=True,
+    )
+    server.start()
+    proxies = None
+    if args.proxies:
+        proxies = multiprocessing.Process(
+            target=proxy_stub.serve, args=(args.proxies, host, args.proxy_port), daemon=True,
+        )
+        proxies.start()
+    try:
+        _wait_port(host, args.port)
+        Config.API_URL = base_url
+        Config.CATALOG_URL = base_url
+        Config.CATALOG_FALLBACK_URL = f"{base_url}/__internal/u-catalog"
+        if proxies is not None:
+            for n in range(args.proxies):
+                _wait_port(host, args.proxy_port + n)
+            Config.CATALOG_PROXIES = proxy_stub.proxy_urls(args.proxies, host, args.proxy_port)
+        _scale_pacing(args.pacing_scale)
+
+        results = asyncio.run(run_benchmark(args, base_url, fleet))
+    finally:
+        for process in (server, proxies):
+            if process is not None:
+                process.terminate()
+                process.join()
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+
+    print(f"флот: компаний {len(fleet.companies)}, root {fleet.roots_total}, "
+          f"карточек {fleet.roots_total * fleet.cards_per_root}; pacing x{args.pacing_scale}; "
+          f"выходов каталога {args.proxies or 'direct'}")
+    for r in results:
+        print(f"\n== {r['action']} ==")
+        print(f"wall:            {r['wall_s']} s")
+        print(f"фазы:            {r['phases_s']}")
+        print(f"запросы клиента: {r['client_requests']} (повторов {r['client_retries']})")
+        print(f"запросы мока:    {r['server_requests']}")
+        print(f"карточки:        {r['cards']}")
+        print(f"ошибок:          {r['errors']}")
+        print(f"память:          peak python {r['peak_py_mb']} MB, max RSS {r['max_rss_mb']} MB")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
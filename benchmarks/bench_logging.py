@@ -0,0 +1,83 @@
+"""
+Сколько времени event loop тратит на логирование за типичный прогон.
+
+Сценарий: N root_id × M карточек. «Было» — print на каждый root, на каждую карточку
+и SQL-эхо на каждый запрос (как при echo=True). «Стало» — логгер через QueueHandler,
+per-root сообщения прорежены sampler.every_n, per-card — DEBUG (выключен), SQL-эхо выключено.
+
+Запуск (stdout лучше увести в файл/пайп, как в проде под systemd/docker):
+    python -m benchmarks.bench_logging --roots 5000 --cards 6 > /tmp/bench_log.txt
+Итоги печатаются в stderr.
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import time
+
+from utils.log_utils import setup_logging, shutdown_logging, sampler
+
+SQL_ECHO_LINE = (
+    "SELECT brands.id, brands.name, brands.is_daytime, brands.company_id, brands.\"wbID\" "
+    "FROM brands WHERE brands.company_id = $1::INTEGER AND brands.name = $2::VARCHAR "
+    "AND brands.is_daytime = false"
+)
+
+
+async def run_print(roots: int, cards: int) -> float:
+    started = time.perf_counter()
+    for root_id in range(roots):
+        print(f"✅ Обрабатываем root_id: {root_id}")
+        print(SQL_ECHO_LINE)
+        print(f"[generated in 0.00011s] ({root_id}, 'brand_{root_id}')")
+        for card in range(cards):
+            print(f"бренд: brand_{card} → default")
+        print(f"📦 Получено карточек для root_id={root_id}: {cards}")
+        await asyncio.sleep(0)
+    return time.perf_counter() - started
+
+
+async def run_logging(roots: int, cards: int) -> float:
+    logger = logging.getLogger("core")
+    started = time.perf_counter()
+    for root_id in range(roots):
+        sampler.every_n(logger, "bench_root", 100, logging.INFO, "✅ Обрабатываем root_id: %s", root_id)
+        for card in range(cards):
+            logger.debug("бренд: %s → %s", f"brand_{card}", "default")
+        sampler.every_n(logger, "bench_cards", 100, logging.INFO,
+                        "📦 Получено карточек для root_id=%s: %s", root_id, cards)
+        await asyncio.sleep(0)
+    return time.perf_counter() - started
+
+
+async def run_idle(roots: int) -> float:
+    started = time.perf_counter()
+    for _ in range(roots):
+        await asyncio.sleep(0)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--roots", type=int, default=5000)
+    parser.add_argument("--cards", type=int, default=6)
+    args = parser.parse_args()
+
+    idle = asyncio.run(run_idle(args.roots))
+    before = asyncio.run(run_print(args.roots, args.cards))
+    sys.stdout.flush()
+
+    setup_logging(level="INFO")
+    after = asyncio.run(run_logging(args.roots, args.cards))
+    shutdown_logging()
+
+    print(f"roots={args.roots} cards/root={args.cards}", file=sys.stderr)
+    print(f"пустой цикл:          {idle * 1000:8.1f} ms", file=sys.stderr)
+    print(f"print + SQL echo:     {(before - idle) * 1000:8.1f} ms на event loop", file=sys.stderr)
+    print(f"queue logging:        {(after - idle) * 1000:8.1f} ms на event loop", file=sys.stderr)
+    if after - idle > 0:
+        print(f"выигрыш:              x{(before - idle) / (after - idle):.1f}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
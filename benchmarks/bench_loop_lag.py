@@ -0,0 +1,85 @@
+"""
+Задержка event loop во время самой тяжёлой фазы — send: фильтрация карточек и
+кодирование батчей по BATCH_LIMIT в JSON. Пока фаза идёт, рядом крутится
+LoopLagMonitor — так же, как поллинг Telegram в боте.
+
+    python -m benchmarks.bench_loop_lag                       # inline / thread / process
+    python -m benchmarks.bench_loop_lag --roots 20000 --modes inline,thread
+
+Сеть не участвует: меряется только CPU-часть отправки. inline — поведение до
+выноса в пул; пик задержки в нём ≈ время кодирования самого большого батча.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+import core
+from benchmarks.bench_cpu import _fixture_cards
+from config import Config
+from utils import offload
+from utils.core_utils import prepare_payloads, split_into_batches
+
+
+def _send_phase_inline(cards: list[dict]) -> int:
+    size = 0
+    for batch in split_into_batches(prepare_payloads(cards), core.BATCH_LIMIT):
+        size += len(json.dumps(batch).encode())
+    return size
+
+
+async def _send_phase_offloaded(cards: list[dict]) -> int:
+    size = 0
+    payloads = await offload.map_chunks("filter", prepare_payloads, cards)
+    for batch in split_into_batches(payloads, core.BATCH_LIMIT):
+        size += len(await offload.encode_json_array(batch))
+    return size
+
+
+async def measure(mode: str, cards: list[dict]) -> dict:
+    Config.CPU_EXECUTOR = mode
+    offload.shutdown_executor()
+    monitor = offload.LoopLagMonitor(interval=0.01)
+    monitor.start()
+    await asyncio.sleep(0.05)  # пул и монитор прогреты до замера
+
+    with monitor.window() as lag:
+        started = time.perf_counter()
+        if mode == "inline":
+            # как было: всё подряд на loop, без единой точки переключения
+            size = _send_phase_inline(cards)
+            await asyncio.sleep(0)
+        else:
+            size = await _send_phase_offloaded(cards)
+        elapsed = time.perf_counter() - started
+        await asyncio.sleep(monitor.interval * 2)  # дать монитору снять последний перебор
+
+    monitor.stop()
+    offload.shutdown_executor()
+    return {"mode": mode, "seconds": elapsed, "lag_peak": lag.peak, "bytes": size}
+
+
+async def run(args) -> list[dict]:
+    cards, _ = _fixture_cards(args.roots, args.cards)
+    Config.OFFLOAD_CHUNK = args.chunk
+    return [await measure(mode, cards) for mode in args.modes.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Задержка event loop в фазе send: inline против пула")
+    parser.add_argument("--roots", type=int, default=5000)
+    parser.add_argument("--cards", type=int, default=3, help="карточек на root")
+    parser.add_argument("--chunk", type=int, default=Config.OFFLOAD_CHUNK, help="карточек в куске пула")
+    parser.add_argument("--modes", default="inline,thread,process")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print(f"{'режим':<10}{'фаза, s':>10}{'пик лага, ms':>15}{'JSON, MB':>11}")
+    for row in results:
+        print(f"{row['mode']:<10}{row['seconds']:>10.2f}{row['lag_peak'] * 1000:>15.1f}{row['bytes'] / 1e6:>11.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
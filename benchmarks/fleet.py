@@ -0,0 +1,205 @@
+"""
+Детерминированный синтетический флот: компании → бренды → root → карточки,
+плюс праздники и расписания пользователей.
+
+Один и тот же (companies, roots, cards, seed) даёт одинаковые данные и для
+мок-сервера WB, и для засева БД, поэтому их можно поднимать независимо.
+vary=True разбрасывает число брендов и root по компаниям (как в проде:
+несколько крупных кабинетов и длинный хвост мелких).
+"""
+import datetime
+import random
+from dataclasses import dataclass, field
+
+DAY = "day"
+NIGHT = "night"
+
+
+@dataclass
+class FleetBrand:
+    id: int
+    company_id: int
+    name: str
+    wb_id: int
+    is_daytime: bool
+
+
+@dataclass
+class FleetCompany:
+    id: int                  # == company_id (WB supplier id)
+    name: str
+    api_key: str
+    cabinet_order: int
+    brands: list[FleetBrand] = field(default_factory=list)
+    default_brand_id: int | None = None
+    roots: list[int] = field(default_factory=list)
+
+    @property
+    def default_brand(self) -> FleetBrand:
+        return next(b for b in self.brands if b.id == self.default_brand_id)
+
+    @property
+    def original_brand(self) -> str:
+        """Бренд из номенклатуры (куда ведёт all_to) — первый ночной."""
+        night = [b for b in self.brands if not b.is_daytime]
+        return (night[0] if night else self.default_brand).name
+
+
+@dataclass
+class Fleet:
+    companies: list[FleetCompany]
+    cards_per_root: int
+    seed: int
+    holidays: list[tuple[datetime.date, str]] = field(default_factory=list)
+    users: list[int] = field(default_factory=list)
+    schedules: list[tuple[int, int, datetime.time, str]] = field(default_factory=list)  # user, weekday, time, action
+
+    def company_by_key(self) -> dict[str, FleetCompany]:
+        return {c.api_key: c for c in self.companies}
+
+    @property
+    def roots_total(self) -> int:
+        return sum(len(c.roots) for c in self.companies)
+
+    @property
+    def brands_total(self) -> int:
+        return sum(len(c.brands) for c in self.companies)
+
+
+def generate_fleet(
+    companies: int,
+    roots_per_company: int,
+    cards_per_root: int = 3,
+    *,
+    night_brands: int = 2,
+    seed: int = 42,
+    vary: bool = False,
+    holiday_years: tuple[int, ...] = (),
+    users: int = 0,
+) -> Fleet:
+    rnd = random.Random(seed)
+    result: list[FleetCompany] = []
+    brand_id = 0
+
+    for i in range(1, companies + 1):
+        company = FleetCompany(
+            id=i,
+            name=f"Компания {i}",
+            api_key=f"token-{seed}-{i}",
+            cabinet_order=i,
+        )
+        brand_id += 1
+        default = FleetBrand(brand_id, i, f"brand_{i}_day", 300000 + brand_id, True)
+        company.brands.append(default)
+        company.default_brand_id = default.id
+
+        n_night = rnd.randint(1, 2 * night_brands + 2) if vary else night_brands
+        for j in range(n_night):
+            brand_id += 1
+            company.brands.append(FleetBrand(brand_id, i, f"brand_{i}_night{j}", 300000 + brand_id, False))
+        if vary:
+            # пара дополнительных дневных брендов у части кабинетов
+            for j in range(rnd.choice((0, 0, 1, 2))):
+                brand_id += 1
+                company.brands.append(FleetBrand(brand_id, i, f"brand_{i}_day{j + 1}", 300000 + brand_id, True))
+
+        if vary:
+            # логнормальный разброс со средним ~roots_per_company
+            n_roots = max(1, int(rnd.lognormvariate(0, 0.8) * roots_per_company / 1.377))
+        else:
+            n_roots = roots_per_company
+        base = 10_000_000 + i * 100_000
+        company.roots = [base + k for k in range(min(n_roots, 99_999))]
+        result.append(company)
+
+    fleet = Fleet(result, cards_per_root, seed)
+    fleet.holidays = generate_holidays(holiday_years, rnd)
+    fleet.users, fleet.schedules = generate_schedules(users, rnd)
+    return fleet
+
+
+# фиксированные нерабочие дни РФ (месяц, день, описание)
+_FIXED_HOLIDAYS = (
+    *((1, d, "Новогодние каникулы") for d in range(1, 9)),
+    (2, 23, "День защитника Отечества"),
+    (3, 8, "Международный женский день"),
+    (5, 1, "Праздник Весны и Труда"),
+    (5, 9, "День Победы"),
+    (6, 12, "День России"),
+    (11, 4, "День народного единства"),
+)
+
+
+def generate_holidays(years: tuple[int, ...], rnd: random.Random) -> list[tuple[datetime.date, str]]:
+    """Государственные праздники за годы плюс несколько случайных переносов на будни."""
+    result: dict[datetime.date, str] = {}
+    for year in years:
+        for month, day, description in _FIXED_HOLIDAYS:
+            result[datetime.date(year, month, day)] = description
+        for _ in range(3):
+            day = datetime.date(year, 1, 1) + datetime.timedelta(days=rnd.randrange(365))
+            if day.weekday() < 5:
+                result.setdefault(day, "Перенос выходного")
+    return sorted(result.items())
+
+
+def generate_schedules(users: int, rnd: random.Random) -> tuple[list[int], list[tuple[int, int, datetime.time, str]]]:
+    """Пользователи с расписаниями: у каждого all_to вечером и all_from утром на часть дней недели."""
+    user_ids = [100_000_000 + n for n in range(users)]
+    schedules = []
+    for user_id in user_ids:
+        for weekday in sorted(rnd.sample(range(7), rnd.randint(1, 7))):
+            schedules.append((user_id, weekday, datetime.time(rnd.randint(19, 23), rnd.choice((0, 15, 30, 45))), "all_to"))
+            schedules.append((user_id, weekday, datetime.time(rnd.randint(6, 9), rnd.choice((0, 30))), "all_from"))
+    return user_ids, schedules
+
+
+def initial_brands(fleet: Fleet, night_share: float = 0.5) -> dict[int, tuple[FleetCompany, int, str]]:
+    """Стартовое состояние карточек: nmID -> (компания, root, бренд). Часть — с ночным брендом."""
+    rnd = random.Random(fleet.seed)
+    state: dict[int, tuple[FleetCompany, int, str]] = {}
+    for company in fleet.companies:
+        night = [b.name for b in company.brands if not b.is_daytime] or [company.default_brand.name]
+        for root_id in company.roots:
+            brand = rnd.choice(night) if rnd.random() < night_share else company.default_brand.name
+            for nm_id in root_nm_ids(root_id, fleet.cards_per_root):
+                state[nm_id] = (company, root_id, brand)
+    return state
+
+
+def root_nm_ids(root_id: int, cards_per_root: int) -> list[int]:
+    return [root_id * 10 + k for k in range(cards_per_root)]
+
+
+def make_card(company: FleetCompany, root_id: int, nm_id: int, brand: str) -> dict:
+    """Карточка в формате ответа /content/v2/get/cards/list."""
+    return {
+        "nmID": nm_id,
+        "imtID": root_id,
+        "nmUUID": f"00000000-0000-0000-0000-{nm_id:012d}",
+        "subjectID": 105,
+        "subjectName": "Футболки",
+        "vendorCode": f"VC-{nm_id}",
+        "brand": brand,
+        "title": f"Футболка хлопковая {nm_id}",
+        "description": "Базовая футболка из хлопка. " * 20,
+        "needKiz": False,
+        "photos": [
+            {"big": f"https://basket-01.wbbasket.ru/vol{nm_id // 100000}/part{nm_id // 1000}/{nm_id}/images/big/{n}.webp"}
+            for n in range(1, 6)
+        ],
+        "dimensions": {"length": 30, "width": 20, "height": 3, "weightBrutto": 0.25, "isValid": True},
+        "characteristics": [
+            {"id": 14177449, "name": "Цвет", "value": ["черный"]},
+            {"id": 14177451, "name": "Состав", "value": ["хлопок 100%"]},
+            {"id": 14177452, "name": "Страна производства", "value": ["Россия"]},
+            {"id": 15000001, "name": "Пол", "value": ["Мужской"]},
+        ],
+        "sizes": [
+            {"chrtID": nm_id * 10 + s, "techSize": size, "wbSize": size, "skus": [f"20{nm_id}{s:02d}"]}
+            for s, size in enumerate(("S", "M", "L", "XL"))
+        ],
+        "tags": [],
+        "createdAt": "2024-01-01T00:00:00Z",
+        "updatedAt": "2024-06-01T00:00:00Z",
+    }
@@ -0,0 +1,148 @@
+"""
+Засев синтетического флота в БД (отдельная схема, рабочие таблицы не трогаем).
+
+    python -m benchmarks.fleet_db --companies 300 --roots 400 --seed 42
+
+Данные грузятся через COPY и воспроизводимы по seed.
+"""
+import argparse
+import asyncio
+import time
+from datetime import date
+
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, create_async_engine, async_sessionmaker, AsyncSession
+
+import migrations
+from benchmarks.fleet import Fleet, generate_fleet
+from config import Config
+from models import Base
+
+BENCH_SCHEMA = "bench"
+
+
+def bench_engine(schema: str = BENCH_SCHEMA) -> AsyncEngine:
+    """Движок, у которого search_path указывает на схему бенчмарка."""
+    return create_async_engine(
+        Config.DATABASE_URL,
+        pool_size=5,
+        max_overflow=10,
+        connect_args={"server_settings": {"search_path": schema}},
+    )
+
+
+def use_engine(engine: AsyncEngine) -> None:
+    """Подменяет движок/сессии приложения — core и сервисы ходят через config."""
+    Config.engine = engine
+    Config.AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+
+
+async def recreate_schema(conn: AsyncConnection, schema: str = BENCH_SCHEMA) -> None:
+    await conn.exec_driver_sql(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+    await conn.exec_driver_sql(f"CREATE SCHEMA {schema}")
+    await conn.exec_driver_sql(f"SET search_path TO {schema}")
+    await conn.run_sync(Base.metadata.create_all)
+    await migrations.upgrade(conn)
+
+
+async def _copy(conn: AsyncConnection, table: str, columns: tuple[str, ...], records, schema: str | None) -> None:
+    raw = await conn.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(table, records=records, columns=columns, schema_name=schema)
+
+
+async def seed_fleet(conn: AsyncConnection, fleet: Fleet, schema: str | None = BENCH_SCHEMA) -> dict[str, int]:
+    """
+    Засев флота через COPY. Компании и бренды — с явными id (их знает мок),
+    остальное — с id из последовательностей. Возвращает число строк по таблицам.
+    """
+    companies = fleet.companies
+    # первая команда открывает транзакцию — COPY пойдёт в неё же
+    await conn.exec_driver_sql(f"SET LOCAL search_path TO {schema or 'public'}")
+
+    await _copy(conn, "companies", ("id", "name", "api_key", "expires_at", "company_id", "cabinet_order"), [
+        (c.id, c.name, c.api_key, date(2099, 1, 1), c.id, c.cabinet_order) for c in companies
+    ], schema)
+    await _copy(conn, "brands", ("id", "name", "is_daytime", "company_id", "wbID"), [
+        (b.id, b.name, b.is_daytime, b.company_id, b.wb_id) for c in companies for b in c.brands
+    ], schema)
+    # default_brand_id и brands.company_id ссылаются друг на друга — дефолтные бренды проставляем вторым шагом
+    await conn.exec_driver_sql(
+        """
+        UPDATE companies AS c
+           SET default_brand_id = s.brand_id
+          FROM unnest($1::int[], $2::int[]) AS s(company_id, brand_id)
+         WHERE c.id = s.company_id
+        """,
+        ([c.id for c in companies], [c.default_brand_id for c in companies]),
+    )
+    await _copy(conn, "nomenclature", ("wb_article", "root_id", "root_id_int", "original_brand", "company_id"), (
+        (str(root_id * 10), str(root_id), root_id, c.original_brand, c.id)
+        for c in companies for root_id in c.roots
+    ), schema)
+    await _copy(conn, "holidays", ("date", "description"), fleet.holidays, schema)
+    await _copy(conn, "allowed_users", ("user_id",), [(u,) for u in fleet.users], schema)
+    await _copy(conn, "schedules", ("user_id", "weekday", "time", "action"), fleet.schedules, schema)
+
+    for table in ("companies", "brands"):
+        await conn.exec_driver_sql(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE((SELECT max(id) FROM {table}), 1))"
+        )
+    await conn.exec_driver_sql("ANALYZE")
+
+    return {
+        "companies": len(companies),
+        "brands": fleet.brands_total,
+        "nomenclature": fleet.roots_total,
+        "holidays": len(fleet.holidays),
+        "allowed_users": len(fleet.users),
+        "schedules": len(fleet.schedules),
+    }
+
+
+def add_fleet_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--companies", type=int, default=300)
+    parser.add_argument("--roots", type=int, default=400, help="среднее число root на компанию")
+    parser.add_argument("--cards", type=int, default=1, help="карточек (nmID) на root")
+    parser.add_argument("--night-brands", type=int, default=4)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--years", type=int, nargs="*", default=[2025, 2026])
+    parser.add_argument("--uniform", action="store_true", help="одинаковые компании (как в e2e-бенчмарке)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--schema", default=BENCH_SCHEMA)
+
+
+def fleet_from_args(args) -> Fleet:
+    return generate_fleet(
+        args.companies, args.roots, args.cards,
+        night_brands=args.night_brands, seed=args.seed, vary=not args.uniform,
+        holiday_years=tuple(args.years), users=args.users,
+    )
+
+
+async def create_and_seed(fleet: Fleet, schema: str = BENCH_SCHEMA) -> dict[str, int]:
+    engine = bench_engine(schema)
+    try:
+        started = time.perf_counter()
+        async with engine.begin() as conn:
+            await recreate_schema(conn, schema)
+        created = time.perf_counter()
+        async with engine.begin() as conn:
+            counts = await seed_fleet(conn, fleet, schema)
+        seeded = time.perf_counter()
+    finally:
+        await engine.dispose()
+
+    print(f"✅ Схема {schema}: создана за {created - started:.2f}s, засеяна за {seeded - created:.2f}s (seed={fleet.seed})")
+    for table, n in counts.items():
+        print(f"   {table:<14} {n}")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Засев синтетического флота в отдельную схему БД")
+    add_fleet_arguments(parser)
+    args = parser.parse_args()
+    asyncio.run(create_and_seed(fleet_from_args(args), args.schema))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+"""
+Локальный мок WB: Content API и публичный каталог.
+
+    /content/v2/get/cards/list     POST — карточки по imtID или textSearch, пагинация курсором
+    /content/v2/cards/update       POST — обновление карточек (меняет состояние мока)
+    /content/v2/cards/error/list   GET  — несозданные/необновлённые карточки токена
+    /sellers/v4/catalog            GET  — каталог продавца, page / fbrand
+    /sellers/v8/filters            GET  — фильтры продавца
+    /__internal/u-catalog/...      те же каталог/фильтры (фолбэк-хост)
+    /__stats                       GET  — счётчики запросов мока
+
+Поведение настраивается MockSettings: задержка, 429 по токену (token bucket),
+498 и HTML-заглушка антибота с заданной вероятностью, антибот каталога по IP
+клиента (token bucket на адрес — как у WB), размер страницы каталога, доля
+карточек, которые WB принял в update, но не применил (видны в error/list).
+
+    python -m benchmarks.mock_wb --companies 10 --roots 100 --port 8081
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass
+
+from aiohttp import web
+
+from benchmarks.fleet import Fleet, generate_fleet, initial_brands, make_card
+
+ANTIBOT_HTML = "<!DOCTYPE html><html><head><title>Почти готово...</title></head><body>antibot</body></html>"
+
+
+@dataclass
+class MockSettings:
+    latency: float = 0.05            # средняя задержка ответа, с
+    jitter: float = 0.02             # ± равномерный разброс
+    token_rate: float = 5.0          # запросов в секунду на токен до 429 (0 — без лимита)
+    token_burst: int = 10
+    antibot_498: float = 0.0         # вероятность 498 на запрос каталога
+    antibot_html: float = 0.0        # вероятность HTML-заглушки со статусом 200
+    catalog_ip_rate: float = 0.0     # запросов каталога в секунду на IP до 498 (0 — без лимита)
+    catalog_ip_burst: int = 5
+    catalog_page_size: int = 100
+    cards_page_size: int = 100       # максимум карточек на страницу cards/list
+    update_fail_rate: float = 0.0    # вероятность, что карточка из update не применится
+    seed: int = 1
+
+
+class _TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.ts = time.monotonic()
+
+    def take(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.ts) * self.rate)
+        self.ts = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class MockWB:
+    def __init__(self, fleet: Fleet, settings: MockSettings | None = None):
+        self.fleet = fleet
+        self.settings = settings or MockSettings()
+        self.rnd = random.Random(self.settings.seed)
+        self.stats: Counter[str] = Counter()
+
+        self.companies = fleet.company_by_key()
+        self.brand_ids = {b.name: b.wb_id for c in fleet.companies for b in c.brands}
+        # nmID -> (компания, root, бренд) — единственное изменяемое состояние
+        self.cards = initial_brands(fleet)
+        self.nm_by_root: dict[int, list[int]] = {}
+        self.nm_by_supplier: dict[int, list[int]] = {}
+        for nm_id, (company, root_id, _) in self.cards.items():
+            self.nm_by_root.setdefault(root_id, []).append(nm_id)
+            self.nm_by_supplier.setdefault(company.id, []).append(nm_id)
+        # токен -> vendorCode -> запись error/list (последняя ошибка по артикулу)
+        self.update_errors: dict[str, dict[str, dict]] = {}
+        self.buckets: dict[str, _TokenBucket] = {}
+        self.ip_buckets: dict[str, _TokenBucket] = {}
+
+    # ---------- helpers ----------
+
+    async def _delay(self):
+        s = self.settings
+        await asyncio.sleep(max(0.0, s.latency + self.rnd.uniform(-s.jitter, s.jitter)))
+
+    def _rate_limited(self, token: str) -> bool:
+        if not self.settings.token_rate:
+            return False
+        bucket = self.buckets.get(token)
+        if bucket is None:
+            bucket = self.buckets[token] = _TokenBucket(self.settings.token_rate, self.settings.token_burst)
+        return not bucket.take()
+
+    def _ip_limited(self, remote: str | None) -> bool:
+        if not self.settings.catalog_ip_rate:
+            return False
+        bucket = self.ip_buckets.get(remote or "")
+        if bucket is None:
+            bucket = self.ip_buckets[remote or ""] = _TokenBucket(
+                self.settings.catalog_ip_rate, self.settings.catalog_ip_burst,
+            )
+        return not bucket.take()
+
+    def _antibot(self, request: web.Request) -> web.Response | None:
+        if self._ip_limited(request.remote):
+            self.stats["antibot_ip"] += 1
+            return web.Response(status=498, text=ANTIBOT_HTML, content_type="text/html")
+        roll = self.rnd.random()
+        if roll < self.settings.antibot_498:
+            self.stats["antibot_498"] += 1
+            return web.Response(status=498, text=ANTIBOT_HTML, content_type="text/html")
+        if roll < self.settings.antibot_498 + self.settings.antibot_html:
+            self.stats["antibot_html"] += 1
+            return web.Response(status=200, text=ANTIBOT_HTML, content_type="text/html")
+        return None
+
+    def _auth(self, request: web.Request):
+        token = request.headers.get("Authorization", "")
+        company = self.companies.get(token)
+        if company is None:
+            return None, web.json_response({"title": "unauthorized"}, status=401)
+        if self._rate_limited(token):
+            self.stats["429"] += 1
+            return None, web.json_response(
+                {"title": "too many requests"}, status=429, headers={"Retry-After": "1"}
+            )
+        return company, None
+
+    # ---------- content API ----------
+
+    async def cards_list(self, request: web.Request) -> web.Response:
+        self.stats["cards_list"] += 1
+        await self._delay()
+        company, error = self._auth(request)
+        if error is not None:
+            return error
+
+        body = await request.json()
+        settings = body.get("settings", {})
+        card_filter = settings.get("filter", {})
+        root_id = card_filter.get("imtID")
+        text_search = card_filter.get("textSearch")
+        cursor = settings.get("cursor", {})
+        limit = min(int(cursor.get("limit", 100)), self.settings.cards_page_size)
+        after_nm = cursor.get("nmID")
+
+        if text_search:
+            # поиск по артикулу продавца или nmID — в пределах кабинета
+            candidates = [
+                nm for nm in self.nm_by_supplier.get(company.id, [])
+                if text_search in (f"VC-{nm}", str(nm))
+            ]
+        else:
+            candidates = self.nm_by_root.get(root_id, [])
+        nm_ids = sorted(
+            nm for nm in candidates
+            if self.cards[nm][0] is company and (after_nm is None or nm > after_nm)
+        )
+        page = nm_ids[:limit]
+        cards = [make_card(company, self.cards[nm][1], nm, self.cards[nm][2]) for nm in page]
+        return web.json_response({
+            "cards": cards,
+            "cursor": {
+                "updatedAt": "2024-06-01T00:00:00Z",
+                "nmID": page[-1] if page else after_nm,
+                "total": len(page),
+            },
+        })
+
+    async def cards_update(self, request: web.Request) -> web.Response:
+        self.stats["cards_update"] += 1
+        await self._delay()
+        company, error = self._auth(request)
+        if error is not None:
+            return error
+
+        cards = await request.json()
+        if not isinstance(cards, list) or len(cards) > 3000:
+            return web.json_response({"error": True, "errorText": "bad request"}, status=400)
+
+        self.stats["cards_updated"] += len(cards)
+        errors = self.update_errors.setdefault(company.api_key, {})
+        updated_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        for card in cards:
+            nm_id = card.get("nmID")
+            current = self.cards.get(nm_id)
+            if current is None or current[0] is not company or not card.get("brand"):
+                continue
+            if self.rnd.random() < self.settings.update_fail_rate:
+                # как у WB: 200 на весь батч, отказ по карточке — только в error/list
+                self.stats["cards_update_failed"] += 1
+                vendor_code = card.get("vendorCode") or f"VC-{nm_id}"
+                errors[vendor_code] = {
+                    "object": "Футболки", "vendorCode": vendor_code, "updateAt": updated_at,
+                    "errors": ["Бренд временно недоступен для карточки"], "objectID": 105,
+                }
+                continue
+            errors.pop(card.get("vendorCode") or f"VC-{nm_id}", None)  # удачное обновление снимает ошибку
+            self.cards[nm_id] = (company, current[1], card["brand"])
+
+        return web.json_response({"data": None, "error": False, "errorText": "", "additionalErrors": {}})
+
+    async def cards_errors(self, request: web.Request) -> web.Response:
+        self.stats["cards_errors"] += 1
+        await self._delay()
+        company, error = self._auth(request)
+        if error is not None:
+            return error
+
+        data = list(self.update_errors.get(company.api_key, {}).values())
+        return web.json_response({"data": data, "error": False, "errorText": "", "additionalErrors": None})
+
+    # ---------- catalog ----------
+
+    def _supplier_products(self, supplier: int, brand_filter: set[int] | None) -> list[dict]:
+        products = []
+        for nm_id in self.nm_by_supplier.get(supplier, []):
+            _, root_id, brand = self.cards[nm_id]
+            brand_id = self.brand_ids.get(brand, 0)
+            if brand_filter and brand_id not in brand_filter:
+                continue
+            products.append({
+                "id": nm_id, "root": root_id, "brand": brand, "brandId": brand_id,
+                "supplierId": supplier, "name": f"Футболка хлопковая {nm_id}",
+            })
+        return products
+
+    async def catalog(self, request: web.Request) -> web.Response:
+        self.stats["catalog"] += 1
+        await self._delay()
+        blocked = self._antibot(request)
+        if blocked is not None:
+            return blocked
+
+        q = request.query
+        supplier = int(q.get("supplier", "0"))
+        page = max(1, int(q.get("page", "1")))
+        fbrand = {int(b) for b in q.get("fbrand", "").split(";") if b.isdigit()} or None
+
+        products = self._supplier_products(supplier, fbrand)
+        size = self.settings.catalog_page_size
+        chunk = products[(page - 1) * size: page * size]
+        return web.json_response({"products": chunk, "total": len(products)})
+
+    async def filters(self, request: web.Request) -> web.Response:
+        self.stats["filters"] += 1
+        await self._delay()
+        blocked = self._antibot(request)
+        if blocked is not None:
+            return blocked
+
+        supplier = int(request.query.get("supplier", "0"))
+        counts = Counter(p["brandId"] for p in self._supplier_products(supplier, None))
+        items = [{"id": brand_id, "count": n} for brand_id, n in counts.items()]
+        return web.json_response({"data": {"filters": [{"key": "fbrand", "name": "Бренд", "items": items}]}})
+
+    async def stats_handler(self, request: web.Request) -> web.Response:
+        return web.Response(text=json.dumps(dict(self.stats)), content_type="application/json")
+
+    def app(self) -> web.Application:
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post("/content/v2/get/cards/list", self.cards_list)
+        app.router.add_post("/content/v2/cards/update", self.cards_update)
+        app.router.add_get("/content/v2/cards/error/list", self.cards_errors)
+        for prefix in ("", "/__internal/u-catalog"):
+            app.router.add_get(f"{prefix}/sellers/v4/catalog", self.catalog)
+            app.router.add_get(f"{prefix}/sellers/v8/filters", self.filters)
+        app.router.add_get("/__stats", self.stats_handler)
+        return app
+
+
+async def start_mock(mock: MockWB, host: str = "127.0.0.1", port: int = 8081) -> web.AppRunner:
+    runner = web.AppRunner(mock.app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+def add_mock_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--companies", type=int, default=5)
+    parser.add_argument("--roots", type=int, default=50, help="root_id на компанию")
+    parser.add_argument("--cards", type=int, default=3, help="карточек (nmID) на root")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--token-rate", type=float, default=5.0)
+    parser.add_argument("--token-burst", type=int, default=10)
+    parser.add_argument("--antibot-498", type=float, default=0.0)
+    parser.add_argument("--antibot-html", type=float, default=0.0)
+    parser.add_argument("--catalog-ip-rate", type=float, default=0.0, help="запросов каталога/с на IP до 498")
+    parser.add_argument("--catalog-ip-burst", type=int, default=5)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--update-fail-rate", type=float, default=0.0, help="доля карточек, не применённых WB")
+
+
+def settings_from_args(args) -> MockSettings:
+    return MockSettings(
+        latency=args.latency, jitter=args.jitter,
+        token_rate=args.token_rate, token_burst=args.token_burst,
+        antibot_498=args.antibot_498, antibot_html=args.antibot_html,
+        catalog_ip_rate=args.catalog_ip_rate, catalog_ip_burst=args.catalog_ip_burst,
+        catalog_page_size=args.page_size, update_fail_rate=args.update_fail_rate, seed=args.seed,
+    )
+
+
+def serve(fleet: Fleet, settings: MockSettings, host: str, port: int) -> None:
+    """Точка входа для отдельного процесса."""
+    web.run_app(MockWB(fleet, settings).app(), host=host, port=port, access_log=None, print=None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Мок WB API")
+    add_mock_arguments(parser)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    args = parser.parse_args()
+
+    fleet = generate_fleet(args.companies, args.roots, args.cards, seed=args.seed)
+    print(f"Мок WB на http://{args.host}:{args.port}: компаний {len(fleet.companies)}, root {fleet.roots_total}")
+    serve(fleet, settings_from_args(args), args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Локальная замена прокси для пула выходов каталога (utils/proxy_pool.py).
+
+HTTP CONNECT-прокси на asyncio: aiohttp_socks с http:// всегда туннелирует
+через CONNECT. Каждый прокси ходит к цели со своего адреса 127.0.0.N
+(в Linux весь 127.0.0.0/8 — loopback), поэтому мок с --catalog-ip-rate
+видит их как разных клиентов — как WB видит разные выходные IP.
+
+    python -m benchmarks.proxy_stub --count 3 --base-port 18080
+    CATALOG_PROXIES=http://127.0.0.1:18080,http://127.0.0.1:18081,http://127.0.0.1:18082
+"""
+import argparse
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+async def _pipe(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        while data := await reader.read(65536):
+            writer.write(data)
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+class StubProxy:
+    def __init__(self, source_ip: str = "127.0.0.1"):
+        self.source_ip = source_ip
+        self.tunnels = 0
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        request_line = (await reader.readline()).decode("latin-1").strip()
+        while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+            pass  # заголовки запроса прокси не нужны
+
+        method, _, rest = request_line.partition(" ")
+        target = rest.split(" ", 1)[0]
+        if method != "CONNECT" or ":" not in target:
+            writer.write(b"HTTP/1.1 405 Method Not Allowed\r\n\r\n")
+            await writer.drain()
+            writer.close()
+            return
+
+        host, port = target.rsplit(":", 1)
+        try:
+            upstream_reader, upstream_writer = await asyncio.open_connection(
+                host, int(port), local_addr=(self.source_ip, 0),
+            )
+        except OSError as e:
+            logger.warning("CONNECT %s через %s: %s", target, self.source_ip, e)
+            writer.write(b"HTTP/1.1 502 Bad Gateway\r\n\r\n")
+            await writer.drain()
+            writer.close()
+            return
+
+        self.tunnels += 1
+        writer.write(b"HTTP/1.1 200 Connection established\r\n\r\n")
+        await writer.drain()
+        await asyncio.gather(_pipe(reader, upstream_writer), _pipe(upstream_reader, writer))
+
+
+async def start_proxies(count: int, host: str = "127.0.0.1", base_port: int = 18080) -> list[asyncio.AbstractServer]:
+    servers = []
+    for n in range(count):
+        proxy = StubProxy(source_ip=f"127.0.0.{n + 2}")
+        servers.append(await asyncio.start_server(proxy.handle, host, base_port + n))
+    return servers
+
+
+def proxy_urls(count: int, host: str = "127.0.0.1", base_port: int = 18080) -> list[str]:
+    return [f"http://{host}:{base_port + n}" for n in range(count)]
+
+
+def serve(count: int, host: str, base_port: int) -> None:
+    """Точка входа для отдельного процесса."""
+
+    async def run():
+        servers = await start_proxies(count, host, base_port)
+        await asyncio.gather(*(server.serve_forever() for server in servers))
+
+    asyncio.run(run())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальные CONNECT-прокси для пула выходов каталога")
+    parser.add_argument("--count", type=int, default=3)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--base-port", type=int, default=18080)
+    args = parser.parse_args()
+
+    print("CATALOG_PROXIES=" + ",".join(proxy_urls(args.count, args.host, args.base_port)))
+    try:
+        serve(args.count, args.host, args.base_port)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
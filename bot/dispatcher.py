@@ -1,4 +1,7 @@
+import asyncio
+import logging
 import os
+import time
 
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
@@ -8,11 +11,40 @@ from aiogram.enums import ParseMode
 from config import Config, config
 from db_access_control import DBAccessControlMiddleware
 from scheduler import schedule_all_tasks
+from utils.business_calendar import business_calendar
+from utils.metrics import start_metrics_server, BOT_STARTUP_SECONDS
+from utils.offload import loop_lag, shutdown_executor
 from utils.handlers_utils import run_action
 from .handlers import router as handlers_router
 
+logger = logging.getLogger(__name__)
+
+
+class StartupTimer:
+    """Этапы старта бота: длительности в лог и в bot_startup_seconds."""
+
+    def __init__(self, started: float | None = None):
+        self.started = started if started is not None else time.perf_counter()
+        self._last = self.started
+        self.stages: dict[str, float] = {}
+
+    def mark(self, stage: str) -> None:
+        now = time.perf_counter()
+        self.stages[stage] = now - self._last
+        self._last = now
+        BOT_STARTUP_SECONDS.labels(stage).set(self.stages[stage])
+
+    def done(self) -> None:
+        total = time.perf_counter() - self.started
+        BOT_STARTUP_SECONDS.labels("total").set(total)
+        stages = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in self.stages.items())
+        logger.info("🚀 Бот принимает апдейты через %.2fs после старта (%s)", total, stages)
+
+
+async def start_bot(started: float | None = None):
+    timer = StartupTimer(started)
+    timer.mark("import")
 
-async def start_bot():
     proxy = os.getenv("HTTPS_PROXY") or os.getenv("HTTP_PROXY")
     session = AiohttpSession(proxy=proxy) if proxy else AiohttpSession()
 
@@ -26,10 +58,34 @@ async def start_bot():
     dp.message.outer_middleware(DBAccessControlMiddleware(config.AsyncSessionLocal))
     dp.include_router(handlers_router)
 
-    print("Бот запущен...")
+    async def on_startup():
+        # startup-хендлеры aiogram вызываются прямо перед первым getUpdates
+        timer.mark("polling")
+        timer.done()
+
+    dp.startup.register(on_startup)
+
+    logger.info("Бот запущен...")
+
+    metrics_runner = None
+    if Config.METRICS_PORT:
+        metrics_runner = await start_metrics_server(Config.METRICS_HOST, Config.METRICS_PORT)
+    timer.mark("setup")
 
+    loop_lag.start()
     try:
-        await schedule_all_tasks(config.AsyncSessionLocal, run_action, bot)
+        # календарь и задачи — по запросу в БД, параллельно; уведомления о задачах уйдут фоном
+        await asyncio.gather(
+            business_calendar.load(config.AsyncSessionLocal),
+            schedule_all_tasks(config.AsyncSessionLocal, run_action, bot),
+        )
+        business_calendar.start_auto_refresh()
+        timer.mark("restore")
         await dp.start_polling(bot)
     finally:
-        await bot.session.close()
\ No newline at end of file
+        business_calendar.stop_auto_refresh()
+        loop_lag.stop()
+        shutdown_executor()
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        await bot.session.close()
@@ -1,22 +1,55 @@
+import asyncio
+import os
+import tempfile
 from datetime import time
 
 from aiogram import Router, F
 from aiogram.types import Message
-from aiogram.filters import Command
+from aiogram.filters import Command, StateFilter
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State, StatesGroup
 
 import re
 
 from config import config
 from scheduler import schedule_weekly_task
+from services.nomenclature_service import import_nomenclature_file
+from services.run_stat_service import get_last_run_stats, phase_percentiles
+from services.run_plan_service import cancel_plan
 from services.schedule_service import save_schedule
-from utils.handlers_utils import run_action
-from .keyboards import main_menu, schedule_menu, mode_menu
+from services.scope_service import scope_by_company, scope_by_brand, scope_by_roots
+from utils.handlers_utils import run_action, send_long_text, plan_action, run_plan_action
+from utils.import_utils import parse_root_ids, read_root_ids
+from utils.run_scope import RunScope
+from .keyboards import main_menu, schedule_menu, mode_menu, scope_menu
 
 router = Router()
 
 
 
 user_context = {}  # временное хранилище статуса пользователя
+plan_requested: set[int] = set()  # выбор режима all_from ведёт к плану, а не к запуску
+user_scope: dict[int, RunScope] = {}  # выборочный запуск: отбор действует на один запуск или до сброса
+
+
+class ScopeInput(StatesGroup):
+    """Какой отбор ждём следующим сообщением (текст или файл)."""
+    company = State()
+    brand = State()
+    roots = State()
+
+
+class ImportInput(StatesGroup):
+    """После «Импорт номенклатуры» ждём файл — только он пишет в nomenclature."""
+    file = State()
+
+
+SCOPE_PROMPTS = {
+    "По компании": (ScopeInput.company, "Пришлите название компании или WB id поставщика."),
+    "По бренду": (ScopeInput.brand, "Пришлите бренд — возьмём root, у которых он original_brand в номенклатуре."),
+    "По списку root": (ScopeInput.roots, "Пришлите root id текстом (через пробел, запятую или с новой строки) "
+                                         "или файлом .txt / .csv / .xlsx (колонка root_id или первая колонка)."),
+}
 
 DAYS_MAPPING = {
     "ПН": 0,
@@ -33,22 +66,101 @@ async def cmd_start(message: Message):
     await message.answer("Привет! Я бот WB!", reply_markup=main_menu)
 
 
+@router.message(Command("stats"))
+async def cmd_stats(message: Message):
+    """/stats [N] — последние N запусков и p50/p95 по фазам."""
+    parts = (message.text or "").split()
+    limit = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 10
+    limit = max(1, min(limit, 100))
+
+    async with config.AsyncSessionLocal() as session:
+        runs = await get_last_run_stats(session, limit)
+
+    if not runs:
+        await message.answer("Запусков пока не было.")
+        return
+
+    lines = [f"📊 Последние запуски ({len(runs)}):"]
+    for run in runs:
+        phases = " ".join(f"{name}={seconds:.0f}s" for name, seconds in (run.phases or {}).items())
+        mark = "✅" if run.status == "ok" else "❌"
+        line = (
+            f"{mark} {run.started_at:%d.%m %H:%M} {run.action} {run.duration:.0f}s | {phases} | "
+            f"req={run.requests} retry={run.retries} | "
+            f"cards {run.cards_fetched}/{run.cards_decided}/{run.cards_sent}/{run.cards_failed}"
+        )
+        if run.companies:
+            slowest = max(run.companies, key=run.companies.get)
+            line += f" | last {slowest} {run.companies[slowest]:.0f}s"
+        lines.append(line)
+
+    lines.append("")
+    lines.append("⏱️ p50 / p95 по фазам (успешные запуски):")
+    for name, (p50, p95) in phase_percentiles(runs).items():
+        lines.append(f"{name}: {p50:.1f}s / {p95:.1f}s")
+    lines.append("")
+    lines.append("cards: получено/к изменению/отправлено/ошибок")
+
+    await send_long_text(message, "\n".join(lines))
+
+
+def _choose_action_text(user_id: int) -> str:
+    scope = user_scope.get(user_id)
+    if scope is None:
+        return "Выберите действие:"
+    return f"🎯 Отбор: {scope.describe()}\nВыберите действие:"
+
+
 @router.message(F.text == "All To")
 async def handle_all_to_entry(message: Message):
     user_context[message.from_user.id] = "all_to"
-    await message.answer("Выберите действие:", reply_markup=schedule_menu)
+    await message.answer(_choose_action_text(message.from_user.id), reply_markup=schedule_menu)
 
 
 @router.message(F.text == "All From")
 async def handle_all_from_entry(message: Message):
     user_context[message.from_user.id] = "all_from"
-    await message.answer("Выберите действие:", reply_markup=schedule_menu)
+    await message.answer(_choose_action_text(message.from_user.id), reply_markup=schedule_menu)
 
 
 @router.message(lambda m: m.text == "Меню")
-async def handle_back(message: Message):
+async def handle_back(message: Message, state: FSMContext):
+    plan_requested.discard(message.from_user.id)
+    await state.clear()
     await message.answer("Вы вернулись в главное меню.", reply_markup=main_menu)
 
+
+@router.message(F.text == "Выборочный запуск")
+async def handle_scope_entry(message: Message):
+    scope = user_scope.get(message.from_user.id)
+    current = f"Сейчас: {scope.describe()}\n" if scope is not None else ""
+    await message.answer(
+        f"{current}Запуск только по компании, бренду или списку root — тем же пайплайном, "
+        "запросов к WB по размеру отбора. Выберите отбор:",
+        reply_markup=scope_menu,
+    )
+
+
+@router.message(F.text.in_(SCOPE_PROMPTS.keys()))
+async def handle_scope_kind(message: Message, state: FSMContext):
+    kind, prompt = SCOPE_PROMPTS[message.text]
+    await state.set_state(kind)
+    await message.answer(prompt)
+
+
+@router.message(F.text == "Сбросить отбор")
+async def handle_scope_reset(message: Message, state: FSMContext):
+    user_scope.pop(message.from_user.id, None)
+    await state.clear()
+    await message.answer("Отбор сброшен — запуски снова по всему флоту.", reply_markup=main_menu)
+
+async def _run_scoped(message: Message, action: str, weekend_override: bool | None = None):
+    """Запуск по отбору пользователя; отбор одноразовый — после запуска снова весь флот."""
+    scope = user_scope.pop(message.from_user.id, None)
+    await run_action(message, action, weekend_override=weekend_override, scope=scope)
+    if scope is not None:
+        await message.answer(f"🎯 Отбор «{scope.describe()}» сброшен — следующий запуск по всему флоту.")
+
 #
 # @router.message(F.text == "Запустить сейчас")
 # async def handle_run_now(message: Message):
@@ -60,12 +172,13 @@ async def handle_back(message: Message):
 @router.message(F.text == "Запустить сейчас")
 async def handle_run_now(message: Message):
     action = user_context.get(message.from_user.id)
+    plan_requested.discard(message.from_user.id)
     if action == "all_from":
         # показываем выбор режима
         await message.answer("Выберите режим запуска:", reply_markup=mode_menu)
         return
     # обычный запуск all_to
-    await run_action(message, action)
+    await _run_scoped(message, action)
     await message.answer("Меню", reply_markup=main_menu)
 
 
@@ -73,15 +186,52 @@ async def handle_run_now(message: Message):
 @router.message(F.text == "Режим: выходные")
 async def handle_mode_weekend(message: Message):
     # запуск all_from в режиме выходных
-    await run_action(message, "all_from", weekend_override=True)
+    if message.from_user.id in plan_requested:
+        plan_requested.discard(message.from_user.id)
+        await plan_action(message, "all_from", weekend_override=True, scope=user_scope.get(message.from_user.id))
+    else:
+        await _run_scoped(message, "all_from", weekend_override=True)
     await message.answer("Меню", reply_markup=main_menu)
 
 @router.message(F.text == "Режим: будни")
 async def handle_mode_weekday(message: Message):
     # запуск all_from в режиме будних
-    await run_action(message, "all_from", weekend_override=False)
+    if message.from_user.id in plan_requested:
+        plan_requested.discard(message.from_user.id)
+        await plan_action(message, "all_from", weekend_override=False, scope=user_scope.get(message.from_user.id))
+    else:
+        await _run_scoped(message, "all_from", weekend_override=False)
     await message.answer("Меню", reply_markup=main_menu)
 
+
+@router.message(F.text == "Посчитать план")
+async def handle_plan(message: Message):
+    action = user_context.get(message.from_user.id)
+    if action == "all_from":
+        plan_requested.add(message.from_user.id)
+        await message.answer("Выберите режим для плана:", reply_markup=mode_menu)
+        return
+    if action != "all_to":
+        await message.answer("Сначала выберите All To или All From.", reply_markup=main_menu)
+        return
+    await plan_action(message, action, scope=user_scope.get(message.from_user.id))
+    await message.answer("Меню", reply_markup=main_menu)
+
+
+@router.message(F.text.regexp(r"^/approve_(\d+)$"))
+async def handle_plan_approve(message: Message):
+    plan_id = int(message.text.split("_", 1)[1])
+    await run_plan_action(message, plan_id)
+    await message.answer("Меню", reply_markup=main_menu)
+
+
+@router.message(F.text.regexp(r"^/cancel_(\d+)$"))
+async def handle_plan_cancel(message: Message):
+    plan_id = int(message.text.split("_", 1)[1])
+    async with config.AsyncSessionLocal() as session:
+        cancelled = await cancel_plan(session, plan_id)
+    await message.answer(f"План #{plan_id} отменён." if cancelled else f"План #{plan_id} уже не ждёт подтверждения.")
+
 @router.message(F.text == "Задать расписание")
 async def handle_schedule_request(message: Message):
     await message.answer("Введите время запуска в формате ДД ЧЧ:ММ (по московскому времени):")
@@ -123,4 +273,111 @@ async def handle_schedule_day_time(message: Message):
             reply_markup=main_menu
         )
     except Exception as e:
-        await message.answer(f"Ошибка при создании задачи: {e}")
\ No newline at end of file
+        await message.answer(f"Ошибка при создании задачи: {e}")
+
+
+@router.message(F.text == "Импорт номенклатуры")
+async def handle_import_entry(message: Message, state: FSMContext):
+    # файл после этой кнопки — номенклатура, даже если до неё ждали отбор
+    await state.set_state(ImportInput.file)
+    await message.answer(
+        "Пришлите файл .xlsx или .csv с колонками root_id, wb_article, original_brand "
+        "и (необязательно) company_id — WB id поставщика.\n"
+        "Если колонки company_id нет, укажите id поставщика в подписи к файлу."
+    )
+
+
+async def _read_root_ids_document(message: Message) -> set[int]:
+    ext = os.path.splitext(message.document.file_name or "")[1].lower()
+    fd, path = tempfile.mkstemp(suffix=ext)
+    os.close(fd)
+    try:
+        await message.bot.download(message.document, destination=path)
+        # разбор XLSX — CPU и диск: не на event loop, как и импорт номенклатуры
+        return await asyncio.to_thread(read_root_ids, path)
+    finally:
+        os.remove(path)
+
+
+# после всех кнопок меню: в состоянии ScopeInput любое другое сообщение (текст или файл) —
+# ответ на запрос отбора; файлы импорта номенклатуры — только в состоянии ImportInput ниже
+@router.message(StateFilter(ScopeInput))
+async def handle_scope_input(message: Message, state: FSMContext):
+    user_id = message.from_user.id
+    kind = await state.get_state()
+    text = (message.text or "").strip()
+    missing: set[int] = set()
+
+    if kind == ScopeInput.roots.state:
+        try:
+            root_ids = await _read_root_ids_document(message) if message.document else parse_root_ids(text)
+        except ValueError as e:
+            await message.answer(f"Ошибка в файле: {e}")
+            return
+        if not root_ids:
+            await message.answer("Не нашёл ни одного root id — пришлите числа текстом или файлом.")
+            return
+        async with config.AsyncSessionLocal() as session:
+            scope, missing = await scope_by_roots(session, root_ids)
+    elif not text:
+        await message.answer("Пришлите отбор текстом.")
+        return
+    else:
+        async with config.AsyncSessionLocal() as session:
+            if kind == ScopeInput.company.state:
+                scope = await scope_by_company(session, text)
+            else:
+                scope = await scope_by_brand(session, text)
+
+    if scope is None:
+        await message.answer("Ничего не нашлось в номенклатуре — попробуйте ещё раз или нажмите «Меню».")
+        return
+
+    await state.clear()
+    user_scope[user_id] = scope
+    lines = [f"🎯 Отбор: {scope.describe()}"]
+    if missing:
+        sample = ", ".join(map(str, sorted(missing)[:20]))
+        lines.append(f"⚠️ Нет в номенклатуре root: {len(missing)} ({sample}{', …' if len(missing) > 20 else ''})")
+    lines.append("Дальше All To или All From — план и ближайший запуск пойдут только по отбору, "
+                 "после запуска отбор сбросится. Расписание всегда на весь флот; "
+                 "«Сбросить отбор» — в меню выборочного запуска.")
+    await message.answer("\n".join(lines), reply_markup=main_menu)
+
+
+@router.message(ImportInput.file, F.document)
+async def handle_import_document(message: Message, state: FSMContext):
+    document = message.document
+    ext = os.path.splitext(document.file_name or "")[1].lower()
+    if ext not in (".xlsx", ".xlsm", ".csv"):
+        await message.answer("Поддерживаются только файлы .xlsx и .csv")
+        return
+
+    caption = (message.caption or "").strip()
+    default_company_id = int(caption) if caption.isdigit() else None
+
+    fd, path = tempfile.mkstemp(suffix=ext)
+    os.close(fd)
+    try:
+        await message.bot.download(document, destination=path)
+        await message.answer("⏳ Импортирую номенклатуру...")
+        report = await import_nomenclature_file(config.engine, path, default_company_id=default_company_id)
+    except ValueError as e:
+        # состояние не сбрасываем: можно сразу прислать исправленный файл
+        await message.answer(f"Ошибка в файле: {e}")
+        return
+    finally:
+        os.remove(path)
+
+    await state.clear()
+    await send_long_text(message, f"✅ Импорт завершён\n{report.summary()}")
+
+
+@router.message(F.document)
+async def handle_stray_document(message: Message):
+    # файл без «Импорт номенклатуры» (или после другого сценария) в базу не пишем
+    await message.answer(
+        "Файл не импортирован. Чтобы загрузить номенклатуру, нажмите «Импорт номенклатуры» "
+        "и пришлите файл ещё раз.",
+        reply_markup=main_menu,
+    )
@@ -4,6 +4,18 @@ main_menu = ReplyKeyboardMarkup(
     keyboard=[
         [KeyboardButton(text="All To")],
         [KeyboardButton(text="All From")],
+        [KeyboardButton(text="Выборочный запуск")],
+        [KeyboardButton(text="Импорт номенклатуры")],
+    ],
+    resize_keyboard=True
+)
+
+scope_menu = ReplyKeyboardMarkup(
+    keyboard=[
+        [KeyboardButton(text="По компании"), KeyboardButton(text="По бренду")],
+        [KeyboardButton(text="По списку root")],
+        [KeyboardButton(text="Сбросить отбор")],
+        [KeyboardButton(text="Меню")],
     ],
     resize_keyboard=True
 )
@@ -12,6 +24,7 @@ main_menu = ReplyKeyboardMarkup(
 schedule_menu = ReplyKeyboardMarkup(
     keyboard=[
         [KeyboardButton(text="Запустить сейчас")],
+        [KeyboardButton(text="Посчитать план")],
         [KeyboardButton(text="Задать расписание")],
         [KeyboardButton(text="Меню")],
     ],
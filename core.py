@@ -1,23 +1,87 @@
 import asyncio
 import json
-from collections import defaultdict
+import logging
+import math
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
 from typing import Any
 
 from api_client import WBClientAPI
 from config import config
-from errors import AuthorizationError, RootIDError, UpdateCardsError
+from errors import AuthorizationError, RootIDError, UpdateCardsError, CircuitOpenError, DeadlineExceeded
 from services.company_service import get_sorted_companies, get_companies_with_nomenclature, get_company_by_api_key, \
     get_all_companies, get_company_by_api_key_safe
-from utils.core_utils import split_into_batches, is_weekend, filter_card_top_level
 from services.brand_service import get_night_brands, get_night_brand_wbids, get_all_brand_wbids_except_default, \
     is_night_brand
+from utils.core_utils import is_weekend, prepare_payloads, filter_card_top_level, DedupIndex
+from utils.run_export import RunExport, STATUS_SKIPPED, STATUS_FAILED
+from models.work_queue import PHASE_APPLY, PHASE_VERIFY
+from services.card_cache_service import save_card_cache, get_card_cache
+from utils.retry_policy import deadline_scope
+from utils.run_stats import RunStats
+from utils.log_utils import sampler
+from utils.metrics import PIPELINE_CARDS, key_label
+from utils.offload import map_chunks
+from utils.batch_sizer import get_batch_sizer, MAX_BATCH
+from utils.fair_scheduler import FairScheduler, lane_of
+from utils.quota_manager import KEY_BASE_INTERVAL, UPDATE_BASE_INTERVAL
+from utils.run_plan import endpoint_latency
+
+logger = logging.getLogger(__name__)
 
 REQUEST_DELAY_ONE_SECOND = 1
-REQUEST_DELAY_SIX_SECONDS = 6
-BATCH_LIMIT = 3000
+VERIFY_DELAY_SECONDS = 10  # даём WB применить обновления перед проверкой каталога
+VERIFY_REPORT_LIMIT = 20   # строк с ошибками WB в сообщении о запуске
+BATCH_LIMIT = MAX_BATCH  # предел WB на cards/update; текущий размер батча — get_batch_sizer
 
-async def run_all_from(*, weekend_override: bool | None = None) -> list[str]:
-    error_send: list[str] = []
+# api_key -> название компании и полоса приоритета, для меток метрик и расписания в send_cards (там есть только ключ)
+_company_names_by_key: dict[str, str] = {}
+_company_lanes_by_key: dict[str, int] = {}
+
+
+def _remember_company(company) -> None:
+    _company_names_by_key[company.api_key] = company.name
+    _company_lanes_by_key[company.api_key] = lane_of(company.cabinet_order)
+
+
+def _company_label(api_key: str | None) -> str:
+    return _company_names_by_key.get(api_key or "", key_label(api_key))
+
+
+def _scheduler(stats: RunStats | None) -> FairScheduler:
+    """Слоты fetch/send между компаниями; готовность компаний — в статистику запуска."""
+    return FairScheduler(on_done=stats.company_done if stats is not None else None)
+
+async def run_all_from(
+    *,
+    weekend_override: bool | None = None,
+    export: RunExport | None = None,
+    stats: RunStats | None = None,
+    deadline: float | None = None,
+    company_ids: set[int] | None = None,
+    company_roots: dict[int, set[int]] | None = None,
+) -> list[str]:
+    """
+    deadline — срок запуска в секундах (по умолчанию Config.RUN_DEADLINE_SECONDS).
+    Срок виден всем запросам к WB внутри запуска; по истечении летит DeadlineExceeded.
+    company_ids / company_roots — выборочный запуск (utils/run_scope.py), None — весь флот.
+    """
+    with deadline_scope(config.RUN_DEADLINE_SECONDS if deadline is None else deadline):
+        return await _run_all_from(
+            weekend_override=weekend_override, export=export, stats=stats,
+            company_ids=company_ids, company_roots=company_roots,
+        )
+
+
+async def _run_all_from(
+    *,
+    weekend_override: bool | None,
+    export: RunExport | None,
+    stats: RunStats | None,
+    company_ids: set[int] | None = None,
+    company_roots: dict[int, set[int]] | None = None,
+) -> list[str]:
+    stats = stats or RunStats("all_from")
 
     # определяем режим
     if weekend_override is None:
@@ -26,178 +90,627 @@ async def run_all_from(*, weekend_override: bool | None = None) -> list[str]:
         weekend = weekend_override
 
     if weekend:
-        print("Сегодня выходной (или выбран режим выходных) — применяем ночную логику брендов.")
+        logger.info("Сегодня выходной (или выбран режим выходных) — применяем ночную логику брендов.")
     else:
-        print("Сегодня будний (или выбран режим будних) — бренды приводим к default_brand.")
+        logger.info("Сегодня будний (или выбран режим будних) — бренды приводим к default_brand.")
 
-    all_cards = await process_cards()
+    sent_at = datetime.now(timezone.utc)
+    error_send, _, updated_cards = await _all_from_apply(
+        weekend, export=export, stats=stats, company_ids=company_ids, company_roots=company_roots,
+    )
+    error_send.extend(await _verify_after_send(
+        updated_cards or [], weekend, stats, company_ids=company_ids, since=sent_at,
+    ))
 
-    updated_cards, tg_messages = await process_brands(all_cards, weekend)
-    if tg_messages:
-        error_send.append("Неизменившиеся  каточки:")
-        error_send.extend(tg_messages)
+    return error_send
 
-    prepared_cards: list[dict[str, Any]] = []
-    for card in (updated_cards or []):
-        api_key = card.get("api_key")
-        if not api_key:
-            print("run_all_from Пропущена карточка без API-ключа")
-            continue
-        payload = filter_card_top_level(card)
-        payload["api_key"] = api_key
-        prepared_cards.append(payload)
 
-    error_send_card = await send_cards(prepared_cards)
+async def _all_from_apply(
+    weekend: bool,
+    *,
+    export: RunExport | None,
+    stats: RunStats,
+    company_ids: set[int] | None = None,
+    company_roots: dict[int, set[int]] | None = None,
+) -> tuple[list[str], list[dict], list[dict]]:
+    """Фазы fetch/decide/send all_from. Возвращает (ошибки, все карточки, отправленные)."""
+    error_send: list[str] = []
+
+    with stats.phase("fetch"):
+        all_cards = await process_cards(export=export, stats=stats, company_ids=company_ids, company_roots=company_roots)
+    stats.add_cards("fetched", len(all_cards))
+
+    with stats.phase("decide"):
+        updated_cards, tg_messages = await process_brands(all_cards, weekend, export=export)
+        if tg_messages:
+            error_send.append("Неизменившиеся  каточки:")
+            error_send.extend(tg_messages)
+
+        # фильтрация полей тысяч карточек — CPU: кусками в пуле, loop свободен для поллинга
+        prepared_cards = await map_chunks("filter", prepare_payloads, updated_cards or [])
+        if len(prepared_cards) < len(updated_cards or []):
+            sampler.throttle(logger, "run_all_from_no_key", 10.0, logging.WARNING,
+                             "run_all_from Пропущено карточек без API-ключа: %s",
+                             len(updated_cards) - len(prepared_cards))
+    stats.add_cards("decided", len(prepared_cards))
+
+    with stats.phase("send"):
+        error_send_card = await send_cards(prepared_cards, export=export, stats=stats)
     if error_send_card:
         error_send.append("Ошибки:")
         error_send.extend(error_send_card)
 
-    await asyncio.sleep(10)
+    return error_send, all_cards, updated_cards
+
+
+async def run_unit(
+    action: str,
+    phase: str,
+    company_id: int,
+    *,
+    weekend: bool | None,
+    export: RunExport | None = None,
+    stats: RunStats | None = None,
+    since: datetime | None = None,
+    company_roots: dict[int, set[int]] | None = None,
+) -> list[str]:
+    """
+    Одна единица очереди работ: фаза запуска для одной компании (см. worker.py).
+    all_from: apply — fetch/decide/send, verify — проверка и повтор непринятых;
+    all_to: apply — весь пайплайн all_to по компании. since — начало задания:
+    ошибки WB старше него к запуску не относятся. company_roots — отбор root задания.
+    """
+    stats = stats or RunStats(action)
+    scope = {company_id}
+
+    if action == "all_to" and phase == PHASE_APPLY:
+        return await _run_all_to(export=export, stats=stats, company_ids=scope, company_roots=company_roots)
+
+    if action == "all_from" and phase == PHASE_APPLY:
+        errors, _, _ = await _all_from_apply(
+            bool(weekend), export=export, stats=stats, company_ids=scope, company_roots=company_roots,
+        )
+        return errors
+
+    if action == "all_from" and phase == PHASE_VERIFY:
+        # отправленные карточки остались у воркера фазы apply
+        with stats.phase("verify"):
+            if config.VERIFY_MODE == "catalog":
+                # берём текущее состояние заново
+                cards = await process_cards(company_ids=scope, company_roots=company_roots)
+                return await _verify_and_retry(cards, bool(weekend), stats, company_ids=scope, decided=False)
+            return await _verify_by_error_list(None, bool(weekend), stats, company_ids=scope, since=since)
+
+    raise ValueError(f"Неизвестная единица работы: {action}/{phase}")
+
+
+def _in_scope(companies: list, company_ids: set[int] | None) -> list:
+    if company_ids is None:
+        return companies
+    return [company for company in companies if company.id in company_ids]
+
+
+def _root_selected(company_roots: dict[int, set[int]] | None, company, root_id: int) -> bool:
+    """root в отборе своей компании: тот же root у другой компании отбор не включает."""
+    return company_roots is None or root_id in company_roots.get(company.id, ())
+
+
+def _roots_count(company_roots: dict[int, set[int]]) -> int:
+    return sum(len(roots) for roots in company_roots.values())
+
+
+async def _verify_after_send(
+    sent_cards: list[dict],
+    weekend: bool,
+    stats: RunStats,
+    *,
+    company_ids: set[int] | None = None,
+    since: datetime | None = None,
+) -> list[str]:
+    """Фазы wait/verify после отправки all_from — по VERIFY_MODE."""
+    if config.VERIFY_MODE == "catalog":
+        with stats.phase("wait"):
+            await asyncio.sleep(VERIFY_DELAY_SECONDS)
+        with stats.phase("verify"):
+            return await _verify_and_retry(sent_cards, weekend, stats, company_ids=company_ids)
+
+    # паузы — внутри опроса списка ошибок
+    with stats.phase("verify"):
+        return await _verify_by_error_list(sent_cards, weekend, stats, company_ids=company_ids, since=since)
+
+
+async def _verify_by_error_list(
+    sent_cards: list[dict] | None,
+    weekend: bool,
+    stats: RunStats,
+    *,
+    company_ids: set[int] | None = None,
+    since: datetime | None = None,
+) -> list[str]:
+    """
+    Проверка по списку ошибок обновления WB (content/v2/cards/error/list).
+
+    Опрашиваем токены, на которые ушли карточки, и повторяем только те, что WB
+    отклонил, — стоимость растёт с числом ошибок, а не с размером каталога.
+    sent_cards=None — отправка была в другом процессе (единица verify очереди):
+    берём все ошибки токенов компании не старше since и дочитываем по артикулу
+    только отклонённые карточки. VERIFY_SPOT_CHECK_PAGES добавляет выборочную
+    сверку первых страниц каталога (только при известных sent_cards).
+    """
+    error_send: list[str] = []
 
     async with config.AsyncSessionLocal() as session:
-        companies = await get_all_companies(session)
+        companies = _in_scope(await get_all_companies(session), company_ids)
+    for company in companies:
+        _remember_company(company)
+
+    if sent_cards is not None:
+        expected: dict[str, set[str] | None] = defaultdict(set)
+        for card in sent_cards:
+            if card.get("api_key") and card.get("vendorCode"):
+                expected[card["api_key"]].add(card["vendorCode"])
+    else:
+        expected = {company.api_key: None for company in companies}
+    if not expected:
+        return error_send
+
+    failed = await _poll_update_errors(dict(expected), since)
+    failed_total = sum(len(codes) for codes in failed.values())
+    logger.info("🔎 Проверка по списку ошибок WB: токенов %s, карточек с ошибкой %s", len(expected), failed_total)
+
+    retry_cards: list[dict] = []
+    if sent_cards is not None:
+        by_code = {(card.get("api_key"), card.get("vendorCode")): card for card in sent_cards}
+        retry_cards = [by_code[(api_key, code)] for api_key, codes in failed.items() for code in codes
+                       if (api_key, code) in by_code]
+        if config.VERIFY_SPOT_CHECK_PAGES > 0:
+            leftovers, messages = await _catalog_leftovers(
+                companies, sent_cards, weekend, max_pages=config.VERIFY_SPOT_CHECK_PAGES,
+            )
+            error_send.extend(messages)
+            queued = {id(card) for card in retry_cards}
+            retry_cards.extend(card for card in leftovers if id(card) not in queued)
+        error_send.extend(await _resend(retry_cards, weekend, stats, decided=True))
+    else:
+        companies_by_key = {company.api_key: company for company in companies}
+        for api_key, codes in failed.items():
+            retry_cards.extend(await _fetch_by_vendor_codes(companies_by_key[api_key], codes))
+        error_send.extend(await _resend(retry_cards, weekend, stats, decided=False))
+
+    if failed_total:
+        error_send.append("Ошибки обновления WB:")
+        lines = [
+            f"❗️ {_company_label(api_key)}: {code} — {'; '.join(messages) or 'без описания'}"
+            for api_key, codes in failed.items() for code, messages in codes.items()
+        ]
+        error_send.extend(lines[:VERIFY_REPORT_LIMIT])
+        if len(lines) > VERIFY_REPORT_LIMIT:
+            error_send.append(f"… и ещё {len(lines) - VERIFY_REPORT_LIMIT}")
+    return error_send
+
+
+def _parse_wb_time(value: str | None) -> datetime | None:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+async def _poll_update_errors(
+    expected: dict[str, set[str] | None], since: datetime | None
+) -> dict[str, dict[str, list[str]]]:
+    """
+    {api_key: {vendorCode: [тексты ошибок]}} по отправленным карточкам.
 
+    WB применяет update асинхронно, поэтому список опрашивается с backoff
+    (VERIFY_POLL_DELAY, дальше вдвое, не больше VERIFY_POLLS раз). Токен снимается
+    с опроса, когда отклонено всё отправленное или непустой ответ не изменился
+    с прошлого опроса — обработка батча закончилась. Пустой список подряд ничего
+    не значит (WB мог ещё не дойти до батча) — такой токен опрашиваем до конца окна.
+    """
+    failed: dict[str, dict[str, list[str]]] = defaultdict(dict)
+    previous: dict[str, frozenset] = {}
+    pending = set(expected)
+    since = since.replace(microsecond=0) if since is not None else None  # updateAt WB — с точностью до секунды
+    delay = config.VERIFY_POLL_DELAY
+
+    for _ in range(config.VERIFY_POLLS):
+        if not pending:
+            break
+        await asyncio.sleep(delay)
+        delay *= 2
+
+        for api_key in list(pending):
+            async with WBClientAPI() as api:
+                entries = await api.get_update_errors(api_key)
+            if entries is None:
+                continue  # токен опросим в следующий раз
+
+            wanted = expected[api_key]
+            current: dict[str, list[str]] = {}
+            for entry in entries:
+                code = entry.get("vendorCode")
+                if not code or (wanted is not None and code not in wanted):
+                    continue
+                updated_at = _parse_wb_time(entry.get("updateAt"))
+                if since is not None and updated_at is not None and updated_at < since:
+                    continue  # ошибка прошлых запусков
+                current[code] = list(entry.get("errors") or [])
+
+            failed[api_key].update(current)
+            snapshot = frozenset(current)
+            settled = bool(snapshot) and previous.get(api_key) == snapshot
+            if (wanted is not None and len(failed[api_key]) >= len(wanted)) or settled:
+                pending.discard(api_key)
+            previous[api_key] = snapshot
+
+    return {api_key: codes for api_key, codes in failed.items() if codes}
+
+
+async def _fetch_by_vendor_codes(company, vendor_codes) -> list[dict]:
+    """Текущие карточки по артикулам продавца — запрос на артикул, только для отклонённых WB."""
+    cards: list[dict] = []
+    for code in vendor_codes:
+        try:
+            async with WBClientAPI() as api:
+                found = await api.get_cards_list(company.api_key, text_search=code)
+        except (AuthorizationError, DeadlineExceeded):
+            raise
+        except Exception as e:
+            logger.error("Ошибка получения карточки %s компании %s: %s", code, company.name, e)
+            continue
+        for card in found:
+            if card.get("vendorCode") != code:
+                continue  # textSearch ищет и по вхождению
+            card["root"] = card.get("imtID")
+            card["api_key"] = company.api_key
+            card["company_id"] = company.id
+            cards.append(card)
+    return cards
+
+
+async def _verify_brand_ids(company, weekend: bool) -> list[int]:
+    """wbID брендов, которых после all_from в каталоге компании быть не должно."""
+    async with config.AsyncSessionLocal() as session:
+        if weekend:
+            return await get_night_brand_wbids(
+                session, company.id, company.default_brand.name
+            )
+        # return await get_all_brand_wbids_except_default(
+        #     session, company.id, company.default_brand.name
+        # )
+        return await get_all_brand_wbids_except_default(
+            session, company.default_brand.name
+        )
+
+
+async def _catalog_leftovers(
+    companies: list, cards: list[dict], weekend: bool, *, max_pages: int | None = None
+) -> tuple[list[dict], list[str]]:
+    """
+    Карточки, чьи root всё ещё видны в каталоге под ненужным брендом, и
+    сообщения о пропущенных компаниях. max_pages — выборочная сверка.
+    """
+    error_send: list[str] = []
+    leftovers: list[dict] = []
+    by_company: dict[Any, list[dict]] = defaultdict(list)
+    for card in cards:
+        by_company[card.get("company_id")].append(card)
 
     for company in companies:
-        async with config.AsyncSessionLocal() as session:
-            if weekend:
-                wb_brand_ids = await get_night_brand_wbids(
-                    session, company.id, company.default_brand.name
-                )
-            else:
-                # wb_brand_ids = await get_all_brand_wbids_except_default(
-                #     session, company.id, company.default_brand.name
-                # )
-                wb_brand_ids = await get_all_brand_wbids_except_default(
-                    session, company.default_brand.name
-                )
+        company_cards = by_company.get(company.id)
+        if not company_cards:
+            continue
 
+        wb_brand_ids = await _verify_brand_ids(company, weekend)
         if not wb_brand_ids:
-            print(f"⛔️ Нет брендов для компании {company.name}")
+            logger.warning("⛔️ Нет брендов для компании %s", company.name)
             continue
-        async with WBClientAPI() as api:
-            products = await api.get_all_data_by_company_id_and_brands(company.id, wb_brand_ids)
-        print(f"📦 {len(products)} товаров найдено для компании {company.name}")
+        try:
+            async with WBClientAPI() as api:
+                # каталог ищем по WB supplier id (company_id), а не по id строки в БД
+                products = await api.get_all_data_by_company_id_and_brands(
+                    company.company_id, wb_brand_ids, max_pages=max_pages,
+                )
+        except CircuitOpenError as e:
+            # каталог под антиботом — не ждём, проверяем остальные компании
+            logger.warning("🔌 Проверка каталога для %s пропущена: %s", company.name, e)
+            error_send.append(f"⚠️ {company.name}: каталог WB недоступен (антибот), проверка пропущена")
+            continue
+        logger.info("📦 %s товаров найдено для компании %s", len(products), company.name)
 
         product_root_ids = {p.get("root") for p in products if p.get("root")}
-        retry_cards = [card for card in (updated_cards or []) if card.get("root") in product_root_ids]
-        if not retry_cards:
-            continue
+        leftovers.extend(card for card in company_cards if card.get("root") in product_root_ids)
+
+    return leftovers, error_send
 
-        failed_cards: list[dict[str, Any]] = []
-
-        for card in retry_cards:
-            root_id = card.get("root_id") or card.get("root")
-            try:
-                updated_cards, tg_messages = await process_brands(all_cards, weekend)  # <-- используем тот же weekend
-                print(f"🔁 Повторно обработан бренд для root_id={root_id}")
-                if tg_messages:
-                    error_send.append("Неизменившиеся  каточки:")
-                    error_send.extend(tg_messages)
-
-                retry_prepared = []
-                for c in updated_cards or []:
-                    api_key = c.get("api_key")
-                    if not api_key:
-                        continue
-                    p = filter_card_top_level(c)
-                    p["api_key"] = api_key
-                    retry_prepared.append(p)
-
-                resend_errors = await send_cards(retry_prepared)
-                if resend_errors:
-                    error_send.append("Ошибки при повторной отправке:")
-                    error_send.extend(resend_errors)
-
-            except Exception as e:
-                print(f"❌ Ошибка повторной обработки бренда root_id={root_id}: {e}")
-                failed_cards.append(card)
-
-        if failed_cards:
-            messages = [
-                f"❗️ Не удалось обработать бренд для root_id {card.get('root_id') or card.get('root')} (API ключ: {card.get('api_key', '—')})"
-                for card in failed_cards
-            ]
-            error_send.extend(messages)
 
+async def _resend(cards: list[dict], weekend: bool, stats: RunStats, *, decided: bool) -> list[str]:
+    """
+    Повторная отправка непринятых карточек — один раз. decided=True: в карточках
+    уже целевой бренд (отправлены этим процессом); иначе решаем заново.
+    """
+    error_send: list[str] = []
+    if not cards:
+        return error_send
+    try:
+        if not decided:
+            cards, tg_messages = await process_brands(cards, weekend)
+            if tg_messages:
+                error_send.append("Неизменившиеся  каточки:")
+                error_send.extend(tg_messages)
+
+        retry_prepared = await map_chunks("filter", prepare_payloads, cards)
+        if not retry_prepared:
+            return error_send
+        logger.info("🔁 Повторная отправка %s карточек", len(retry_prepared))
+        stats.add_cards("retried", len(retry_prepared))
+
+        resend_errors = await send_cards(retry_prepared, stats=stats)
+        if resend_errors:
+            error_send.append("Ошибки при повторной отправке:")
+            error_send.extend(resend_errors)
+
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        logger.error("❌ Ошибка повторной отправки %s карточек: %s", len(cards), e)
+        error_send.append(f"❗️ Не удалось повторно отправить {len(cards)} карточек: {e}")
     return error_send
 
-async def run_all_to():
-    # products = await get_all_product_from_catalog()
-    products = await process_cards() # теперь запрашиваем по API, а не со страницы
-    root_ids = [product["root"] for product in products]
-    print(f"Root_IDS {root_ids}")
-    cards_for_update, errors = await get_and_update_brand_in_card(root_ids)
 
-    prepared_cards: list[dict[str, Any]] = []
-    for card in cards_for_update or []:
-        api_key = card.get("api_key")
-        card['root'] = card.get("imtID")
-        if not api_key:
-            print("run_all_to Пропущена карточка без API-ключа")
-            continue
-        payload = filter_card_top_level(card)
-        prepared_cards.append(payload)
-    error_send = await send_cards(prepared_cards)
+async def _verify_and_retry(
+    cards: list[dict],
+    weekend: bool,
+    stats: RunStats,
+    *,
+    company_ids: set[int] | None = None,
+    decided: bool = True,
+) -> list[str]:
+    """Проверка полным просмотром каталога (VERIFY_MODE=catalog): повторяем root, что остались под ненужным брендом."""
+    async with config.AsyncSessionLocal() as session:
+        companies = _in_scope(await get_all_companies(session), company_ids)
+
+    leftovers, error_send = await _catalog_leftovers(companies, cards, weekend)
+    error_send.extend(await _resend(leftovers, weekend, stats, decided=decided))
+    return error_send
+
+async def run_all_to(
+    *,
+    export: RunExport | None = None,
+    stats: RunStats | None = None,
+    deadline: float | None = None,
+    company_ids: set[int] | None = None,
+    company_roots: dict[int, set[int]] | None = None,
+):
+    with deadline_scope(config.RUN_DEADLINE_SECONDS if deadline is None else deadline):
+        return await _run_all_to(export=export, stats=stats, company_ids=company_ids, company_roots=company_roots)
+
+
+async def _run_all_to(
+    *,
+    export: RunExport | None,
+    stats: RunStats | None,
+    company_ids: set[int] | None = None,
+    company_roots: dict[int, set[int]] | None = None,
+):
+    stats = stats or RunStats("all_to")
+
+    if company_roots is not None:
+        # выборочный запуск по root: читать их напрямую дешевле, чем листать каталог компании
+        logger.info("🎯 Отбор root: %s, префильтр по каталогу не нужен", _roots_count(company_roots))
+    elif config.ALL_TO_PREFILTER:
+        # каталог вместо чтения всех карточек: в Content API пойдут только root с другим брендом
+        with stats.phase("prefilter"):
+            company_roots = await catalog_prefilter(company_ids=company_ids)
+        logger.info("Root_IDS: %s", _roots_count(company_roots))
+
+    # один проход: каждый root читается раз и тут же решается в памяти
+    with stats.phase("fetch"):
+        cards_for_update, errors = await get_and_update_brand_in_card(
+            company_roots, export=export, stats=stats, company_ids=company_ids,
+        )
+    stats.add_cards("decided", len(cards_for_update))
+
+    prepared_cards = await map_chunks("filter", prepare_payloads, cards_for_update or [])
+    if len(prepared_cards) < len(cards_for_update or []):
+        sampler.throttle(logger, "run_all_to_no_key", 10.0, logging.WARNING,
+                         "run_all_to Пропущено карточек без API-ключа: %s",
+                         len(cards_for_update) - len(prepared_cards))
+    with stats.phase("send"):
+        error_send = await send_cards(prepared_cards, export=export, stats=stats)
     if error_send:
         errors.extend(error_send)
     return errors
 
 
-async def process_cards():
+async def catalog_prefilter(*, company_ids: set[int] | None = None) -> dict[int, set[int]]:
+    """
+    Префильтр all_to по публичному каталогу: root, которые стоит читать через Content API
+    (по компаниям: company.id -> root).
+
+    Каталог отдаёт бренд каждого товара и не тратит квоту токена. root берём, если
+    видимый бренд хоть одного его товара отличается от original_brand. root, которых
+    в каталоге нет (нет в наличии, скрыты), решаем по card_cache не старше
+    ALL_TO_PREFILTER_CACHE_TTL; без свежего кэша — читаем, как раньше. Если каталог
+    компании недоступен (антибот), берём все её root.
     """
-    Тянем карточки по компаниям/номенклатурам.
+    async with config.AsyncSessionLocal() as session:
+        companies = _in_scope(await get_companies_with_nomenclature(session), company_ids)
+        cache = await get_card_cache(session, [company.id for company in companies])
+
+    now = datetime.now(timezone.utc)
+    selected: dict[int, set[int]] = {}
+    counters: Counter[str] = Counter()
+
+    for company in companies:
+        company_selected = selected.setdefault(company.id, set())
+        original_by_root: dict[int, str | None] = {}
+        for nom in company.nomenclatures:
+            root_id = nom.root_id_value
+            if root_id is not None and root_id not in original_by_root:
+                original_by_root[root_id] = nom.original_brand
+        if not original_by_root:
+            continue
+
+        try:
+            async with WBClientAPI() as api:
+                products = await api.get_all_data_by_company_id(company.company_id)
+        except CircuitOpenError as e:
+            logger.warning("🔌 Каталог %s недоступен, префильтр пропущен: %s", company.name, e)
+            company_selected.update(original_by_root)
+            counters["fallback"] += len(original_by_root)
+            continue
+
+        visible: dict[int, set[str]] = defaultdict(set)
+        for product in products:
+            root_id = product.get("root")
+            if root_id in original_by_root:
+                visible[root_id].add(product.get("brand") or "")
+
+        company_cache = cache.get(company.id, {})
+        for root_id, original_brand in original_by_root.items():
+            brands = visible.get(root_id)
+            if brands is not None:
+                if brands == {original_brand}:
+                    counters["same"] += 1
+                else:
+                    company_selected.add(root_id)
+                    counters["differs"] += 1
+                continue
+
+            entry = company_cache.get(root_id)
+            if (
+                entry is not None
+                and (now - entry[1]).total_seconds() <= config.ALL_TO_PREFILTER_CACHE_TTL
+                and all(card.get("brand") == original_brand for card in entry[0])
+            ):
+                counters["cached_same"] += 1
+            else:
+                company_selected.add(root_id)
+                counters["unknown"] += 1
+
+        await asyncio.sleep(REQUEST_DELAY_ONE_SECOND)
+
+    logger.info(
+        "🧭 Префильтр all_to: в Content API %s root из %s (бренд отличается %s, не видно в каталоге %s, "
+        "каталог недоступен %s; совпадает %s, по кэшу %s)",
+        _roots_count(selected), sum(counters.values()), counters["differs"], counters["unknown"],
+        counters["fallback"], counters["same"], counters["cached_same"],
+    )
+    return selected
+
+
+async def process_cards(
+    *,
+    export: RunExport | None = None,
+    stats: RunStats | None = None,
+    company_ids: set[int] | None = None,
+    company_roots: dict[int, set[int]] | None = None,
+):
+    """
+    Тянем карточки по компаниям/номенклатурам (company_roots — только эти root своих компаний).
     Записываем в карточку:
       - api_key (для отправки)
       - root
       - company_id
       - original_brand (из номенклатуры — это важно для выходных)
+    Каждый (api_key, root) читается один раз на весь запуск, даже если root
+    повторяется в номенклатуре или у нескольких компаний с одним кабинетом.
     """
     all_cards: list[dict] = []
+    fetched = DedupIndex("root")
 
     async with config.AsyncSessionLocal() as session:
-        companies = await get_companies_with_nomenclature(session)
-
+        companies = _in_scope(await get_companies_with_nomenclature(session), company_ids)
+
+    async def fetch_root(company, nom, root_id: int, cache_rows: dict[int, list[dict]]) -> None:
+        try:
+            async with WBClientAPI() as api:
+                cards = await api.get_cards_list(api_key=company.api_key, root_id=root_id)
+            # копии до разметки: в кэше — ответ WB как есть
+            cache_rows[root_id] = [dict(card) for card in cards]
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            logger.error("Ошибка получения карточек root_id=%s: %s", root_id, e)
+            cards = []
+
+        for card in cards:
+            card["root"] = card.get("imtID")
+            card["api_key"] = company.api_key
+            card["company_id"] = company.id
+            card["original_brand"] = nom.original_brand or ""
+            all_cards.append(card)
+        PIPELINE_CARDS.labels(company.name, "fetched").inc(len(cards))
+
+        sampler.every_n(logger, "process_cards_root", 100, logging.INFO,
+                        "📦 Получено карточек для root_id=%s: %s", root_id, len(cards))
+
+        await asyncio.sleep(REQUEST_DELAY_ONE_SECOND)
+
+    def company_jobs(company, roots: list[tuple]):
+        cache_rows: dict[int, list[dict]] = {}
+        for nom, root_id in roots:
+            yield lambda nom=nom, root_id=root_id: fetch_root(company, nom, root_id, cache_rows)
+        yield lambda: _save_card_cache(company, cache_rows)
+
+    # какие root читать, решаем заранее в порядке cabinet_order — дубли снимаются детерминированно,
+    # а сами чтения идут по компаниям вперемешку через справедливое расписание
+    scheduler = _scheduler(stats)
     for company in companies:
-        print(f"\n🔍 Компания: {company.name}")
+        logger.info("🔍 Компания: %s", company.name)
         api_key = company.api_key
+        _remember_company(company)
+        if export is not None:
+            export.set_company_name(company.id, company.name)
 
-        seen_root_ids = set()
-
+        roots: list[tuple] = []
         for nom in company.nomenclatures:
-            try:
-                root_id = int(nom.root_id)
-            except (TypeError, ValueError):
-                print(f"Пропущен некорректный root_id: {nom.root_id}")
+            root_id = nom.root_id_value
+            if root_id is None:
+                logger.warning("Пропущен некорректный root_id: %s", nom.root_id)
                 continue
 
-            if root_id in seen_root_ids:
-                print(f"⏩ Пропущен дубликат root_id: {root_id}")
+            if not _root_selected(company_roots, company, root_id):
                 continue
 
-            seen_root_ids.add(root_id)
+            if not fetched.first((api_key, root_id), company.name):
+                logger.debug("⏩ Пропущен дубликат root_id: %s", root_id)
+                continue
+            roots.append((nom, root_id))
 
-            try:
-                async with WBClientAPI() as api:
-                    cards = await api.get_cards_list(api_key=api_key, root_id=root_id)
-            except Exception as e:
-                print(e)
-                cards = []
+        scheduler.add(company.name, company_jobs(company, roots), lane=lane_of(company.cabinet_order))
 
-            for card in cards:
-                card["root"] = card.get("imtID")
-                card["api_key"] = company.api_key
-                card["company_id"] = company.id
-                card["original_brand"] = nom.original_brand or ""
-                all_cards.append(card)
+    await scheduler.run()
 
-            print(f"📦 Получено карточек для root_id={root_id}: {len(cards)}")
+    _report_duplicates(fetched, stats)
+    return all_cards
 
-            await asyncio.sleep(REQUEST_DELAY_ONE_SECOND)
 
-    return all_cards
+def _report_duplicates(index: DedupIndex, stats: RunStats | None) -> None:
+    if not index.removed:
+        return
+    logger.info("♻️ %s", index.report())
+    if stats is not None:
+        stats.add_cards("duplicates", index.removed)
+
+
+async def _save_card_cache(company, cache_rows: dict[int, list[dict]]) -> None:
+    """Кэш для плана запуска; его сбой запуск не роняет."""
+    if not cache_rows:
+        return
+    try:
+        async with config.AsyncSessionLocal() as session:
+            await save_card_cache(session, company.id, cache_rows)
+    except Exception as e:
+        logger.warning("⚠️ Не удалось обновить кэш карточек компании %s: %s", company.name, e)
 
-async def process_brands(all_cards: list[dict], weekend: bool) -> tuple[list[dict], list[str]]:
+async def process_brands(
+    all_cards: list[dict], weekend: bool, *, export: RunExport | None = None
+) -> tuple[list[dict], list[str]]:
     """
     Будни (weekend=False): всегда меняем бренд на default_brand, если отличается.
     Выходной (weekend=True): берём текущий бренд карточки; если он ночной для company -> меняем на default_brand,
@@ -228,6 +741,8 @@ async def process_brands(all_cards: list[dict], weekend: bool) -> tuple[list[dic
                 companies_cache[api_key] = company
 
             if not company or not company.default_brand:
+                if export is not None:
+                    export.record_card(card, STATUS_SKIPPED, "у компании нет default_brand")
                 continue
 
             default_brand = company.default_brand.name
@@ -237,10 +752,15 @@ async def process_brands(all_cards: list[dict], weekend: bool) -> tuple[list[dic
                 if current_brand != default_brand:
                     card["brand"] = default_brand
                     updated.append(card)
+                    PIPELINE_CARDS.labels(company.name, "decided").inc()
+                    if export is not None:
+                        export.mark_pending(card, current_brand)
                 else:
                     m = f"🔸 RootID {root_id}: бренд уже {default_brand}"
                     if m not in seen:
                         msgs.append(m); seen.add(m)
+                    if export is not None:
+                        export.record_card(card, STATUS_SKIPPED, "бренд уже базовый")
             else:
                 # Выходной — меняем только если текущий бренд ночной для этой компании
                 key = (company_id, current_brand)
@@ -252,10 +772,17 @@ async def process_brands(all_cards: list[dict], weekend: bool) -> tuple[list[dic
                 if is_night and current_brand != default_brand:
                     card["brand"] = default_brand
                     updated.append(card)
+                    PIPELINE_CARDS.labels(company.name, "decided").inc()
+                    if export is not None:
+                        export.mark_pending(card, current_brand)
                 elif not is_night:
                     m = f"🔸 RootID {root_id}: '{current_brand}' не ночной — без изменений"
                     if m not in seen:
                         msgs.append(m); seen.add(m)
+                    if export is not None:
+                        export.record_card(card, STATUS_SKIPPED, "бренд не ночной")
+                elif export is not None:
+                    export.record_card(card, STATUS_SKIPPED, "бренд уже базовый")
 
     return updated, msgs
 
@@ -267,123 +794,425 @@ async def get_all_product_from_catalog() -> list[dict]:
         companies = await get_sorted_companies(session)
 
     for company in companies:
-        print(f"Обработка компании: {company.name} (ID: {company.company_id})")
+        logger.info("Обработка компании: %s (ID: %s)", company.name, company.company_id)
 
         async with WBClientAPI() as api:
             company_products = await api.get_all_data_by_company_id(company.company_id)
-        print(f" Найдено товаров: {len(company_products)}")
+        logger.info("Найдено товаров: %s", len(company_products))
 
         for product in company_products:
             product["company_id"] = company.company_id
 
         all_products.extend(company_products)
 
-    print(f"Всего собрано товаров: {len(all_products)}")
+    logger.info("Всего собрано товаров: %s", len(all_products))
     return all_products
 
 
-async def get_and_update_brand_in_card(available_root_ids: list) -> tuple[list[dict], list[str]]:
+async def get_and_update_brand_in_card(
+    company_roots: dict[int, set[int]] | None = None,
+    *,
+    export: RunExport | None = None,
+    stats: RunStats | None = None,
+    company_ids: set[int] | None = None,
+) -> tuple[list[dict], list[str]]:
+    """
+    all_to за один проход: карточки каждого root читаются один раз и сразу
+    сверяются с original_brand. company_roots — отбор префильтра или выборочного
+    запуска по компаниям (None — все root).
+    Root, общий для нескольких компаний, берёт первая по порядку.
+    """
     errors = []
     updated_cards = []
     companies = []
 
     async with config.AsyncSessionLocal() as session:
-        companies = await get_companies_with_nomenclature(session)
-
-    seen_root_ids = set()
+        companies = _in_scope(await get_companies_with_nomenclature(session), company_ids)
+
+    async def fetch_root(company, nom, root_id: int, cache_rows: dict[int, list[dict]]) -> None:
+        sampler.every_n(logger, "all_to_root", 100, logging.INFO, "✅ Обрабатываем root_id: %s", root_id)
+        try:
+            async with WBClientAPI() as api:
+                cards = await api.get_cards_list(api_key=company.api_key, root_id=root_id)
+        except AuthorizationError as e:
+            raise e
+        except RootIDError as e:
+            errors.append(f"Company Name={company.name}, Company ID={company.company_id}: Error={e}")
+            if export is not None:
+                export.record(STATUS_FAILED, company=company.name, root=root_id, reason=str(e))
+            return
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            # раньше такой root отсеивал первый проход (process_cards) — пропускаем так же
+            logger.error("Ошибка получения карточек root_id=%s: %s", root_id, e)
+            return
+
+        cache_rows[root_id] = [dict(card) for card in cards]
+        PIPELINE_CARDS.labels(company.name, "fetched").inc(len(cards))
+        if stats is not None:
+            stats.add_cards("fetched", len(cards))
+
+        updated_cards.extend(_restore_original_brands(cards, nom, company, export=export))
+
+        await asyncio.sleep(REQUEST_DELAY_ONE_SECOND)
+
+    def company_jobs(company, roots: list[tuple]):
+        cache_rows: dict[int, list[dict]] = {}
+        for nom, root_id in roots:
+            yield lambda nom=nom, root_id=root_id: fetch_root(company, nom, root_id, cache_rows)
+        yield lambda: _save_card_cache(company, cache_rows)
+
+    # root общий на флот: берёт первая по порядку компания
+    fetched = DedupIndex("root")
+    scheduler = _scheduler(stats)
 
     for company in companies:
-        print(f"\n🔍 Компания: {company.name}")
+        logger.info("🔍 Компания: %s", company.name)
+        _remember_company(company)
+        if export is not None:
+            export.set_company_name(company.id, company.name)
 
+        roots: list[tuple] = []
         for nom in company.nomenclatures:
-            try:
-                root_id = int(nom.root_id)
-            except (TypeError, ValueError):
-                print(f"⚠️ Пропущен некорректный root_id: {nom.root_id}")
-                continue
-
-            if root_id in seen_root_ids:
-                print(f"⏩ Пропущен root_id {root_id} — уже обработан ранее")
+            root_id = nom.root_id_value
+            if root_id is None:
+                logger.warning("⚠️ Пропущен некорректный root_id: %s", nom.root_id)
                 continue
 
-            if root_id not in available_root_ids:
-                print(f"⛔️ Пропущен root_id {root_id} — нет в каталоге WB")
+            if not _root_selected(company_roots, company, root_id):
+                logger.debug("⛔️ Пропущен root_id %s — не в отборе (префильтр или выборочный запуск)", root_id)
                 continue
 
-            seen_root_ids.add(root_id)  # Запоминаем, что обработали
-            print(f"✅ Обрабатываем root_id: {root_id}")
-
-            try:
-                async with WBClientAPI() as api:
-                    cards = await api.get_cards_list(api_key=company.api_key, root_id=root_id)
-            except AuthorizationError as e:
-                raise e
-            except RootIDError as e:
-                errors.append(f"Company Name={company.name}, Company ID={company.company_id}: Error={e}")
+            if not fetched.first(root_id, company.name):
+                logger.debug("⏩ Пропущен root_id %s — уже обработан ранее", root_id)
                 continue
+            roots.append((nom, root_id))
 
-            for card in cards:
-                if card.get("brand") != nom.original_brand:
-                    print(f"бренд: {card.get('brand')} → {nom.original_brand}")
-                    card["brand"] = nom.original_brand
-                    card["api_key"] = nom.company.api_key
-                    updated_cards.append(card)
+        scheduler.add(company.name, company_jobs(company, roots), lane=lane_of(company.cabinet_order))
 
-            await asyncio.sleep(REQUEST_DELAY_ONE_SECOND)
+    await scheduler.run()
 
-    print(f"\nОбновлено карточек бренда: {len(updated_cards)}")
+    _report_duplicates(fetched, stats)
+    logger.info("Обновлено карточек бренда: %s", len(updated_cards))
     return updated_cards, errors
 
 
-async def send_cards(cards: list[dict]) -> list[str]:
+def _restore_original_brands(cards: list[dict], nom, company, *, export: RunExport | None = None) -> list[dict]:
+    """Решение all_to по карточкам одного root: бренд, отличный от оригинального, меняем на оригинальный."""
+    updated: list[dict] = []
+    for card in cards:
+        card["root"] = card.get("imtID")
+        card["company_id"] = company.id
+        if card.get("brand") != nom.original_brand:
+            PIPELINE_CARDS.labels(company.name, "decided").inc()
+            logger.debug("бренд: %s → %s", card.get("brand"), nom.original_brand)
+            brand_before = card.get("brand") or ""
+            card["brand"] = nom.original_brand
+            card["api_key"] = company.api_key
+            updated.append(card)
+            if export is not None:
+                export.mark_pending(card, brand_before)
+        elif export is not None:
+            export.record_card(card, STATUS_SKIPPED, "бренд уже оригинальный")
+    return updated
+
+
+async def send_cards(
+    cards: list[dict], *, export: RunExport | None = None, stats: RunStats | None = None
+) -> list[str]:
 
     if not cards:
-        print("Нет карточек для отправки.")
+        logger.info("Нет карточек для отправки.")
         return
 
     client = WBClientAPI()
     errors = []
 
     grouped_cards = defaultdict(list)
+    sent = DedupIndex("nmID")
 
     for card in cards:
         api_key = card.get("api_key")
         if not api_key:
-            print("send_cards Пропущена карточка без API-ключа")
+            sampler.throttle(logger, "send_cards_no_key", 10.0, logging.WARNING, "send_cards Пропущена карточка без API-ключа")
+            continue
+        nm_id = card.get("nmID")
+        if nm_id is not None and not sent.first((api_key, nm_id), _company_label(api_key)):
+            # та же карточка уже в отправке этого запуска — второй раз не шлём
+            if export is not None:
+                export.record_card(card, STATUS_SKIPPED, "дубликат nmID")
             continue
         grouped_cards[api_key].append(card)
+    _report_duplicates(sent, stats)
+
+    logger.info("Карточки для отправки: %s", len(grouped_cards))
+
+    async def send_batch(api_key: str, batch: list[dict], idx: int, left: int) -> None:
+        logger.info("Отправка батча %s (%s карточек, осталось %s)...", idx, len(batch), left)
+
+        try:
+            async with WBClientAPI() as api:
+                success, response = await api.update_cards(api_key=api_key, cards=batch)
+            errors.append("Ответ от сервера WB:")
+            errors.append(json.dumps(response, ensure_ascii=False, indent=2))
+        except AuthorizationError as e:
+            if export is not None:
+                export.record_sent(batch, False, str(e))
+            raise e
+        except UpdateCardsError as e:
+            logger.error("Ошибка отправки: %s", e)
+            errors.append(f"{api_key}: {e}")
+            PIPELINE_CARDS.labels(_company_label(api_key), "failed").inc(len(batch))
+            if stats is not None:
+                stats.add_cards("failed", len(batch))
+            if export is not None:
+                export.record_sent(batch, False, str(e))
+            return
+
+        wb_error = isinstance(response, dict) and response.get("error")
+        if wb_error or (isinstance(response, dict) and response.get("additionalErrors")):
+            get_batch_sizer(api_key).partial()
+        if export is not None:
+            reason = (response.get("errorText") or "ошибка WB") if wb_error else ""
+            export.record_sent(batch, success and not wb_error, reason)
+
+        if success:
+            PIPELINE_CARDS.labels(_company_label(api_key), "sent").inc(len(batch))
+            if stats is not None:
+                stats.add_cards("sent", len(batch))
+            logger.info("Успешно отправлено %s карточек", len(batch))
+        else:
+            PIPELINE_CARDS.labels(_company_label(api_key), "failed").inc(len(batch))
+            if stats is not None:
+                stats.add_cards("failed", len(batch))
+            logger.error("Ошибка при отправке батча %s", idx)
+
+    def key_jobs(api_key: str, card_list: list[dict]):
+        logger.info("Отправка карточек для api_key: %s…, всего: %s", api_key[:8], len(card_list))
+        # размер батча подстраивается по ответам WB — следующий режем, когда предыдущий отправлен
+        sizer = get_batch_sizer(api_key)
+        offset = idx = 0
+        while offset < len(card_list):
+            batch = card_list[offset:offset + sizer.size]
+            offset += len(batch)
+            idx += 1
+            yield lambda batch=batch, idx=idx, left=len(card_list) - offset: send_batch(api_key, batch, idx, left)
+
+    # токены отправляют параллельно, слоты делятся по полосам cabinet_order
+    scheduler = _scheduler(stats)
+    for api_key, card_list in grouped_cards.items():
+        scheduler.add(_company_label(api_key), key_jobs(api_key, card_list),
+                      lane=_company_lanes_by_key.get(api_key, lane_of(None)))
+    await scheduler.run()
 
-    print(f"Карточки для отправки: {len(grouped_cards)}")
+    if errors:
+        logger.warning("Всего ошибок обновления карточек: %s", len(errors))
 
-    for api_key, card_list in grouped_cards.items():
-        print(f"\nОтправка карточек для api_key: {api_key}, всего: {len(card_list)}")
-
-        batches = split_into_batches(card_list, BATCH_LIMIT)
-        for idx, batch in enumerate(batches, start=1):
-
-            print(f"Отправка батча {idx}/{len(batches)} ({len(batch)} карточек)...")
-
-            try:
-                async with WBClientAPI() as api:
-                    success, response = await api.update_cards(api_key=api_key, cards=batch)
-                errors.append("Ответ от сервера WB:")
-                errors.append(json.dumps(response, ensure_ascii=False, indent=2))
-            except AuthorizationError as e:
-                raise e
-            except UpdateCardsError as e:
-                print(f"Ошибка отправки: {e}")
-                errors.append(f"{api_key}: {e}")
-                continue
+    return errors
 
-            if success:
-                print(f"Успешно отправлено {len(batch)} карточек")
-            else:
-                print(f"Ошибка при отправке батча {idx}")
+# ---------- план запуска ----------
 
-            if idx < len(batches):
-                await asyncio.sleep(REQUEST_DELAY_SIX_SECONDS)
+def _in_slots(seconds: list[float]) -> float:
+    """Длительность работ компаний, разложенных по FAIR_SLOTS слотам: не меньше самой долгой."""
+    if not seconds:
+        return 0.0
+    return max(max(seconds), sum(seconds) / max(1, config.FAIR_SLOTS))
 
-    if errors:
-        print(f"\nВсего ошибок обновления карточек: {len(errors)}")
 
-    return errors
\ No newline at end of file
+def _estimate_send(cards_per_key: dict[str, int]) -> tuple[int, float]:
+    """
+    (запросов, секунд) фазы send: батчи текущего размера токена, токены параллельно
+    по слотам, батчи одного токена не чаще базового интервала квоты.
+    """
+    update_latency = max(endpoint_latency("cards_update"), KEY_BASE_INTERVAL)
+    requests, per_key = 0, []
+    for api_key, count in cards_per_key.items():
+        batches = math.ceil(count / get_batch_sizer(api_key).size)
+        requests += batches
+        per_key.append(update_latency + max(0, batches - 1) * max(update_latency, UPDATE_BASE_INTERVAL))
+    return requests, _in_slots(per_key)
+
+
+def _estimate_fetch(roots: int) -> float:
+    """Секунд на cards/list по root подряд (квота токена и пауза между root)."""
+    return roots * (max(endpoint_latency("cards_list"), KEY_BASE_INTERVAL) + REQUEST_DELAY_ONE_SECOND)
+
+
+def _estimate_verify(companies: int) -> tuple[int, float]:
+    """
+    catalog: после отправки каталог по ночным брендам обычно пуст — страница на компанию.
+    errors: без ошибок список пуст до конца окна — считаем все VERIFY_POLLS опросов на токен.
+    """
+    if config.VERIFY_MODE == "catalog":
+        return companies, VERIFY_DELAY_SECONDS + companies * (endpoint_latency("catalog") + 0.2)
+    polls = config.VERIFY_POLLS
+    requests = companies * polls
+    return requests, config.VERIFY_POLL_DELAY * (2 ** polls - 1) + requests * endpoint_latency("cards_errors")
+
+
+async def build_plan(
+    action: str,
+    *,
+    weekend: bool | None = None,
+    company_ids: set[int] | None = None,
+    company_roots: dict[int, set[int]] | None = None,
+) -> tuple[dict, list[dict]]:
+    """
+    План all_from/all_to по кэшу карточек (card_cache) — без единого запроса к WB.
+
+    Решение то же, что в запуске (process_brands / _restore_original_brands),
+    поэтому разница по компаниям точная для состояния на момент кэша. Возвращает
+    (summary, cards): сводку с оценкой запросов и времени и готовые payload
+    для execute_plan. root без кэша в план не входят — их видно в summary.
+    """
+    if action == "all_from" and weekend is None:
+        weekend = await is_weekend()
+
+    async with config.AsyncSessionLocal() as session:
+        companies = _in_scope(await get_companies_with_nomenclature(session), company_ids)
+        cache = await get_card_cache(session, [company.id for company in companies])
+
+    now = datetime.now(timezone.utc)
+    plan_cards: list[dict] = []
+    rows: list[dict] = []
+    cards_per_key: dict[str, int] = defaultdict(int)
+    roots_total = 0
+    seen_all_to: set[int] = set()
+
+    for company in companies:
+        _remember_company(company)
+        company_cache = cache.get(company.id, {})
+        seen_root_ids: set[int] = set()
+        cards: list[dict] = []
+        before: dict[Any, str] = {}
+        roots = roots_cached = 0
+        oldest: datetime | None = None
+
+        for nom in company.nomenclatures:
+            root_id = nom.root_id_value
+            if root_id is None or root_id in seen_root_ids or not _root_selected(company_roots, company, root_id):
+                continue
+            seen_root_ids.add(root_id)
+            roots += 1
+
+            entry = company_cache.get(root_id)
+            if entry is None:
+                continue
+            raw_cards, fetched_at = entry
+            roots_cached += 1
+            oldest = fetched_at if oldest is None else min(oldest, fetched_at)
+
+            # копии: решение меняет бренд в карточке, кэш трогать нельзя
+            fresh = [dict(card) for card in raw_cards]
+            before.update((card.get("nmID"), card.get("brand") or "") for card in fresh)
+
+            if action == "all_from":
+                for card in fresh:
+                    card["root"] = card.get("imtID")
+                    card["api_key"] = company.api_key
+                    card["company_id"] = company.id
+                    card["original_brand"] = nom.original_brand or ""
+                cards.extend(fresh)
+            elif root_id not in seen_all_to:
+                # all_to берёт root один раз на весь флот — первой по порядку компании
+                seen_all_to.add(root_id)
+                cards.extend(_restore_original_brands(fresh, nom, company))
+
+        if action == "all_from":
+            changed, _ = await process_brands(cards, bool(weekend))
+        else:
+            changed = cards
+
+        for card in changed:
+            payload = filter_card_top_level(card)
+            payload.pop("api_key", None)  # токен не храним в плане — подставим из компании при выполнении
+            plan_cards.append({
+                "company_id": company.id,
+                "root": card.get("root"),
+                "before": before.get(card.get("nmID"), ""),
+                "payload": payload,
+            })
+        if changed:
+            cards_per_key[company.api_key] += len(changed)
+
+        requests, seconds = _estimate_send({company.api_key: len(changed)} if changed else {})
+        roots_total += roots
+        rows.append({
+            "id": company.id,
+            "name": company.name,
+            "roots": roots,
+            "roots_cached": roots_cached,
+            "cards": len(cards) if action == "all_from" else None,
+            "changes": len(changed),
+            "requests": requests,
+            "seconds": round(seconds, 1),
+            "cache_age_s": round((now - oldest).total_seconds()) if oldest is not None else None,
+        })
+
+    send_requests, send_seconds = _estimate_send(cards_per_key)
+    verify_requests, verify_seconds = _estimate_verify(len(companies)) if action == "all_from" else (0, 0.0)
+
+    summary = {
+        "action": action,
+        "weekend": weekend,
+        "scope": sorted(company_ids) if company_ids is not None else None,
+        "roots": _roots_count(company_roots) if company_roots is not None else None,
+        "companies": rows,
+        "missing_roots": sum(row["roots"] - row["roots_cached"] for row in rows),
+        "totals": {
+            "changes": len(plan_cards),
+            "requests": send_requests + verify_requests,
+            "seconds": round(send_seconds + verify_seconds, 1),
+        },
+        "full_run": {
+            "requests": roots_total + send_requests + verify_requests,
+            "seconds": round(
+                _in_slots([_estimate_fetch(row["roots"]) for row in rows]) + send_seconds + verify_seconds, 1,
+            ),
+        },
+    }
+    return summary, plan_cards
+
+
+async def execute_plan(
+    plan, *, export: RunExport | None = None, stats: RunStats | None = None, deadline: float | None = None
+) -> list[str]:
+    """Выполняет подтверждённый план: отправка готовых payload без загрузки карточек (+ проверка для all_from)."""
+    with deadline_scope(config.RUN_DEADLINE_SECONDS if deadline is None else deadline):
+        return await _execute_plan(plan, export=export, stats=stats)
+
+
+async def _execute_plan(plan, *, export: RunExport | None, stats: RunStats | None) -> list[str]:
+    stats = stats or RunStats(plan.action)
+    errors: list[str] = []
+
+    async with config.AsyncSessionLocal() as session:
+        companies = {company.id: company for company in await get_all_companies(session)}
+
+    prepared: list[dict] = []
+    sent_cards: list[dict] = []
+    for item in plan.cards or []:
+        company = companies.get(item["company_id"])
+        if company is None:
+            continue  # компанию удалили после расчёта плана
+        _remember_company(company)
+        payload = {**item["payload"], "api_key": company.api_key}
+        card = {**payload, "company_id": company.id, "root": item["root"]}
+        if export is not None:
+            export.set_company_name(company.id, company.name)
+            export.mark_pending(card, item["before"])
+        prepared.append(payload)
+        sent_cards.append(card)
+    stats.add_cards("decided", len(prepared))
+
+    sent_at = datetime.now(timezone.utc)
+    with stats.phase("send"):
+        errors.extend(await send_cards(prepared, export=export, stats=stats) or [])
+
+    if plan.action == "all_from":
+        scope = set(plan.summary["scope"]) if (plan.summary or {}).get("scope") is not None else None
+        errors.extend(await _verify_after_send(
+            sent_cards, bool(plan.weekend), stats, company_ids=scope, since=sent_at,
+        ))
+    return errors
@@ -1,3 +1,4 @@
+import logging
 from typing import Callable, Awaitable, Dict, Any
 from aiogram import BaseMiddleware
 from aiogram.types import TelegramObject, Message, CallbackQuery
@@ -5,6 +6,8 @@ from sqlalchemy.ext.asyncio import async_sessionmaker
 
 from services.access_service import is_user_allowed
 
+logger = logging.getLogger(__name__)
+
 
 class DBAccessControlMiddleware(BaseMiddleware):
     def __init__(self, session_factory: async_sessionmaker):
@@ -28,7 +31,7 @@ class DBAccessControlMiddleware(BaseMiddleware):
                 allowed = await is_user_allowed(session, user.id)
         except Exception as e:
             # Не даём упасть пайплайну, логируем и показываем аккуратное сообщение
-            print(f"[DBAccessControl] DB error while checking access for user {user.id}: {e}")
+            logger.error("[DBAccessControl] DB error while checking access for user %s: %s", user.id, e)
             allowed = False
 
         if not allowed:
@@ -42,7 +45,7 @@ class DBAccessControlMiddleware(BaseMiddleware):
             elif isinstance(event, Message):
                 await event.answer("⛔️ У вас нет доступа.")
             else:
-                print(f"⛔️ Пользователь {user.id} не имеет доступа, type={type(event)}")
+                logger.info("⛔️ Пользователь %s не имеет доступа, type=%s", user.id, type(event))
             return  # блокируем обработку дальше
 
         # доступ разрешён — продолжаем цепочку
@@ -6,4 +6,10 @@ class RootIDError(Exception):
     pass
 
 class UpdateCardsError(Exception):
-    pass
\ No newline at end of file
+    pass
+
+class CircuitOpenError(Exception):
+    pass
+
+class DeadlineExceeded(Exception):
+    pass
@@ -1,6 +1,7 @@
 import asyncio
 from config import config
 from models import *
+import migrations
 
 async def create_all_models():
     async with config.engine.begin() as conn:
@@ -8,5 +9,9 @@ async def create_all_models():
         await conn.run_sync(Base.metadata.create_all)
         print("✅ Все таблицы успешно созданы.")
 
+        # миграции идемпотентны: индексы уже есть из моделей, докатятся триггеры и т.п.
+        await migrations.reset(conn)
+        await migrations.upgrade(conn)
+
 if __name__ == "__main__":
     asyncio.run(create_all_models())
@@ -0,0 +1,27 @@
+import argparse
+import asyncio
+import time
+
+from config import config
+from services.nomenclature_service import import_nomenclature_file
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Массовый импорт номенклатуры из XLSX/CSV")
+    parser.add_argument("path", help="файл .xlsx или .csv (колонки root_id, wb_article, original_brand[, company_id])")
+    parser.add_argument("--company-id", type=int, default=None,
+                        help="WB id поставщика для строк без колонки company_id")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    try:
+        report = await import_nomenclature_file(config.engine, args.path, default_company_id=args.company_id)
+    finally:
+        await config.engine.dispose()
+
+    print(report.summary())
+    print(f"⏱️ {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
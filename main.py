@@ -1,9 +1,16 @@
+import time
+
+# засекаем до тяжёлых импортов (aiogram, SQLAlchemy, модели) — они тоже часть старта
+_started = time.perf_counter()
+
 import asyncio
 from bot.dispatcher import start_bot
+from utils.log_utils import setup_logging
 
 
 def main():
-    asyncio.run(start_bot())
+    setup_logging()
+    asyncio.run(start_bot(started=_started))
 
 
 if __name__ == '__main__':
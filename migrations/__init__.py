@@ -0,0 +1,98 @@
+"""
+Простые миграции схемы поверх SQLAlchemy.
+
+Каждая миграция — модуль в migrations/versions с REVISION, DESCRIPTION,
+UPGRADE (список SQL) и, по желанию, DOWNGRADE. Применённые ревизии
+хранятся в таблице schema_migrations. SQL в миграциях пишем идемпотентно
+(IF NOT EXISTS / OR REPLACE), чтобы gen_db мог прогнать их поверх create_all.
+"""
+import importlib
+import pkgutil
+from types import ModuleType
+
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from . import versions
+
+MIGRATIONS_TABLE = "schema_migrations"
+
+
+def load_migrations() -> list[ModuleType]:
+    modules = [
+        importlib.import_module(f"{versions.__name__}.{info.name}")
+        for info in pkgutil.iter_modules(versions.__path__)
+        if info.name.startswith("v")
+    ]
+    modules.sort(key=lambda m: m.REVISION)
+    return modules
+
+
+async def _ensure_migrations_table(conn: AsyncConnection) -> None:
+    await conn.exec_driver_sql(
+        f"""
+        CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} (
+            revision    VARCHAR PRIMARY KEY,
+            description VARCHAR,
+            applied_at  TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+        """
+    )
+
+
+async def get_applied_revisions(conn: AsyncConnection) -> set[str]:
+    await _ensure_migrations_table(conn)
+    result = await conn.exec_driver_sql(f"SELECT revision FROM {MIGRATIONS_TABLE}")
+    return {row[0] for row in result.fetchall()}
+
+
+async def _run_statements(conn: AsyncConnection, statements: list[str]) -> None:
+    # asyncpg не умеет несколько команд в одном prepare — выполняем по одной
+    for statement in statements:
+        await conn.exec_driver_sql(statement)
+
+
+async def upgrade(conn: AsyncConnection, target: str | None = None) -> list[str]:
+    """Применяет все неприменённые миграции (до target включительно)."""
+    applied = await get_applied_revisions(conn)
+    done: list[str] = []
+
+    for migration in load_migrations():
+        if target is not None and migration.REVISION > target:
+            break
+        if migration.REVISION in applied:
+            continue
+
+        await _run_statements(conn, migration.UPGRADE)
+        await conn.exec_driver_sql(
+            f"INSERT INTO {MIGRATIONS_TABLE} (revision, description) VALUES ($1, $2)",
+            (migration.REVISION, migration.DESCRIPTION),
+        )
+        print(f"✅ Миграция {migration.REVISION} применена: {migration.DESCRIPTION}")
+        done.append(migration.REVISION)
+
+    return done
+
+
+async def downgrade(conn: AsyncConnection, target: str) -> list[str]:
+    """Откатывает миграции новее target (target остаётся применённой)."""
+    applied = await get_applied_revisions(conn)
+    undone: list[str] = []
+
+    for migration in reversed(load_migrations()):
+        if migration.REVISION <= target or migration.REVISION not in applied:
+            continue
+
+        await _run_statements(conn, getattr(migration, "DOWNGRADE", []))
+        await conn.exec_driver_sql(
+            f"DELETE FROM {MIGRATIONS_TABLE} WHERE revision = $1",
+            (migration.REVISION,),
+        )
+        print(f"↩️ Миграция {migration.REVISION} откатена")
+        undone.append(migration.REVISION)
+
+    return undone
+
+
+async def reset(conn: AsyncConnection) -> None:
+    """Забывает историю миграций (для gen_db после drop_all)."""
+    await conn.exec_driver_sql(f"DROP TABLE IF EXISTS {MIGRATIONS_TABLE}")
@@ -0,0 +1,51 @@
+"""
+python -m migrations upgrade [REVISION]   — применить миграции
+python -m migrations downgrade REVISION   — откатить всё новее REVISION
+python -m migrations status               — список ревизий
+python -m migrations explain              — EXPLAIN-проверка индексов на синтетике
+"""
+import argparse
+import asyncio
+import sys
+
+from config import config
+from . import load_migrations, get_applied_revisions, upgrade, downgrade
+from .explain_check import run_explain_check
+
+
+async def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(prog="python -m migrations")
+    sub = parser.add_subparsers(dest="command", required=True)
+    up = sub.add_parser("upgrade")
+    up.add_argument("revision", nargs="?")
+    down = sub.add_parser("downgrade")
+    down.add_argument("revision")
+    sub.add_parser("status")
+    sub.add_parser("explain")
+    args = parser.parse_args(argv)
+
+    engine = config.engine
+    try:
+        if args.command == "upgrade":
+            async with engine.begin() as conn:
+                done = await upgrade(conn, args.revision)
+            if not done:
+                print("Схема уже актуальна.")
+        elif args.command == "downgrade":
+            async with engine.begin() as conn:
+                await downgrade(conn, args.revision)
+        elif args.command == "status":
+            async with engine.begin() as conn:
+                applied = await get_applied_revisions(conn)
+            for migration in load_migrations():
+                mark = "✅" if migration.REVISION in applied else "⏳"
+                print(f"{mark} {migration.REVISION} {migration.DESCRIPTION}")
+        elif args.command == "explain":
+            return 0 if await run_explain_check(engine) else 1
+    finally:
+        await engine.dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(sys.argv[1:])))
@@ -0,0 +1,110 @@
+"""
+Проверка, что горячие запросы действительно идут по индексам.
+
+В одной транзакции: создаём временную схему, накатываем модели и миграции,
+засеваем синтетические данные, делаем ANALYZE и EXPLAIN (FORMAT JSON)
+для запросов сервисов. В конце — ROLLBACK, в рабочей схеме ничего не остаётся.
+"""
+import json
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from models import Base
+from . import upgrade
+
+CHECK_SCHEMA = "explain_check"
+
+SEED = [
+    # companies <-> brands ссылаются друг на друга: сначала компании без default_brand
+    """
+    INSERT INTO companies (id, name, api_key, expires_at, company_id, cabinet_order)
+    SELECT g, 'company_' || g, md5('key' || g), DATE '2030-01-01', 500000 + g, g
+      FROM generate_series(1, 300) AS g
+    """,
+    """
+    INSERT INTO brands (id, name, is_daytime, company_id, "wbID")
+    SELECT g, 'brand_' || g, (g % 3 = 0), 1 + (g % 300), 100000 + g
+      FROM generate_series(1, 3000) AS g
+    """,
+    "UPDATE companies SET default_brand_id = id",
+    """
+    INSERT INTO nomenclature (id, wb_article, root_id, original_brand, company_id)
+    SELECT g, 'art_' || g, (10000000 + g)::text, 'brand_' || (g % 3000 + 1), 1 + (g % 300)
+      FROM generate_series(1, 100000) AS g
+    """,
+    """
+    INSERT INTO schedules (id, user_id, weekday, time, action)
+    SELECT g, 1000 + (g % 50), g % 7, make_time(g % 24, (g * 7) % 60, 0),
+           CASE WHEN g % 2 = 0 THEN 'all_to' ELSE 'all_from' END
+      FROM generate_series(1, 2000) AS g
+    """,
+]
+
+# (название, ожидаемый индекс, запрос в том виде, в каком его строят сервисы)
+CHECKS = [
+    (
+        "is_night_brand",
+        "ix_brands_company_name_daytime",
+        "SELECT * FROM brands WHERE company_id = 18 AND name = 'brand_17' AND is_daytime = false",
+    ),
+    (
+        "get_company_by_api_key",
+        "ix_companies_api_key",
+        "SELECT * FROM companies WHERE api_key = md5('key17')",
+    ),
+    (
+        "get_companies_with_nomenclature (selectinload)",
+        "ix_nomenclature_company_root",
+        "SELECT * FROM nomenclature WHERE company_id IN (1, 2, 3)",
+    ),
+    (
+        "nomenclature по root_id_int",
+        "ix_nomenclature_company_root",
+        "SELECT * FROM nomenclature WHERE company_id = 18 AND root_id_int = 10000317",
+    ),
+    (
+        "is_schedule_still_exists",
+        "ix_schedules_lookup",
+        "SELECT * FROM schedules WHERE user_id = 1017 AND action = 'all_to' AND weekday = 3 AND time = '10:00'",
+    ),
+]
+
+
+def _plan_indexes(plan: dict) -> set[str]:
+    found = set()
+    if "Index Name" in plan:
+        found.add(plan["Index Name"])
+    for child in plan.get("Plans", []):
+        found |= _plan_indexes(child)
+    return found
+
+
+async def run_explain_check(engine: AsyncEngine) -> bool:
+    ok = True
+    async with engine.connect() as conn:
+        trans = await conn.begin()
+        try:
+            await conn.exec_driver_sql(f"CREATE SCHEMA {CHECK_SCHEMA}")
+            await conn.exec_driver_sql(f"SET LOCAL search_path TO {CHECK_SCHEMA}")
+            await conn.run_sync(Base.metadata.create_all)
+            await upgrade(conn)
+
+            for statement in SEED:
+                await conn.exec_driver_sql(statement)
+            await conn.exec_driver_sql("ANALYZE")
+
+            for name, expected, query in CHECKS:
+                result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {query}")
+                raw = result.scalar_one()
+                plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]["Plan"]
+                used = _plan_indexes(plan)
+
+                if expected in used:
+                    print(f"✅ {name}: {plan['Node Type']} по {expected}")
+                else:
+                    ok = False
+                    print(f"❌ {name}: ожидали {expected}, план {plan['Node Type']} {sorted(used) or ''}")
+        finally:
+            await trans.rollback()
+
+    return ok
@@ -0,0 +1,54 @@
+"""
+Индексы под горячие запросы + целочисленный root_id у номенклатуры.
+
+- brands(company_id, name, is_daytime)        — is_night_brand / get_night_brand_wbids
+- nomenclature(company_id, root_id_int)       — get_companies_with_nomenclature (selectinload по company_id)
+- companies(api_key)                          — get_company_by_api_key
+- schedules(user_id, action, weekday, time)   — is_schedule_still_exists
+"""
+
+REVISION = "0001"
+DESCRIPTION = "hot-path indexes, nomenclature.root_id_int"
+
+UPGRADE = [
+    "ALTER TABLE nomenclature ADD COLUMN IF NOT EXISTS root_id_int BIGINT",
+    r"""
+    UPDATE nomenclature
+       SET root_id_int = btrim(root_id)::bigint
+     WHERE root_id_int IS NULL
+       AND root_id ~ '^\s*[0-9]{1,18}\s*$'
+    """,
+    # root_id пока правят руками — держим root_id_int в синхроне триггером
+    r"""
+    CREATE OR REPLACE FUNCTION nomenclature_sync_root_id_int() RETURNS trigger AS $$
+    BEGIN
+        IF NEW.root_id ~ '^\s*[0-9]{1,18}\s*$' THEN
+            NEW.root_id_int := btrim(NEW.root_id)::bigint;
+        ELSE
+            NEW.root_id_int := NULL;
+        END IF;
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS trg_nomenclature_root_id_int ON nomenclature",
+    """
+    CREATE TRIGGER trg_nomenclature_root_id_int
+        BEFORE INSERT OR UPDATE OF root_id ON nomenclature
+        FOR EACH ROW EXECUTE FUNCTION nomenclature_sync_root_id_int()
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_brands_company_name_daytime ON brands (company_id, name, is_daytime)",
+    "CREATE INDEX IF NOT EXISTS ix_nomenclature_company_root ON nomenclature (company_id, root_id_int)",
+    "CREATE INDEX IF NOT EXISTS ix_companies_api_key ON companies (api_key)",
+    "CREATE INDEX IF NOT EXISTS ix_schedules_lookup ON schedules (user_id, action, weekday, time)",
+]
+
+DOWNGRADE = [
+    "DROP INDEX IF EXISTS ix_schedules_lookup",
+    "DROP INDEX IF EXISTS ix_companies_api_key",
+    "DROP INDEX IF EXISTS ix_nomenclature_company_root",
+    "DROP INDEX IF EXISTS ix_brands_company_name_daytime",
+    "DROP TRIGGER IF EXISTS trg_nomenclature_root_id_int ON nomenclature",
+    "DROP FUNCTION IF EXISTS nomenclature_sync_root_id_int()",
+    "ALTER TABLE nomenclature DROP COLUMN IF EXISTS root_id_int",
+]
@@ -0,0 +1,32 @@
+"""
+История запусков: длительности фаз, запросы/повторы, счётчики карточек (/stats).
+"""
+
+REVISION = "0002"
+DESCRIPTION = "run_stats table"
+
+UPGRADE = [
+    """
+    CREATE TABLE IF NOT EXISTS run_stats (
+        id            SERIAL PRIMARY KEY,
+        action        VARCHAR NOT NULL,
+        status        VARCHAR NOT NULL,
+        started_at    TIMESTAMPTZ NOT NULL,
+        finished_at   TIMESTAMPTZ,
+        duration      DOUBLE PRECISION NOT NULL DEFAULT 0,
+        phases        JSON NOT NULL DEFAULT '{}',
+        requests      INTEGER NOT NULL DEFAULT 0,
+        retries       INTEGER NOT NULL DEFAULT 0,
+        cards_fetched INTEGER NOT NULL DEFAULT 0,
+        cards_decided INTEGER NOT NULL DEFAULT 0,
+        cards_sent    INTEGER NOT NULL DEFAULT 0,
+        cards_failed  INTEGER NOT NULL DEFAULT 0,
+        error         VARCHAR
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_run_stats_started_at ON run_stats (started_at)",
+]
+
+DOWNGRADE = [
+    "DROP TABLE IF EXISTS run_stats",
+]
@@ -0,0 +1,63 @@
+"""
+Очередь работ для воркеров и общие на все процессы квоты по api_key.
+
+- run_jobs        — запуск all_from/all_to, поставленный ботом
+- work_units      — единица работы (компания, фаза); воркеры берут её через FOR UPDATE SKIP LOCKED
+- api_key_quotas  — следующий свободный слот запроса к Content API на токен (sha1 ключа)
+"""
+
+REVISION = "0003"
+DESCRIPTION = "work queue, shared api key quotas"
+
+UPGRADE = [
+    """
+    CREATE TABLE IF NOT EXISTS run_jobs (
+        id           SERIAL PRIMARY KEY,
+        action       VARCHAR NOT NULL,
+        weekend      BOOLEAN,
+        status       VARCHAR NOT NULL DEFAULT 'queued',
+        requested_by BIGINT,
+        created_at   TIMESTAMPTZ NOT NULL DEFAULT now(),
+        deadline_at  TIMESTAMPTZ,
+        finished_at  TIMESTAMPTZ
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS work_units (
+        id           SERIAL PRIMARY KEY,
+        job_id       INTEGER NOT NULL REFERENCES run_jobs (id) ON DELETE CASCADE,
+        company_id   INTEGER NOT NULL REFERENCES companies (id) ON DELETE CASCADE,
+        phase        VARCHAR NOT NULL,
+        status       VARCHAR NOT NULL DEFAULT 'queued',
+        attempts     INTEGER NOT NULL DEFAULT 0,
+        available_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        worker_id    VARCHAR,
+        claimed_at   TIMESTAMPTZ,
+        heartbeat_at TIMESTAMPTZ,
+        finished_at  TIMESTAMPTZ,
+        result       JSON,
+        error        VARCHAR,
+        CONSTRAINT uq_work_units_job_company_phase UNIQUE (job_id, company_id, phase)
+    )
+    """,
+    # выборка воркером: только живые статусы, по порядку постановки
+    """
+    CREATE INDEX IF NOT EXISTS ix_work_units_claim
+        ON work_units (status, available_at, id)
+     WHERE status IN ('queued', 'running')
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_work_units_job ON work_units (job_id, status)",
+    """
+    CREATE TABLE IF NOT EXISTS api_key_quotas (
+        key_hash     VARCHAR(40) PRIMARY KEY,
+        next_slot_at TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp(),
+        interval_s   DOUBLE PRECISION NOT NULL
+    )
+    """,
+]
+
+DOWNGRADE = [
+    "DROP TABLE IF EXISTS api_key_quotas",
+    "DROP TABLE IF EXISTS work_units",
+    "DROP TABLE IF EXISTS run_jobs",
+]
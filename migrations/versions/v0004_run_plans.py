@@ -0,0 +1,43 @@
+"""
+План запуска без отправки и кэш карточек, на котором он считается.
+
+- card_cache  — последний ответ cards/list по (компания, root); пишется при каждом запуске
+- run_plans   — посчитанный план all_from/all_to: разница по компаниям, оценка запросов
+                и времени, готовые payload; оператор подтверждает — план выполняется без загрузки
+"""
+
+REVISION = "0004"
+DESCRIPTION = "card cache, run plans"
+
+UPGRADE = [
+    """
+    CREATE TABLE IF NOT EXISTS card_cache (
+        company_id INTEGER NOT NULL REFERENCES companies (id) ON DELETE CASCADE,
+        root_id    BIGINT NOT NULL,
+        cards      JSON NOT NULL,
+        fetched_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        PRIMARY KEY (company_id, root_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS run_plans (
+        id          SERIAL PRIMARY KEY,
+        action      VARCHAR NOT NULL,
+        weekend     BOOLEAN,
+        status      VARCHAR NOT NULL DEFAULT 'draft',
+        created_by  BIGINT,
+        created_at  TIMESTAMPTZ NOT NULL DEFAULT now(),
+        expires_at  TIMESTAMPTZ NOT NULL,
+        approved_by BIGINT,
+        approved_at TIMESTAMPTZ,
+        finished_at TIMESTAMPTZ,
+        summary     JSON NOT NULL DEFAULT '{}',
+        cards       JSON NOT NULL DEFAULT '[]'
+    )
+    """,
+]
+
+DOWNGRADE = [
+    "DROP TABLE IF EXISTS run_plans",
+    "DROP TABLE IF EXISTS card_cache",
+]
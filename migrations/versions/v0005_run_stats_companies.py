@@ -0,0 +1,16 @@
+"""
+Время готовности каждой компании в запуске (справедливое расписание по кабинетам).
+
+- run_stats.companies — {имя компании: секунд от старта запуска до её последней работы}
+"""
+
+REVISION = "0005"
+DESCRIPTION = "run_stats per-company completion"
+
+UPGRADE = [
+    "ALTER TABLE run_stats ADD COLUMN IF NOT EXISTS companies JSON NOT NULL DEFAULT '{}'",
+]
+
+DOWNGRADE = [
+    "ALTER TABLE run_stats DROP COLUMN IF EXISTS companies",
+]
@@ -0,0 +1,16 @@
+"""
+Выборочные запуски в очереди работ.
+
+- run_jobs.root_ids — отбор root задания (JSON {"company_id": [root, ...]}); NULL — все root компаний единиц
+"""
+
+REVISION = "0006"
+DESCRIPTION = "run_jobs root scope"
+
+UPGRADE = [
+    "ALTER TABLE run_jobs ADD COLUMN IF NOT EXISTS root_ids JSON",
+]
+
+DOWNGRADE = [
+    "ALTER TABLE run_jobs DROP COLUMN IF EXISTS root_ids",
+]
@@ -0,0 +1,25 @@
+"""
+Строки отчёта запуска в очереди — отдельной таблицей, а не в work_units.result.
+
+- run_export_rows — строка листа «Карточки» на карточку; воркер пишет их COPY при
+  закрытии единицы, бот читает потоком и удаляет по завершении задания
+"""
+
+REVISION = "0007"
+DESCRIPTION = "run export rows"
+
+UPGRADE = [
+    """
+    CREATE TABLE IF NOT EXISTS run_export_rows (
+        id      BIGSERIAL PRIMARY KEY,
+        job_id  INTEGER NOT NULL REFERENCES run_jobs (id) ON DELETE CASCADE,
+        unit_id INTEGER NOT NULL REFERENCES work_units (id) ON DELETE CASCADE,
+        row     JSON NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_run_export_rows_job ON run_export_rows (job_id, id)",
+]
+
+DOWNGRADE = [
+    "DROP TABLE IF EXISTS run_export_rows",
+]
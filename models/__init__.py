@@ -4,4 +4,7 @@ from .brand import Brand
 from .holiday import Holiday
 from .nomenclature import Nomenclature
 from .allowed_user import AllowedUser
-from .schedule import Schedule
\ No newline at end of file
+from .schedule import Schedule
+from .run_stat import RunStat
+from .work_queue import RunJob, WorkUnit, RunExportRow, ApiKeyQuota
+from .run_plan import CardCache, RunPlan
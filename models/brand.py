@@ -1,9 +1,12 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from .base import Base
 
 class Brand(Base):
     __tablename__ = "brands"
+    __table_args__ = (
+        Index("ix_brands_company_name_daytime", "company_id", "name", "is_daytime"),
+    )
 
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, ForeignKey, Index
 from sqlalchemy.orm import relationship
 
 from .brand import Brand
@@ -6,6 +6,9 @@ from .base import Base
 
 class Company(Base):
     __tablename__ = "companies"
+    __table_args__ = (
+        Index("ix_companies_api_key", "api_key"),
+    )
 
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Date, String, select
+from sqlalchemy import Column, Integer, Date, String
 from .base import Base
 from config import config
 
@@ -11,11 +11,8 @@ class Holiday(Base):
 
     @staticmethod
     async def is_day_off(target_date: date) -> bool:
-        if target_date.weekday() >= 5:
-            return True
+        # календарь в памяти: импорт здесь, чтобы не зациклить models <-> services
+        from utils.business_calendar import business_calendar
 
-        async with config.AsyncSessionLocal() as session:
-            result = await session.execute(
-                select(Holiday).where(Holiday.date == target_date)
-            )
-            return result.scalar_one_or_none() is not None
+        await business_calendar.ensure_loaded(config.AsyncSessionLocal)
+        return business_calendar.is_day_off(target_date)
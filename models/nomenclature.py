@@ -1,15 +1,29 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from .base import Base
 
 class Nomenclature(Base):
     __tablename__ = "nomenclature"
+    __table_args__ = (
+        Index("ix_nomenclature_company_root", "company_id", "root_id_int"),
+    )
 
     id = Column(Integer, primary_key=True)
     wb_article = Column(String, nullable=False)
     root_id = Column(String, nullable=False)
+    root_id_int = Column(BigInteger, nullable=True)  # заполняется триггером из root_id (миграция 0001)
     original_brand = Column(String, nullable=True)
 
     company_id = Column(Integer, ForeignKey("companies.id"), nullable=False)
 
     company = relationship("Company", back_populates="nomenclatures")
+
+    @property
+    def root_id_value(self) -> int | None:
+        """Целочисленный root_id: из root_id_int, для старых строк — разбором строки."""
+        if self.root_id_int is not None:
+            return int(self.root_id_int)
+        try:
+            return int(self.root_id)
+        except (TypeError, ValueError):
+            return None
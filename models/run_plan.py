@@ -0,0 +1,35 @@
+from sqlalchemy import Column, Integer, BigInteger, String, Boolean, DateTime, JSON, ForeignKey, func
+from .base import Base
+
+# статусы плана
+PLAN_DRAFT = "draft"          # посчитан, ждёт подтверждения
+PLAN_APPROVED = "approved"    # подтверждён, выполняется
+PLAN_DONE = "done"
+PLAN_FAILED = "failed"
+PLAN_CANCELLED = "cancelled"
+
+
+class CardCache(Base):
+    __tablename__ = "card_cache"
+
+    company_id = Column(Integer, ForeignKey("companies.id", ondelete="CASCADE"), primary_key=True)
+    root_id = Column(BigInteger, primary_key=True)
+    cards = Column(JSON, nullable=False)    # карточки как их вернул cards/list, без наших полей
+    fetched_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+
+class RunPlan(Base):
+    __tablename__ = "run_plans"
+
+    id = Column(Integer, primary_key=True)
+    action = Column(String, nullable=False)          # all_from / all_to
+    weekend = Column(Boolean, nullable=True)         # режим all_from, зафиксирован в плане
+    status = Column(String, nullable=False, default=PLAN_DRAFT)
+    created_by = Column(BigInteger, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    approved_by = Column(BigInteger, nullable=True)
+    approved_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    summary = Column(JSON, nullable=False, default=dict)   # разница по компаниям и оценка
+    cards = Column(JSON, nullable=False, default=list)     # [{company_id, root, before, payload}]
@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, String, DateTime, Float, JSON, Index
+from .base import Base
+
+class RunStat(Base):
+    __tablename__ = "run_stats"
+    __table_args__ = (
+        Index("ix_run_stats_started_at", "started_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    action = Column(String, nullable=False)          # all_from / all_to
+    status = Column(String, nullable=False)          # ok / error
+    started_at = Column(DateTime(timezone=True), nullable=False)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    duration = Column(Float, nullable=False, default=0.0)
+
+    phases = Column(JSON, nullable=False, default=dict)   # {"fetch": 12.3, "send": 4.5, ...}
+    companies = Column(JSON, nullable=False, default=dict)  # {"ООО Ромашка": 41.0, ...} — готовность от старта
+    requests = Column(Integer, nullable=False, default=0)
+    retries = Column(Integer, nullable=False, default=0)
+
+    cards_fetched = Column(Integer, nullable=False, default=0)
+    cards_decided = Column(Integer, nullable=False, default=0)
+    cards_sent = Column(Integer, nullable=False, default=0)
+    cards_failed = Column(Integer, nullable=False, default=0)
+
+    error = Column(String, nullable=True)
@@ -0,0 +1,74 @@
+from sqlalchemy import Column, Integer, BigInteger, String, Boolean, DateTime, Float, JSON, ForeignKey, Index, \
+    UniqueConstraint, text, func
+from .base import Base
+
+# статусы задания и единицы работы
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# фазы единицы работы
+PHASE_APPLY = "apply"     # получить карточки компании, решить, отправить
+PHASE_VERIFY = "verify"   # проверка после отправки (только all_from)
+
+
+class RunJob(Base):
+    __tablename__ = "run_jobs"
+
+    id = Column(Integer, primary_key=True)
+    action = Column(String, nullable=False)          # all_from / all_to
+    weekend = Column(Boolean, nullable=True)         # режим all_from, решает бот при постановке
+    status = Column(String, nullable=False, default=QUEUED)
+    requested_by = Column(BigInteger, nullable=True)
+    root_ids = Column(JSON, nullable=True)           # выборочный запуск: {"company_id": [root]}; None — все
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    deadline_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class WorkUnit(Base):
+    __tablename__ = "work_units"
+    __table_args__ = (
+        UniqueConstraint("job_id", "company_id", "phase", name="uq_work_units_job_company_phase"),
+        Index(
+            "ix_work_units_claim", "status", "available_at", "id",
+            postgresql_where=text("status IN ('queued', 'running')"),
+        ),
+        Index("ix_work_units_job", "job_id", "status"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    job_id = Column(Integer, ForeignKey("run_jobs.id", ondelete="CASCADE"), nullable=False)
+    company_id = Column(Integer, ForeignKey("companies.id", ondelete="CASCADE"), nullable=False)
+    phase = Column(String, nullable=False)
+    status = Column(String, nullable=False, default=QUEUED)
+    attempts = Column(Integer, nullable=False, default=0)
+    available_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    worker_id = Column(String, nullable=True)
+    claimed_at = Column(DateTime(timezone=True), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    result = Column(JSON, nullable=True)   # ошибки и статистика единицы; строки отчёта — в run_export_rows
+    error = Column(String, nullable=True)
+
+
+class RunExportRow(Base):
+    """Строка отчёта, записанная воркером при закрытии единицы; бот читает их потоком."""
+    __tablename__ = "run_export_rows"
+    __table_args__ = (
+        Index("ix_run_export_rows_job", "job_id", "id"),
+    )
+
+    id = Column(BigInteger, primary_key=True)
+    job_id = Column(Integer, ForeignKey("run_jobs.id", ondelete="CASCADE"), nullable=False)
+    unit_id = Column(Integer, ForeignKey("work_units.id", ondelete="CASCADE"), nullable=False)
+    row = Column(JSON, nullable=False)     # строка листа «Карточки» (CARD_HEADER)
+
+
+class ApiKeyQuota(Base):
+    __tablename__ = "api_key_quotas"
+
+    key_hash = Column(String(40), primary_key=True)   # sha1(api_key), сам ключ здесь не храним
+    next_slot_at = Column(DateTime(timezone=True), nullable=False, server_default=func.clock_timestamp())
+    interval_s = Column(Float, nullable=False)
@@ -1,15 +1,34 @@
 import asyncio
-import traceback
+import logging
+import time
+from collections import defaultdict
 from datetime import datetime, timedelta
 
 import pytz
 from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import async_sessionmaker
 
 from models import Schedule
 from services.schedule_service import is_schedule_still_exists
 
+logger = logging.getLogger(__name__)
+
+# уведомления о восстановленных задачах: не больше стольких пользователей одновременно
+RESTORE_NOTIFY_CONCURRENCY = 5
+RESTORE_NOTIFY_TIMEOUT = 15
+RESTORE_LINES_PER_MESSAGE = 40
+
+# держим ссылки на фоновые задачи: asyncio хранит только слабые, без них задачу может собрать GC
+_tasks: set[asyncio.Task] = set()
+
+
+def _keep(task: asyncio.Task) -> asyncio.Task:
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return task
+
 DAYS_MAPPING_REVERSE = {
     0: "ПН",
     1: "ВТ",
@@ -57,46 +76,89 @@ def schedule_weekly_task(
                 try:
                     await callback(user_id, action, bot=bot)
                 except Exception as e:
-                    print(f"[Ошибка выполнения задачи] user_id={user_id}, action={action}: {e}")
-                    traceback.print_exc()
+                    logger.exception("[Ошибка выполнения задачи] user_id=%s, action=%s: %s", user_id, action, e)
             else:
-                print(f"⛔️ Задача для user_id={user_id} удалена из БД, останавливаем.")
+                logger.info("⛔️ Задача для user_id=%s удалена из БД, останавливаем.", user_id)
                 return
 
-    asyncio.create_task(run_periodically())
+    _keep(asyncio.create_task(run_periodically()))
 
 
-async def schedule_all_tasks(session_maker: async_sessionmaker, callback, bot: Bot):
+async def restore_schedules(session_maker: async_sessionmaker, callback, bot: Bot) -> list[Schedule]:
+    """Поднимает задачи из БД в памяти: один SELECT и create_task на каждую, без Telegram."""
     async with session_maker() as session:
         result = await session.execute(select(Schedule))
-        schedules = result.scalars().all()
+        schedules = list(result.scalars().all())
 
     for schedule in schedules:
-        weekday = schedule.weekday
-        hour = schedule.time.hour
-        minute = schedule.time.minute
-        user_id = schedule.user_id
-        action = schedule.action
-
         schedule_weekly_task(
             session_maker=session_maker,
-            weekday=weekday,
-            hour=hour,
-            minute=minute,
+            weekday=schedule.weekday,
+            hour=schedule.time.hour,
+            minute=schedule.time.minute,
             callback=callback,
-            user_id=user_id,
-            action=action,
+            user_id=schedule.user_id,
+            action=schedule.action,
             bot=bot,
         )
+    logger.info("🔁 Восстановлено задач: %s", len(schedules))
+    return schedules
 
-        day_str = DAYS_MAPPING_REVERSE.get(weekday, str(weekday))
 
+def restore_messages(schedules: list[Schedule]) -> dict[int, list[str]]:
+    """По одному сообщению на пользователя (длинные списки — кусками по RESTORE_LINES_PER_MESSAGE)."""
+    lines_by_user: dict[int, list[str]] = defaultdict(list)
+    for schedule in sorted(schedules, key=lambda s: (s.user_id, s.weekday, s.time)):
+        day_str = DAYS_MAPPING_REVERSE.get(schedule.weekday, str(schedule.weekday))
+        lines_by_user[schedule.user_id].append(
+            f"• '{schedule.action}' — {day_str} {schedule.time.hour:02}:{schedule.time.minute:02}"
+        )
+
+    messages: dict[int, list[str]] = {}
+    for user_id, lines in lines_by_user.items():
+        chunks = [lines[i:i + RESTORE_LINES_PER_MESSAGE] for i in range(0, len(lines), RESTORE_LINES_PER_MESSAGE)]
+        messages[user_id] = ["✅ Задачи восстановлены (время МСК):\n" + "\n".join(chunk) for chunk in chunks]
+    return messages
+
+
+async def _send_restore_message(bot: Bot, user_id: int, text: str) -> bool:
+    for _ in range(2):
         try:
-            await bot.send_message(
-                chat_id=user_id,
-                text=f"✅ Задача для '{action}' запланирована на {day_str} {hour:02}:{minute:02} по МСК",
-                request_timeout=90,
-            )
-            print(f"🔁 Задача восстановлена: user_id={user_id}, action={action}, {day_str} {hour:02}:{minute:02}")
+            await bot.send_message(chat_id=user_id, text=text, request_timeout=RESTORE_NOTIFY_TIMEOUT)
+            return True
+        except TelegramRetryAfter as e:
+            # флуд-контроль Telegram: ждём сколько сказали и пробуем ещё раз
+            await asyncio.sleep(e.retry_after)
         except Exception as e:
-            print(f"[schedule_all_tasks] Не удалось отправить уведомление user_id={user_id}: {e}")
\ No newline at end of file
+            logger.warning("[restore] Не удалось отправить уведомление user_id=%s: %s", user_id, e)
+            return False
+    return False
+
+
+async def notify_restored(bot: Bot, schedules: list[Schedule]) -> None:
+    """Фоном, после старта поллинга: медленный Telegram не задерживает ответы бота."""
+    started = time.perf_counter()
+    semaphore = asyncio.Semaphore(RESTORE_NOTIFY_CONCURRENCY)
+
+    async def notify(user_id: int, texts: list[str]) -> bool:
+        async with semaphore:
+            ok = True
+            for text in texts:
+                ok = await _send_restore_message(bot, user_id, text) and ok
+            return ok
+
+    messages = restore_messages(schedules)
+    results = await asyncio.gather(*(notify(user_id, texts) for user_id, texts in messages.items()))
+    logger.info(
+        "📨 Уведомления о восстановлении: %s из %s пользователей за %.1fs",
+        sum(results), len(results), time.perf_counter() - started,
+    )
+
+
+async def schedule_all_tasks(session_maker: async_sessionmaker, callback, bot: Bot) -> asyncio.Task:
+    """
+    Восстанавливает задачи и сразу возвращается; уведомления пользователям
+    уходят фоновой задачей (её и возвращаем).
+    """
+    schedules = await restore_schedules(session_maker, callback, bot)
+    return _keep(asyncio.create_task(notify_restored(bot, schedules)))
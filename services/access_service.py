@@ -1,7 +1,9 @@
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from models.allowed_user import AllowedUser
+from utils.metrics import db_timed
 
+@db_timed
 async def is_user_allowed(session: AsyncSession, user_id: int) -> bool:
     """
     Проверяет, есть ли пользователь в таблице allowed_users.
@@ -2,8 +2,10 @@ from sqlalchemy import select, distinct
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from models import Brand
+from utils.metrics import db_timed
 
 
+@db_timed
 async def get_night_brands(session: AsyncSession) -> list[Brand]:
     """
     Возвращает список брендов, которые работают ночью (is_daytime = False)
@@ -13,6 +15,7 @@ async def get_night_brands(session: AsyncSession) -> list[Brand]:
     return list(result.scalars().all())
 
 
+@db_timed
 async def get_night_brand_wbids(session, company_id: int, default_brand: str) -> list[int]:
     """
     Возвращает WB ID всех ночных брендов компании, кроме default_brand.
@@ -28,6 +31,7 @@ async def get_night_brand_wbids(session, company_id: int, default_brand: str) ->
     return [brand.wbID for brand in brands]
 
 
+@db_timed
 async def get_all_brand_wbids_except_default(session, company_id: int, default_brand: str) -> list[int]:
     """
     Возвращает WB ID всех брендов компании, кроме default_brand.
@@ -42,6 +46,7 @@ async def get_all_brand_wbids_except_default(session, company_id: int, default_b
     return [brand.wbID for brand in brands]
 
 
+@db_timed
 async def get_all_brand_wbids_except_default(session, default_brand: str) -> list[int]:
     """
     Возвращает уникальные WB ID всех брендов (всех компаний), кроме default_brand.
@@ -52,6 +57,7 @@ async def get_all_brand_wbids_except_default(session, default_brand: str) -> lis
     wbids = result.scalars().all()
     return list(wbids)
 
+@db_timed
 async def is_night_brand(session: AsyncSession, company_id: int, brand_name: str) -> bool:
     """
     True, если бренд с именем brand_name для компании company_id помечен как ночной (is_daytime = False).
@@ -0,0 +1,43 @@
+from datetime import datetime
+
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import CardCache
+from utils.metrics import db_timed
+
+# строк на один INSERT: 3 параметра на строку, asyncpg держит до 32767
+CACHE_WRITE_CHUNK = 1000
+
+
+@db_timed
+async def save_card_cache(session: AsyncSession, company_id: int, cards_by_root: dict[int, list[dict]]) -> None:
+    """Upsert ответов cards/list компании: {root_id: карточки}."""
+    rows = [
+        {"company_id": company_id, "root_id": root_id, "cards": cards}
+        for root_id, cards in cards_by_root.items()
+    ]
+    for start in range(0, len(rows), CACHE_WRITE_CHUNK):
+        stmt = insert(CardCache).values(rows[start:start + CACHE_WRITE_CHUNK])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[CardCache.company_id, CardCache.root_id],
+            set_={"cards": stmt.excluded.cards, "fetched_at": func.now()},
+        )
+        await session.execute(stmt)
+    await session.commit()
+
+
+@db_timed
+async def get_card_cache(
+    session: AsyncSession, company_ids: list[int]
+) -> dict[int, dict[int, tuple[list[dict], datetime]]]:
+    """{company_id: {root_id: (карточки, когда получены)}}."""
+    result = await session.execute(
+        select(CardCache.company_id, CardCache.root_id, CardCache.cards, CardCache.fetched_at)
+        .where(CardCache.company_id.in_(company_ids))
+    )
+    cache: dict[int, dict[int, tuple[list[dict], datetime]]] = {}
+    for company_id, root_id, cards, fetched_at in result.all():
+        cache.setdefault(company_id, {})[root_id] = (cards, fetched_at)
+    return cache
@@ -6,7 +6,9 @@ from models import Nomenclature
 from models.company import Company
 
 from sqlalchemy.exc import InterfaceError
+from utils.metrics import db_timed
 
+@db_timed
 async def get_all_companies(session) -> list[Company]:
     stmt = (
         select(Company)
@@ -18,6 +20,7 @@ async def get_all_companies(session) -> list[Company]:
     result = await session.execute(stmt)
     return list(result.scalars().all())
 
+@db_timed
 async def get_sorted_companies(session: AsyncSession) -> list[Company]:
     """
     Возвращает компании, отсортированные по убыванию cabinet_order.
@@ -31,6 +34,7 @@ async def get_sorted_companies(session: AsyncSession) -> list[Company]:
 
 
 
+@db_timed
 async def get_companies_with_nomenclature(session: AsyncSession) -> list[Company]:
     result = await session.execute(
         select(Company)
@@ -40,6 +44,17 @@ async def get_companies_with_nomenclature(session: AsyncSession) -> list[Company
     return list(result.scalars().all())
 
 
+@db_timed
+async def get_company_ids_with_nomenclature(session: AsyncSession) -> list[int]:
+    """id компаний, у которых есть номенклатура, в порядке cabinet_order (для очереди работ)."""
+    has_nomenclature = select(Nomenclature.id).where(Nomenclature.company_id == Company.id).exists()
+    result = await session.execute(
+        select(Company.id).where(has_nomenclature).order_by(asc(Company.cabinet_order), asc(Company.id))
+    )
+    return list(result.scalars().all())
+
+
+@db_timed
 async def get_company_by_api_key(session, api_key: str):
     stmt = (
         select(Company)
@@ -1,13 +1,35 @@
 from datetime import date
-from sqlalchemy import select
+from sqlalchemy import select, func, String, literal_column
+from sqlalchemy.dialects.postgresql import aggregate_order_by
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from models import Holiday
+from utils.metrics import db_timed
 
 
+@db_timed
 async def is_date_in_holidays(session: AsyncSession, target_date: date) -> bool:
     """True, если дата есть в таблице holidays."""
     res = await session.execute(
         select(Holiday.date).where(Holiday.date == target_date)
     )
     return res.scalar_one_or_none() is not None
+
+
+@db_timed
+async def get_holiday_dates(session: AsyncSession) -> list[date]:
+    """Все даты из таблицы holidays, по возрастанию."""
+    res = await session.execute(select(Holiday.date).order_by(Holiday.date))
+    return list(res.scalars().all())
+
+
+@db_timed
+async def get_holidays_fingerprint(session: AsyncSession) -> tuple[int, str]:
+    """
+    Дешёвый «отпечаток» таблицы holidays (count, md5 дат) — по нему календарь
+    понимает, что таблицу поменяли руками, в том числе правкой даты на месте.
+    """
+    dates = func.string_agg(Holiday.date.cast(String), aggregate_order_by(literal_column("','"), Holiday.date))
+    res = await session.execute(select(func.count(Holiday.id), func.md5(func.coalesce(dates, ""))))
+    count, digest = res.one()
+    return int(count or 0), digest
@@ -0,0 +1,105 @@
+import asyncio
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from models.company import Company
+from utils.import_utils import NomenclatureRecord, ImportReport, iter_table_rows, parse_nomenclature_rows
+from utils.metrics import db_timed
+
+STAGING_TABLE = "nomenclature_staging"
+STAGING_COLUMNS = ["company_id", "root_id", "wb_article", "original_brand"]
+
+
+@db_timed
+async def bulk_import_nomenclature(
+    engine: AsyncEngine,
+    records: list[NomenclatureRecord],
+    report: ImportReport,
+) -> ImportReport:
+    """
+    Массовая загрузка номенклатуры: COPY во временную staging-таблицу,
+    затем слияние с nomenclature по (company_id, root_id_int) одной транзакцией.
+    Существующие строки обновляются (wb_article, original_brand), новые — добавляются.
+    """
+    if not records:
+        return report
+
+    async with engine.begin() as conn:
+        result = await conn.execute(select(Company.company_id, Company.id))
+        company_ids = {supplier_id: pk for supplier_id, pk in result.all() if supplier_id is not None}
+
+        rows = []
+        for rec in records:
+            pk = company_ids.get(rec.company_id)
+            if pk is None:
+                report.add_error(f"root_id={rec.root_id}: компания {rec.company_id} не найдена")
+                report.valid -= 1
+                continue
+            rows.append((pk, rec.root_id, rec.wb_article, rec.original_brand))
+
+        if not rows:
+            return report
+
+        # первая команда открывает транзакцию — COPY пойдёт в неё же
+        await conn.exec_driver_sql(
+            f"""
+            CREATE TEMP TABLE {STAGING_TABLE} (
+                company_id     INTEGER NOT NULL,
+                root_id        BIGINT  NOT NULL,
+                wb_article     VARCHAR NOT NULL,
+                original_brand VARCHAR
+            ) ON COMMIT DROP
+            """
+        )
+
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            STAGING_TABLE, records=rows, columns=STAGING_COLUMNS
+        )
+        await conn.exec_driver_sql(f"ANALYZE {STAGING_TABLE}")
+
+        updated = await conn.exec_driver_sql(
+            f"""
+            UPDATE nomenclature AS n
+               SET wb_article = s.wb_article,
+                   original_brand = s.original_brand
+              FROM {STAGING_TABLE} AS s
+             WHERE n.company_id = s.company_id
+               AND n.root_id_int = s.root_id
+               AND (n.wb_article IS DISTINCT FROM s.wb_article
+                    OR n.original_brand IS DISTINCT FROM s.original_brand)
+            """
+        )
+        inserted = await conn.exec_driver_sql(
+            f"""
+            INSERT INTO nomenclature (company_id, root_id, root_id_int, wb_article, original_brand)
+            SELECT s.company_id, s.root_id::text, s.root_id, s.wb_article, s.original_brand
+              FROM {STAGING_TABLE} AS s
+             WHERE NOT EXISTS (
+                   SELECT 1 FROM nomenclature AS n
+                    WHERE n.company_id = s.company_id
+                      AND n.root_id_int = s.root_id
+             )
+            """
+        )
+
+    report.updated += updated.rowcount or 0
+    report.inserted += inserted.rowcount or 0
+    return report
+
+
+async def import_nomenclature_file(
+    engine: AsyncEngine,
+    path: str,
+    *,
+    default_company_id: int | None = None,
+) -> ImportReport:
+    """Читает XLSX/CSV (в отдельном потоке, чтобы не держать event loop) и загружает в БД."""
+    report = ImportReport()
+    records = await asyncio.to_thread(
+        lambda: parse_nomenclature_rows(
+            iter_table_rows(path), report, default_company_id=default_company_id
+        )
+    )
+    return await bulk_import_nomenclature(engine, records, report)
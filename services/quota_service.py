@@ -0,0 +1,53 @@
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from utils.metrics import db_timed
+
+# следующий слот = max(предыдущий + интервал, сейчас); вернуть, сколько до него ждать.
+# Строка блокируется на время UPDATE — два воркера не получат один слот.
+_RESERVE_SQL = text(
+    """
+    INSERT INTO api_key_quotas AS q (key_hash, next_slot_at, interval_s)
+    VALUES (:key_hash, clock_timestamp(), :interval_s)
+    ON CONFLICT (key_hash) DO UPDATE
+       SET next_slot_at = greatest(q.next_slot_at + make_interval(secs => q.interval_s), clock_timestamp())
+    RETURNING greatest(0, extract(epoch FROM q.next_slot_at - clock_timestamp()))
+    """
+)
+
+_PENALIZE_SQL = text(
+    """
+    UPDATE api_key_quotas
+       SET interval_s = least(interval_s * :factor, :max_interval)
+     WHERE key_hash = :key_hash
+    """
+)
+
+_RELAX_SQL = text(
+    """
+    UPDATE api_key_quotas
+       SET interval_s = greatest(interval_s * :factor, :base_interval)
+     WHERE key_hash = :key_hash
+       AND interval_s > :base_interval
+    """
+)
+
+
+@db_timed
+async def reserve_key_slot(session: AsyncSession, key_hash: str, base_interval: float) -> float:
+    """Бронирует слот запроса для токена; возвращает, сколько секунд подождать до него."""
+    result = await session.execute(_RESERVE_SQL, {"key_hash": key_hash, "interval_s": base_interval})
+    await session.commit()
+    return float(result.scalar_one())
+
+
+@db_timed
+async def penalize_key(session: AsyncSession, key_hash: str, factor: float, max_interval: float) -> None:
+    await session.execute(_PENALIZE_SQL, {"key_hash": key_hash, "factor": factor, "max_interval": max_interval})
+    await session.commit()
+
+
+@db_timed
+async def relax_key(session: AsyncSession, key_hash: str, factor: float, base_interval: float) -> None:
+    await session.execute(_RELAX_SQL, {"key_hash": key_hash, "factor": factor, "base_interval": base_interval})
+    await session.commit()
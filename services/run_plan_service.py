@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import update, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import RunPlan
+from models.run_plan import PLAN_DRAFT, PLAN_APPROVED, PLAN_CANCELLED
+from utils.metrics import db_timed
+
+
+@db_timed
+async def create_plan(
+    session: AsyncSession,
+    action: str,
+    *,
+    weekend: bool | None,
+    summary: dict,
+    cards: list[dict],
+    created_by: int | None,
+    ttl_seconds: float,
+) -> RunPlan:
+    plan = RunPlan(
+        action=action,
+        weekend=weekend,
+        status=PLAN_DRAFT,
+        created_by=created_by,
+        expires_at=datetime.now(timezone.utc) + timedelta(seconds=ttl_seconds),
+        summary=summary,
+        cards=cards,
+    )
+    session.add(plan)
+    await session.commit()
+    return plan
+
+
+@db_timed
+async def approve_plan(session: AsyncSession, plan_id: int, approved_by: int | None) -> RunPlan | None:
+    """
+    draft -> approved одним UPDATE: двойное нажатие или второй оператор не
+    выполнят план дважды. None — плана нет, он уже выполнен/отменён или протух.
+    """
+    result = await session.execute(
+        update(RunPlan)
+        .where(RunPlan.id == plan_id, RunPlan.status == PLAN_DRAFT, RunPlan.expires_at > func.now())
+        .values(status=PLAN_APPROVED, approved_by=approved_by, approved_at=func.now())
+        .returning(RunPlan.id)
+    )
+    approved_id = result.scalar_one_or_none()
+    await session.commit()
+    if approved_id is None:
+        return None
+    return await session.get(RunPlan, approved_id)
+
+
+@db_timed
+async def cancel_plan(session: AsyncSession, plan_id: int) -> bool:
+    result = await session.execute(
+        update(RunPlan)
+        .where(RunPlan.id == plan_id, RunPlan.status == PLAN_DRAFT)
+        .values(status=PLAN_CANCELLED, finished_at=func.now())
+    )
+    await session.commit()
+    return result.rowcount > 0
+
+
+@db_timed
+async def finish_plan(session: AsyncSession, plan_id: int, status: str) -> None:
+    await session.execute(
+        update(RunPlan).where(RunPlan.id == plan_id).values(status=status, finished_at=func.now())
+    )
+    await session.commit()
@@ -0,0 +1,51 @@
+from sqlalchemy import select, desc
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import RunStat
+from utils.metrics import db_timed
+from utils.run_stats import RunStats, percentile
+
+
+@db_timed
+async def save_run_stat(session: AsyncSession, stats: RunStats) -> RunStat:
+    row = RunStat(
+        action=stats.action,
+        status=stats.status,
+        started_at=stats.started_at,
+        finished_at=stats.finished_at,
+        duration=stats.duration,
+        phases={name: round(seconds, 3) for name, seconds in stats.phases.items()},
+        companies={name: round(seconds, 1) for name, seconds in stats.companies.items()},
+        requests=stats.requests,
+        retries=stats.retries,
+        cards_fetched=stats.cards.get("fetched", 0),
+        cards_decided=stats.cards.get("decided", 0),
+        cards_sent=stats.cards.get("sent", 0),
+        cards_failed=stats.cards.get("failed", 0),
+        error=stats.error,
+    )
+    session.add(row)
+    await session.commit()
+    return row
+
+
+@db_timed
+async def get_last_run_stats(session: AsyncSession, limit: int = 10, action: str | None = None) -> list[RunStat]:
+    """Последние запуски, новые первыми."""
+    stmt = select(RunStat).order_by(desc(RunStat.started_at)).limit(limit)
+    if action:
+        stmt = stmt.where(RunStat.action == action)
+    result = await session.execute(stmt)
+    return list(result.scalars().all())
+
+
+def phase_percentiles(runs: list[RunStat]) -> dict[str, tuple[float, float]]:
+    """{фаза: (p50, p95)} по успешным запускам; 'total' — вся длительность."""
+    samples: dict[str, list[float]] = {}
+    for run in runs:
+        if run.status != "ok":
+            continue
+        for name, seconds in (run.phases or {}).items():
+            samples.setdefault(name, []).append(float(seconds))
+        samples.setdefault("total", []).append(float(run.duration))
+    return {name: (percentile(values, 50), percentile(values, 95)) for name, values in samples.items()}
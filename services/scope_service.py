@@ -0,0 +1,77 @@
+from sqlalchemy import select, func, asc
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Nomenclature
+from models.company import Company
+from utils.metrics import db_timed
+from utils.run_scope import RunScope
+
+# root в одном IN: asyncpg держит до 32767 параметров
+ROOTS_QUERY_CHUNK = 10000
+
+
+@db_timed
+async def scope_by_company(session: AsyncSession, query: str) -> RunScope | None:
+    """Компания по WB id поставщика, id в базе или названию (без учёта регистра)."""
+    query = query.strip()
+    if query.isdigit():
+        number = int(query)
+        company = (await session.execute(select(Company).where(Company.company_id == number))).scalar_one_or_none()
+        if company is None:
+            company = await session.get(Company, number)
+        companies = [company] if company is not None else []
+    else:
+        result = await session.execute(
+            select(Company).where(func.lower(Company.name) == query.lower()).order_by(asc(Company.cabinet_order))
+        )
+        companies = list(result.scalars().all())
+
+    if not companies:
+        return None
+    return RunScope(
+        company_ids={company.id for company in companies},
+        label="компания " + ", ".join(company.name for company in companies),
+    )
+
+
+@db_timed
+async def scope_by_brand(session: AsyncSession, brand: str) -> RunScope | None:
+    """
+    root, у которых в номенклатуре original_brand — этот бренд (без учёта регистра).
+    Каждый root — только у тех компаний, где в номенклатуре у него этот бренд.
+    """
+    result = await session.execute(
+        select(Nomenclature).where(func.lower(func.trim(Nomenclature.original_brand)) == brand.strip().lower())
+    )
+    company_roots: dict[int, set[int]] = {}
+    for nom in result.scalars().all():
+        if nom.root_id_value is not None:
+            company_roots.setdefault(nom.company_id, set()).add(nom.root_id_value)
+
+    if not company_roots:
+        return None
+    return RunScope(company_roots=company_roots, label=f"бренд {brand.strip()}")
+
+
+@db_timed
+async def scope_by_roots(session: AsyncSession, root_ids: set[int]) -> tuple[RunScope | None, set[int]]:
+    """
+    Отбор по списку root: каждый root — у компаний, в чьей номенклатуре он есть.
+    Второй элемент — root, которых в номенклатуре нет.
+    """
+    wanted = sorted(root_ids)
+    company_roots: dict[int, set[int]] = {}
+    found: set[int] = set()
+    for start in range(0, len(wanted), ROOTS_QUERY_CHUNK):
+        result = await session.execute(
+            select(Nomenclature.company_id, Nomenclature.root_id_int)
+            .where(Nomenclature.root_id_int.in_(wanted[start:start + ROOTS_QUERY_CHUNK]))
+        )
+        for company_id, root_id in result.all():
+            company_roots.setdefault(company_id, set()).add(int(root_id))
+            found.add(int(root_id))
+
+    missing = set(root_ids) - found
+    if not found:
+        return None, missing
+    return RunScope(company_roots=company_roots, label="список root"), missing
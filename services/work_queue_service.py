@@ -0,0 +1,250 @@
+import json
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Iterable
+
+from sqlalchemy import select, update, delete, func, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import RunJob, WorkUnit, RunExportRow
+from models.work_queue import QUEUED, RUNNING, DONE, FAILED, PHASE_APPLY
+from utils.metrics import db_timed
+
+MAX_UNIT_ATTEMPTS = 3
+
+EXPORT_ROWS_TABLE = "run_export_rows"
+EXPORT_ROWS_COLUMNS = ("job_id", "unit_id", "row")
+# строк отчёта за одну выборку, пока бот читает их потоком
+EXPORT_ROWS_FETCH = 1000
+
+# одна единица за раз: SKIP LOCKED — воркеры не ждут друг друга на одной строке.
+# Единицы running с протухшим heartbeat (воркер умер) забираются повторно — пока
+# попытки не исчерпаны: единица, роняющая воркер (OOM, segfault), до fail_unit не доходит.
+_CLAIM_SQL = text(
+    """
+    UPDATE work_units AS u
+       SET status = 'running',
+           worker_id = :worker_id,
+           claimed_at = now(),
+           heartbeat_at = now(),
+           attempts = u.attempts + 1
+     WHERE u.id = (
+           SELECT w.id
+             FROM work_units AS w
+            WHERE (w.status = 'queued' AND w.available_at <= now())
+               OR (w.status = 'running' AND w.heartbeat_at < now() - make_interval(secs => :stale_after)
+                   AND w.attempts < :max_attempts)
+            ORDER BY w.available_at, w.id
+            FOR UPDATE SKIP LOCKED
+            LIMIT 1
+     )
+    RETURNING u.id
+    """
+)
+
+# протухшие единицы без оставшихся попыток — в failed, а не в вечное running
+_REAP_SQL = text(
+    """
+    UPDATE work_units AS u
+       SET status = 'failed',
+           finished_at = now(),
+           error = 'воркер пропал на единице ' || u.attempts || ' раз подряд (heartbeat протух)'
+     WHERE u.id IN (
+           SELECT w.id
+             FROM work_units AS w
+            WHERE w.status = 'running'
+              AND w.heartbeat_at < now() - make_interval(secs => :stale_after)
+              AND w.attempts >= :max_attempts
+            FOR UPDATE SKIP LOCKED
+     )
+    """
+)
+
+
+@db_timed
+async def enqueue_job(
+    session: AsyncSession,
+    action: str,
+    company_ids: list[int],
+    *,
+    weekend: bool | None = None,
+    requested_by: int | None = None,
+    deadline_seconds: float | None = None,
+    company_roots: dict[int, set[int]] | None = None,
+) -> RunJob:
+    """
+    Задание и по единице PHASE_APPLY на компанию — одной транзакцией.
+    Выборочный запуск: company_ids — только отобранные компании, company_roots —
+    их root (в run_jobs.root_ids объектом {"company_id": [root, ...]}).
+    """
+    deadline_at = datetime.now(timezone.utc) + timedelta(seconds=deadline_seconds) if deadline_seconds else None
+    job = RunJob(
+        action=action, weekend=weekend, status=RUNNING, requested_by=requested_by, deadline_at=deadline_at,
+        root_ids=(
+            {str(company_id): sorted(roots) for company_id, roots in company_roots.items()}
+            if company_roots is not None else None
+        ),
+    )
+    session.add(job)
+    await session.flush()
+    session.add_all(WorkUnit(job_id=job.id, company_id=company_id, phase=PHASE_APPLY) for company_id in company_ids)
+    await session.commit()
+    return job
+
+
+@db_timed
+async def claim_unit(session: AsyncSession, worker_id: str, stale_after: float) -> tuple[WorkUnit, RunJob] | None:
+    """
+    Следующая готовая единица или None. Заодно закрывает протухшие единицы,
+    исчерпавшие MAX_UNIT_ATTEMPTS, — той же транзакцией, до выборки.
+    """
+    params = {"stale_after": stale_after, "max_attempts": MAX_UNIT_ATTEMPTS}
+    await session.execute(_REAP_SQL, params)
+    result = await session.execute(_CLAIM_SQL, {**params, "worker_id": worker_id})
+    unit_id = result.scalar_one_or_none()
+    await session.commit()
+    if unit_id is None:
+        return None
+
+    unit = await session.get(WorkUnit, unit_id)
+    job = await session.get(RunJob, unit.job_id)
+    return unit, job
+
+
+@db_timed
+async def heartbeat_unit(session: AsyncSession, unit_id: int, worker_id: str) -> bool:
+    """False — единицу уже забрал другой воркер (наш heartbeat протух)."""
+    result = await session.execute(
+        update(WorkUnit)
+        .where(WorkUnit.id == unit_id, WorkUnit.worker_id == worker_id, WorkUnit.status == RUNNING)
+        .values(heartbeat_at=func.now())
+    )
+    await session.commit()
+    return result.rowcount > 0
+
+
+@db_timed
+async def complete_unit(
+    session: AsyncSession,
+    unit: WorkUnit,
+    worker_id: str,
+    result: dict,
+    *,
+    rows: Iterable[list] | None = None,
+    follow_up_phase: str | None = None,
+    follow_up_delay: float = 0.0,
+) -> bool:
+    """
+    Закрывает единицу и (опционально) ставит следующую фазу той же компании —
+    одной транзакцией, чтобы проверка не потерялась при падении воркера.
+    rows — строки отчёта: идут COPY в run_export_rows в той же транзакции, по мере
+    чтения итератора, так что перехваченная единица не оставляет строк.
+    """
+    updated = await session.execute(
+        update(WorkUnit)
+        .where(WorkUnit.id == unit.id, WorkUnit.worker_id == worker_id, WorkUnit.status == RUNNING)
+        .values(status=DONE, result=result, finished_at=func.now())
+    )
+    if updated.rowcount == 0:
+        await session.rollback()
+        return False
+
+    if rows is not None:
+        conn = await session.connection()
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            EXPORT_ROWS_TABLE,
+            records=((unit.job_id, unit.id, json.dumps(row, ensure_ascii=False, default=str)) for row in rows),
+            columns=EXPORT_ROWS_COLUMNS,
+        )
+
+    if follow_up_phase is not None:
+        session.add(WorkUnit(
+            job_id=unit.job_id,
+            company_id=unit.company_id,
+            phase=follow_up_phase,
+            available_at=datetime.now(timezone.utc) + timedelta(seconds=follow_up_delay),
+        ))
+    await session.commit()
+    return True
+
+
+@db_timed
+async def fail_unit(session: AsyncSession, unit: WorkUnit, worker_id: str, error: str, *, retry: bool = True) -> None:
+    """Ошибка единицы: вернуть в очередь (если попытки остались) или пометить failed."""
+    final = not retry or unit.attempts >= MAX_UNIT_ATTEMPTS
+    await session.execute(
+        update(WorkUnit)
+        .where(WorkUnit.id == unit.id, WorkUnit.worker_id == worker_id)
+        .values(
+            status=FAILED if final else QUEUED,
+            error=error[:1000],
+            worker_id=None if not final else worker_id,
+            finished_at=func.now() if final else None,
+            available_at=func.now() + timedelta(seconds=30 * unit.attempts),
+        )
+    )
+    await session.commit()
+
+
+@db_timed
+async def get_job_progress(session: AsyncSession, job_id: int) -> dict[str, int]:
+    """{status: count} по единицам задания."""
+    result = await session.execute(
+        select(WorkUnit.status, func.count()).where(WorkUnit.job_id == job_id).group_by(WorkUnit.status)
+    )
+    return {status: count for status, count in result.all()}
+
+
+@db_timed
+async def get_job_units(session: AsyncSession, job_id: int) -> list[WorkUnit]:
+    result = await session.execute(select(WorkUnit).where(WorkUnit.job_id == job_id).order_by(WorkUnit.id))
+    return list(result.scalars().all())
+
+
+@db_timed
+async def job_picked_up(session: AsyncSession, job_id: int) -> bool:
+    """Брал ли хоть один воркер хоть одну единицу задания."""
+    result = await session.execute(
+        select(func.count()).select_from(WorkUnit).where(WorkUnit.job_id == job_id, WorkUnit.attempts > 0)
+    )
+    return result.scalar_one() > 0
+
+
+@db_timed
+async def cancel_job_units(session: AsyncSession, job_id: int, error: str) -> int:
+    """
+    Незакрытые единицы задания — в failed. Воркер, ещё выполняющий такую единицу,
+    получит от complete_unit False и отбросит результат.
+    """
+    result = await session.execute(
+        update(WorkUnit)
+        .where(WorkUnit.job_id == job_id, WorkUnit.status.in_((QUEUED, RUNNING)))
+        .values(status=FAILED, error=error[:1000], finished_at=func.now())
+    )
+    await session.commit()
+    return result.rowcount or 0
+
+
+async def iter_job_rows(session: AsyncSession, job_id: int) -> AsyncIterator[list]:
+    """
+    Строки отчёта задания по порядку записи — серверным курсором, по
+    EXPORT_ROWS_FETCH за раз. Генератор, поэтому без db_timed.
+    """
+    result = await session.stream_scalars(
+        select(RunExportRow.row)
+        .where(RunExportRow.job_id == job_id)
+        .order_by(RunExportRow.id)
+        .execution_options(yield_per=EXPORT_ROWS_FETCH)
+    )
+    async for row in result:
+        yield row
+
+
+@db_timed
+async def finish_job(session: AsyncSession, job_id: int, status: str) -> None:
+    """Закрывает задание; строки отчёта к этому моменту уже прочитаны — удаляем."""
+    await session.execute(
+        update(RunJob).where(RunJob.id == job_id).values(status=status, finished_at=func.now())
+    )
+    await session.execute(delete(RunExportRow).where(RunExportRow.job_id == job_id))
+    await session.commit()
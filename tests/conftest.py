@@ -0,0 +1,7 @@
+import os
+import sys
+from pathlib import Path
+
+# config.py требует BOT_TOKEN при импорте; тестам сам бот не нужен
+os.environ.setdefault("BOT_TOKEN", "test-token")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,41 @@
+from utils.batch_sizer import BatchSizer, MAX_BATCH, MIN_BATCH, FAST_SECONDS
+
+
+def test_starts_at_max_and_clamps_start():
+    assert BatchSizer("key").size == MAX_BATCH == 3000
+    assert BatchSizer("key", start=10_000).size == MAX_BATCH
+    assert BatchSizer("key", start=1).size == MIN_BATCH == 100
+
+
+def test_failure_halves_down_to_min():
+    sizer = BatchSizer("key")
+    sizes = []
+    for _ in range(8):
+        sizer.failure("timeout")
+        sizes.append(sizer.size)
+    assert sizes[:5] == [1500, 750, 375, 187, 100]
+    assert sizes[-1] == MIN_BATCH
+
+
+def test_partial_shrinks_softer_than_failure():
+    sizer = BatchSizer("key")
+    sizer.partial()
+    assert sizer.size == 2250
+    for _ in range(20):
+        sizer.partial()
+    assert sizer.size == MIN_BATCH
+
+
+def test_fast_success_grows_up_to_max():
+    sizer = BatchSizer("key", start=MIN_BATCH)
+    sizer.success(FAST_SECONDS)
+    assert sizer.size == 125
+    for _ in range(30):
+        sizer.success(0.5)
+    assert sizer.size == MAX_BATCH
+
+
+def test_slow_success_keeps_size():
+    sizer = BatchSizer("key", start=1000)
+    sizer.success(FAST_SECONDS + 0.1)
+    assert sizer.size == 1000
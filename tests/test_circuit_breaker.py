@@ -0,0 +1,102 @@
+import asyncio
+
+from utils.circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+
+
+def test_opens_after_threshold_and_rejects():
+    async def scenario():
+        breaker = CircuitBreaker("host", "catalog", failure_threshold=3, open_seconds=60)
+        assert not breaker.record_antibot()
+        assert not breaker.record_antibot()
+        assert breaker.allow()
+
+        assert breaker.record_antibot()
+        assert breaker.state == OPEN
+        assert not breaker.allow()
+        assert 0 < breaker.retry_in() <= 60
+        breaker._probe_task.cancel()
+
+    asyncio.run(scenario())
+
+
+def test_success_resets_failure_streak():
+    async def scenario():
+        breaker = CircuitBreaker("host", "catalog", failure_threshold=2)
+        breaker.record_antibot()
+        breaker.record_success()
+        assert not breaker.record_antibot()
+        assert breaker.state == CLOSED
+
+    asyncio.run(scenario())
+
+
+def test_half_open_probe_success_closes():
+    async def scenario():
+        breaker = CircuitBreaker("host", "catalog", failure_threshold=1, open_seconds=0.01)
+        states = []
+
+        async def probe():
+            states.append(breaker.state)
+            return True
+
+        assert breaker.record_antibot(probe)
+        await asyncio.wait_for(breaker._probe_task, timeout=1)
+
+        assert states == [HALF_OPEN]
+        assert breaker.state == CLOSED
+        assert breaker.allow()
+        assert breaker.open_seconds == 0.01
+
+    asyncio.run(scenario())
+
+
+def test_half_open_probe_failure_reopens_with_doubled_pause():
+    async def scenario():
+        breaker = CircuitBreaker("host", "catalog", failure_threshold=1, open_seconds=0.01, max_open_seconds=0.03)
+        outcomes = iter([False, False, False, True])
+        pauses = []
+
+        async def probe():
+            pauses.append(breaker.open_seconds)
+            return next(outcomes)
+
+        breaker.record_antibot(probe)
+        await asyncio.wait_for(breaker._probe_task, timeout=2)
+
+        # 0.01 → 0.02 → 0.03 (потолок) → 0.03, четвёртая проба закрывает
+        assert pauses == [0.01, 0.02, 0.03, 0.03]
+        assert breaker.state == CLOSED
+        assert breaker.open_seconds == 0.01  # после закрытия пауза снова базовая
+
+    asyncio.run(scenario())
+
+
+def test_probe_exception_counts_as_failure():
+    async def scenario():
+        breaker = CircuitBreaker("host", "catalog", failure_threshold=1, open_seconds=0.01)
+        calls = 0
+
+        async def probe():
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                raise ConnectionError("boom")
+            return True
+
+        breaker.record_antibot(probe)
+        await asyncio.wait_for(breaker._probe_task, timeout=1)
+        assert calls == 2
+        assert breaker.state == CLOSED
+
+    asyncio.run(scenario())
+
+
+def test_without_probe_closes_after_pause():
+    async def scenario():
+        breaker = CircuitBreaker("host", "catalog", failure_threshold=1, open_seconds=0.01)
+        breaker.record_antibot()
+        assert breaker.is_open
+        await asyncio.wait_for(breaker._probe_task, timeout=1)
+        assert breaker.state == CLOSED
+
+    asyncio.run(scenario())
@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+
+from config import Config
+from utils.fair_scheduler import FairScheduler, lane_of, lane_weight
+
+
+@pytest.fixture(autouse=True)
+def lanes(monkeypatch):
+    monkeypatch.setattr(Config, "PRIORITY_LANES", [5, 20])
+
+
+def _jobs(name: str, count: int, order: list[str], pause: float = 0.0):
+    for _ in range(count):
+        async def job():
+            order.append(name)
+            await asyncio.sleep(pause)
+        yield job
+
+
+def test_lane_of_and_weights():
+    assert lane_of(0) == 0
+    assert lane_of(4) == 0
+    assert lane_of(5) == 1
+    assert lane_of(19) == 1
+    assert lane_of(20) == 2
+    assert lane_of(None) == 2
+    assert [lane_weight(lane) for lane in range(3)] == [4, 2, 1]
+
+
+def test_same_lane_companies_take_turns():
+    async def scenario():
+        order: list[str] = []
+        finished: list[str] = []
+        scheduler = FairScheduler(slots=1, on_done=finished.append)
+        scheduler.add("big", _jobs("big", 6, order))
+        scheduler.add("small", _jobs("small", 2, order))
+        await scheduler.run()
+        return order, finished
+
+    order, finished = asyncio.run(scenario())
+    # крупный кабинет не держит мелкий до своего конца
+    assert order == ["big", "small", "big", "small", "big", "big", "big", "big"]
+    assert finished == ["small", "big"]
+
+
+def test_priority_lane_gets_more_slots():
+    async def scenario():
+        order: list[str] = []
+        scheduler = FairScheduler(slots=1)
+        scheduler.add("tail", _jobs("tail", 20, order), lane=2)
+        scheduler.add("top", _jobs("top", 20, order), lane=0)
+        await scheduler.run()
+        return order
+
+    order = asyncio.run(scenario())
+    head = order[:10]
+    assert head.count("top") == 8 and head.count("tail") == 2
+    assert sorted(order) == ["tail"] * 20 + ["top"] * 20  # низкая полоса не голодает — доходит до конца
+
+
+def test_one_job_in_flight_per_company():
+    async def scenario():
+        running = peak = 0
+
+        def jobs(count):
+            for _ in range(count):
+                async def job():
+                    nonlocal running, peak
+                    running += 1
+                    peak = max(peak, running)
+                    await asyncio.sleep(0.01)
+                    running -= 1
+                yield job
+
+        scheduler = FairScheduler(slots=4)
+        scheduler.add("only", jobs(5))
+        await scheduler.run()
+        return peak
+
+    assert asyncio.run(scenario()) == 1
+
+
+def test_slots_run_companies_in_parallel():
+    async def scenario():
+        order: list[str] = []
+        scheduler = FairScheduler(slots=3)
+        for name in ("a", "b", "c"):
+            scheduler.add(name, _jobs(name, 2, order, pause=0.05))
+        started = asyncio.get_running_loop().time()
+        await scheduler.run()
+        return asyncio.get_running_loop().time() - started
+
+    # 3 компании по 2 работы в 3 слота — два «такта», а не шесть
+    assert asyncio.run(scenario()) < 0.25
+
+
+def test_failed_job_stops_the_run():
+    async def scenario():
+        async def boom():
+            raise RuntimeError("boom")
+
+        scheduler = FairScheduler(slots=2)
+        scheduler.add("bad", [boom])
+        scheduler.add("slow", _jobs("slow", 100, [], pause=0.01))
+        await scheduler.run()
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(scenario())
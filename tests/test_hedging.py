@@ -0,0 +1,162 @@
+import asyncio
+
+import pytest
+
+from utils.hedging import HedgeBudget, hedged
+from utils.helpers_rate import HostRateLimiter
+
+
+def test_budget_allows_burst_then_ratio():
+    budget = HedgeBudget(ratio=0.5, burst=2.0)
+    assert budget.try_spend()
+    assert budget.try_spend()
+    assert not budget.try_spend()
+
+    budget.on_request()
+    assert not budget.try_spend()  # полжетона — дубль ещё нельзя
+    budget.on_request()
+    assert budget.try_spend()
+
+
+def test_fast_primary_does_not_spend_budget():
+    async def scenario():
+        budget = HedgeBudget(ratio=0.1, burst=1.0)
+
+        async def primary():
+            return "primary"
+
+        async def fallback():
+            raise AssertionError("фолбэк не нужен")
+
+        result = await hedged(primary, fallback, delay=0.5, budget=budget, endpoint="test")
+        assert result == "primary"
+        assert budget.try_spend()  # жетон не тронут
+
+    asyncio.run(scenario())
+
+
+def test_slow_primary_is_hedged_and_cancelled():
+    async def scenario():
+        cancelled = asyncio.Event()
+
+        async def primary():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+            return "primary"
+
+        async def fallback():
+            return "fallback"
+
+        result = await hedged(primary, fallback, delay=0.01, budget=HedgeBudget(burst=1.0), endpoint="test")
+        assert result == "fallback"
+        # проигравший снят до возврата из hedged, а не когда-нибудь потом
+        assert cancelled.is_set()
+
+    asyncio.run(scenario())
+
+
+def test_losing_primary_in_limiter_returns_permit():
+    async def scenario():
+        limiter = HostRateLimiter(max_concurrent=2, base_min_interval=10.0, max_min_interval=10.0)
+        async with limiter:
+            pass  # следующий вход уснёт в __aenter__
+
+        async def primary():
+            async with limiter.limit():
+                return "primary"
+
+        async def fallback():
+            return "fallback"
+
+        for _ in range(3):
+            result = await hedged(primary, fallback, delay=0.01, budget=HedgeBudget(burst=10.0), endpoint="test")
+            assert result == "fallback"
+        assert limiter.sem._value == 2
+
+    asyncio.run(scenario())
+
+
+def test_exhausted_budget_waits_for_primary():
+    async def scenario():
+        async def primary():
+            await asyncio.sleep(0.05)
+            return "primary"
+
+        async def fallback():
+            raise AssertionError("без бюджета дубль не отправляется")
+
+        result = await hedged(primary, fallback, delay=0.01, budget=HedgeBudget(burst=0.0), endpoint="test")
+        assert result == "primary"
+
+    asyncio.run(scenario())
+
+
+def test_exhausted_budget_is_bounded_by_timeout():
+    async def scenario():
+        async def primary():
+            await asyncio.sleep(10)  # основной хост завис
+
+        async def fallback():
+            return "fallback"
+
+        result = await asyncio.wait_for(
+            hedged(primary, fallback, delay=0.01, budget=HedgeBudget(burst=0.0), endpoint="test", timeout=0.1),
+            timeout=2,
+        )
+        assert result == "fallback"
+
+    asyncio.run(scenario())
+
+
+def test_failed_primary_goes_to_fallback():
+    async def scenario():
+        async def primary():
+            raise ConnectionError("boom")
+
+        async def fallback():
+            return "fallback"
+
+        assert await hedged(primary, fallback, delay=1.0, budget=HedgeBudget(), endpoint="test") == "fallback"
+
+    asyncio.run(scenario())
+
+
+def test_both_failing_raises():
+    async def scenario():
+        async def primary():
+            await asyncio.sleep(0.05)
+            raise ConnectionError("primary")
+
+        async def fallback():
+            raise ConnectionError("fallback")
+
+        await hedged(primary, fallback, delay=0.01, budget=HedgeBudget(burst=1.0), endpoint="test")
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(scenario())
+
+
+def test_cancelling_hedged_cancels_both_requests():
+    async def scenario():
+        started = []
+
+        async def slow(name):
+            started.append(name)
+            await asyncio.sleep(10)
+
+        task = asyncio.create_task(hedged(
+            lambda: slow("primary"), lambda: slow("fallback"),
+            delay=0.01, budget=HedgeBudget(burst=1.0), endpoint="test",
+        ))
+        await asyncio.sleep(0.05)
+        assert started == ["primary", "fallback"]
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        # после отмены в цикле не осталось висящих запросов
+        others = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        assert not others
+
+    asyncio.run(scenario())
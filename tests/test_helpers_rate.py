@@ -0,0 +1,59 @@
+import asyncio
+
+from utils.helpers_rate import HostRateLimiter
+
+
+def _permits(limiter: HostRateLimiter) -> int:
+    return limiter.sem._value
+
+
+def test_cancel_while_pacing_returns_permit():
+    async def scenario():
+        limiter = HostRateLimiter(max_concurrent=2, base_min_interval=10.0, max_min_interval=10.0)
+        async with limiter:
+            pass  # _last_ts = сейчас: следующий вход уснёт на ~10s внутри __aenter__
+
+        entered = asyncio.Event()
+
+        async def request():
+            entered.set()
+            async with limiter.limit():
+                raise AssertionError("лимитер не должен был пустить раньше интервала")
+
+        task = asyncio.create_task(request())
+        await entered.wait()
+        await asyncio.sleep(0.05)
+        assert _permits(limiter) == 1  # слот занят спящим в __aenter__
+
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        assert task.cancelled()
+        assert _permits(limiter) == 2
+
+    asyncio.run(scenario())
+
+
+def test_repeated_cancellations_do_not_drain_limiter():
+    async def scenario():
+        limiter = HostRateLimiter(max_concurrent=2, base_min_interval=10.0, max_min_interval=10.0)
+        async with limiter:
+            pass
+
+        for _ in range(5):
+            task = asyncio.create_task(limiter.__aenter__())
+            await asyncio.sleep(0.01)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        assert _permits(limiter) == 2
+
+    asyncio.run(scenario())
+
+
+def test_exit_releases_permit():
+    async def scenario():
+        limiter = HostRateLimiter(max_concurrent=1, base_min_interval=0.0)
+        async with limiter:
+            assert _permits(limiter) == 0
+        assert _permits(limiter) == 1
+
+    asyncio.run(scenario())
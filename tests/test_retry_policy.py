@@ -0,0 +1,101 @@
+import asyncio
+import time
+
+import pytest
+
+from errors import DeadlineExceeded
+from utils.retry_policy import (
+    Backoff, RetryPolicy, Retrier, current_deadline, deadline_scope, parse_retry_after, RATE_LIMITED, ANTIBOT,
+)
+
+FAST_POLICY = RetryPolicy(max_attempts=3, rules={RATE_LIMITED: Backoff(base=0.01, cap=0.02)}, request_timeout=40.0)
+
+
+def test_no_deadline_by_default():
+    assert current_deadline() is None
+    with deadline_scope(None) as deadline:
+        assert deadline is None
+    with deadline_scope(0) as deadline:
+        assert deadline is None
+
+
+def test_nested_scope_cannot_extend_outer():
+    with deadline_scope(10) as outer:
+        with deadline_scope(3600) as inner:
+            assert inner is outer
+        with deadline_scope(1) as tighter:
+            assert tighter is not outer
+            assert current_deadline() is tighter
+        assert current_deadline() is outer
+    assert current_deadline() is None
+
+
+def test_deadline_is_inherited_by_tasks():
+    async def scenario():
+        async def child():
+            return current_deadline()
+
+        with deadline_scope(5) as deadline:
+            assert await asyncio.create_task(child()) is deadline
+        assert await asyncio.create_task(child()) is None
+
+    asyncio.run(scenario())
+
+
+def test_expired_deadline_raises():
+    with deadline_scope(0.01):
+        retry = Retrier(FAST_POLICY, "cards_list")
+        retry.check_deadline()
+        time.sleep(0.02)
+        with pytest.raises(DeadlineExceeded):
+            retry.check_deadline()
+
+
+def test_request_timeout_shrinks_to_remaining_deadline():
+    retry = Retrier(FAST_POLICY, "cards_list")
+    assert retry.timeout().total == 40.0
+    with deadline_scope(2):
+        assert retry.deadline is None  # срок берётся при создании Retrier
+        assert Retrier(FAST_POLICY, "cards_list").timeout().total <= 2
+
+
+def test_backoff_refuses_pause_past_deadline():
+    async def scenario():
+        policy = RetryPolicy(max_attempts=5, rules={RATE_LIMITED: Backoff(base=10.0, cap=10.0)})
+        with deadline_scope(1):
+            retry = Retrier(policy, "cards_list")
+            started = time.monotonic()
+            assert not await retry.backoff(RATE_LIMITED)
+            assert time.monotonic() - started < 0.5  # не спим, если пауза не влезает в срок
+            assert retry.attempt == 1
+
+    asyncio.run(scenario())
+
+
+def test_backoff_stops_after_max_attempts_and_unknown_reason():
+    async def scenario():
+        retry = Retrier(FAST_POLICY, "cards_list")
+        assert await retry.backoff(RATE_LIMITED)
+        assert await retry.backoff(RATE_LIMITED)
+        assert not await retry.backoff(RATE_LIMITED)
+        assert retry.exhausted
+        assert not await Retrier(FAST_POLICY, "cards_list").backoff(ANTIBOT)
+
+    asyncio.run(scenario())
+
+
+def test_delay_respects_cap_and_retry_after():
+    policy = RetryPolicy(max_attempts=8, rules={RATE_LIMITED: Backoff(base=2.0, cap=30.0)})
+    for attempt in range(1, 10):
+        delay = policy.delay(RATE_LIMITED, attempt)
+        exp = min(30.0, 2.0 * 2 ** (attempt - 1))
+        assert exp / 2 <= delay <= exp
+    assert 5.0 <= policy.delay(RATE_LIMITED, 1, retry_after=5.0) <= 5.5
+    assert policy.delay(RATE_LIMITED, 1, retry_after=999) <= 30.5
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("garbage") is None
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0  # дата в прошлом
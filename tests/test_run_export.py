@@ -0,0 +1,36 @@
+import os
+
+from utils.run_export import RunExport, STATUS_FLIPPED, STATUS_SKIPPED
+
+
+def test_spooled_rows_round_trip_in_record_order():
+    export = RunExport("all_to", spool_rows=True)
+    export.record(STATUS_FLIPPED, company="Ромашка", root=101, nm_id=1, brand_before="A", brand_after="B")
+    export.record(STATUS_SKIPPED, company="Ромашка", root=102, nm_id=2, reason="уже стоит")
+
+    rows = list(export.spooled_rows())
+    assert rows == [
+        ["Ромашка", 101, 1, "", "A", "B", STATUS_FLIPPED, ""],
+        ["Ромашка", 102, 2, "", "", "", STATUS_SKIPPED, "уже стоит"],
+    ]
+    # повторное чтение — снова с начала спула
+    assert list(export.spooled_rows()) == rows
+    export.close_spool()
+    assert list(export.spooled_rows()) == []
+
+
+def test_without_spool_nothing_is_kept():
+    export = RunExport("all_to")
+    export.record(STATUS_FLIPPED, nm_id=1)
+    assert list(export.spooled_rows()) == []
+    os.remove(export.save())
+
+
+def test_append_row_counts_statuses():
+    export = RunExport("all_from")
+    export.append_row(["Ромашка", 101, 1, "", "A", "B", STATUS_FLIPPED, ""])
+    export.append_row(["Ромашка", 101, 2, "", "A", "A", STATUS_SKIPPED, ""])
+    export.append_row(["Ромашка", 102, 3, "", "A", "B", STATUS_FLIPPED, ""])
+    assert export.counters == {STATUS_FLIPPED: 2, STATUS_SKIPPED: 1}
+    assert export.rows == 3
+    os.remove(export.save())
@@ -0,0 +1,29 @@
+from types import SimpleNamespace
+
+from core import _root_selected
+from utils.run_scope import RunScope
+
+
+def test_company_roots_define_companies():
+    scope = RunScope(company_roots={1: {10, 11}, 2: {20}}, label="список root")
+    assert scope.company_ids == {1, 2}
+    assert scope.roots_count == 3
+    assert not scope.is_full
+    assert scope.describe() == "список root, компаний 2, root 3"
+
+
+def test_full_scope():
+    scope = RunScope()
+    assert scope.is_full
+    assert scope.describe() == "весь флот"
+
+
+def test_root_selected_only_for_its_company():
+    company_a, company_b = SimpleNamespace(id=1), SimpleNamespace(id=2)
+    company_roots = {1: {10}, 2: {20}}
+    assert _root_selected(company_roots, company_a, 10)
+    # root 20 отобран у компании 2 — у компании 1 его не читаем
+    assert not _root_selected(company_roots, company_a, 20)
+    assert _root_selected(company_roots, company_b, 20)
+    assert not _root_selected(company_roots, SimpleNamespace(id=3), 10)
+    assert _root_selected(None, company_a, 99)
@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+import core
+
+
+class _FakeAPI:
+    """WBClientAPI с заранее заданными ответами get_update_errors по опросам."""
+
+    answers: list[list[dict]] = []
+    calls = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def get_update_errors(self, api_key):
+        answer = _FakeAPI.answers[min(_FakeAPI.calls, len(_FakeAPI.answers) - 1)]
+        _FakeAPI.calls += 1
+        return answer
+
+
+@pytest.fixture(autouse=True)
+def fake_api(monkeypatch):
+    monkeypatch.setattr(core, "WBClientAPI", _FakeAPI)
+    monkeypatch.setattr(core.config, "VERIFY_POLLS", 4, raising=False)
+    monkeypatch.setattr(core.config, "VERIFY_POLL_DELAY", 0.001, raising=False)
+    _FakeAPI.calls = 0
+
+
+def _error(code: str) -> dict:
+    return {"vendorCode": code, "errors": ["бренд не найден"], "updateAt": "2030-01-01T00:00:00Z"}
+
+
+def test_empty_answers_do_not_stop_polling_early():
+    # WB ещё не обработал батч: два пустых ответа, ошибка приходит на третьем опросе
+    _FakeAPI.answers = [[], [], [_error("A-1")], [_error("A-1")]]
+    failed = asyncio.run(core._poll_update_errors({"key": {"A-1", "A-2"}}, None))
+    assert failed == {"key": {"A-1": ["бренд не найден"]}}
+    assert _FakeAPI.calls == 4
+
+
+def test_unchanged_non_empty_answer_settles():
+    _FakeAPI.answers = [[_error("A-1")], [_error("A-1")], [_error("A-2")]]
+    failed = asyncio.run(core._poll_update_errors({"key": {"A-1", "A-2"}}, None))
+    assert set(failed["key"]) == {"A-1"}
+    assert _FakeAPI.calls == 2
+
+
+def test_all_sent_rejected_stops_at_once():
+    _FakeAPI.answers = [[_error("A-1")]]
+    failed = asyncio.run(core._poll_update_errors({"key": {"A-1"}}, None))
+    assert set(failed["key"]) == {"A-1"}
+    assert _FakeAPI.calls == 1
+
+
+def test_no_errors_polls_whole_window():
+    _FakeAPI.answers = [[]]
+    assert asyncio.run(core._poll_update_errors({"key": {"A-1"}}, None)) == {}
+    assert _FakeAPI.calls == 4
@@ -0,0 +1,99 @@
+import asyncio
+import os
+import uuid
+
+import pytest
+
+from services import work_queue_service
+from services.work_queue_service import claim_unit, MAX_UNIT_ATTEMPTS
+
+
+class _Result:
+    def scalar_one_or_none(self):
+        return None
+
+
+class _FakeSession:
+    """Пишет выполненные statement'ы и параметры; выборка ничего не находит."""
+
+    def __init__(self):
+        self.executed: list[tuple[str, dict]] = []
+
+    async def execute(self, statement, params=None):
+        self.executed.append((str(statement), params or {}))
+        return _Result()
+
+    async def commit(self):
+        pass
+
+
+def test_claim_reaps_exhausted_and_caps_stale_reclaim():
+    session = _FakeSession()
+    assert asyncio.run(claim_unit(session, "w-1", 120)) is None
+
+    (reap_sql, reap_params), (claim_sql, claim_params) = session.executed
+    # сначала протухшие единицы без попыток — в failed, потом выборка
+    assert reap_sql == str(work_queue_service._REAP_SQL)
+    assert "w.attempts >= :max_attempts" in reap_sql
+    assert "w.attempts < :max_attempts" in claim_sql
+    assert reap_params["max_attempts"] == claim_params["max_attempts"] == MAX_UNIT_ATTEMPTS
+    assert claim_params["worker_id"] == "w-1"
+
+
+# ---------- на настоящем Postgres: TEST_DATABASE_URL=postgresql+asyncpg://... ----------
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL не задан")
+def test_stale_unit_at_cap_is_failed_not_reclaimed():
+    from sqlalchemy import text
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    from migrations.versions import v0003_work_queue
+
+    schema = f"test_wq_{uuid.uuid4().hex[:8]}"
+
+    async def scenario():
+        admin = create_async_engine(TEST_DATABASE_URL)
+        async with admin.begin() as conn:
+            await conn.exec_driver_sql(f"CREATE SCHEMA {schema}")
+        engine = create_async_engine(TEST_DATABASE_URL, connect_args={"server_settings": {"search_path": schema}})
+        try:
+            async with engine.begin() as conn:
+                await conn.exec_driver_sql("CREATE TABLE companies (id SERIAL PRIMARY KEY)")
+                for statement in v0003_work_queue.UPGRADE:
+                    await conn.exec_driver_sql(statement)
+                await conn.exec_driver_sql("INSERT INTO companies DEFAULT VALUES")
+                await conn.exec_driver_sql("INSERT INTO companies DEFAULT VALUES")
+                await conn.exec_driver_sql("INSERT INTO run_jobs (action, status) VALUES ('all_to', 'running')")
+                # воркер пропадал на обеих: у первой попытки кончились, у второй — осталась одна
+                await conn.execute(
+                    text(
+                        "INSERT INTO work_units (job_id, company_id, phase, status, attempts, worker_id, heartbeat_at) "
+                        "VALUES (1, 1, 'apply', 'running', :cap, 'dead', now() - interval '1 hour'), "
+                        "       (1, 2, 'apply', 'running', :cap - 1, 'dead', now() - interval '1 hour')"
+                    ),
+                    {"cap": MAX_UNIT_ATTEMPTS},
+                )
+
+            sessions = async_sessionmaker(engine, expire_on_commit=False)
+            async with sessions() as session:
+                unit, _ = await claim_unit(session, "w-1", 120)
+                assert unit.company_id == 2 and unit.attempts == MAX_UNIT_ATTEMPTS
+            async with sessions() as session:
+                assert await claim_unit(session, "w-2", 120) is None
+
+            async with engine.connect() as conn:
+                status, error = (await conn.exec_driver_sql(
+                    "SELECT status, error FROM work_units WHERE company_id = 1"
+                )).one()
+            assert status == "failed"
+            assert "heartbeat" in error
+        finally:
+            await engine.dispose()
+            async with admin.begin() as conn:
+                await conn.exec_driver_sql(f"DROP SCHEMA {schema} CASCADE")
+            await admin.dispose()
+
+    asyncio.run(scenario())
@@ -0,0 +1,57 @@
+import logging
+
+from utils.metrics import WB_BATCH_SIZE, key_label
+
+logger = logging.getLogger(__name__)
+
+# лимиты WB на cards/update: до 3000 карточек за запрос
+MAX_BATCH = 3000
+MIN_BATCH = 100
+FAST_SECONDS = 5.0      # ответ быстрее — API здоров, батч можно растить
+GROW_FACTOR = 1.25
+SHRINK_FACTOR = 0.5     # таймаут / 5xx
+PARTIAL_FACTOR = 0.75   # WB принял батч, но часть карточек отклонил
+
+
+class BatchSizer:
+    """
+    Размер батча update_cards для одного токена (AIMD, как лимитеры темпа).
+
+    Таймаут и 5xx режут батч вдвое: меньший батч быстрее проходит через
+    деградировавший API, а повтор при сбое теряет меньше карточек. Частичный
+    отказ WB (error / additionalErrors в ответе) режет мягче. Быстрый успех
+    возвращает размер к MAX_BATCH.
+    """
+
+    def __init__(self, api_key: str, start: int = MAX_BATCH):
+        self.label = key_label(api_key)
+        self.size = max(MIN_BATCH, min(MAX_BATCH, start))
+        WB_BATCH_SIZE.labels(self.label).set(self.size)
+
+    def _set(self, size: float, reason: str) -> None:
+        size = max(MIN_BATCH, min(MAX_BATCH, int(size)))
+        if size != self.size:
+            logger.info("📦 Батч токена %s: %s → %s (%s)", self.label, self.size, size, reason)
+            self.size = size
+            WB_BATCH_SIZE.labels(self.label).set(size)
+
+    def success(self, seconds: float) -> None:
+        if seconds <= FAST_SECONDS:
+            self._set(self.size * GROW_FACTOR, f"ответ за {seconds:.1f}s")
+
+    def partial(self) -> None:
+        self._set(self.size * PARTIAL_FACTOR, "частичный отказ WB")
+
+    def failure(self, reason: str) -> None:
+        self._set(self.size * SHRINK_FACTOR, reason)
+
+
+# общие на процесс, как лимитеры: размер переживает клиентов и запуски
+_sizers: dict[str, BatchSizer] = {}
+
+
+def get_batch_sizer(api_key: str) -> BatchSizer:
+    sizer = _sizers.get(api_key)
+    if sizer is None:
+        sizer = _sizers[api_key] = BatchSizer(api_key)
+    return sizer
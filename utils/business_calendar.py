@@ -0,0 +1,120 @@
+import asyncio
+import datetime
+import logging
+
+import pytz
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from services.holiday_service import get_holiday_dates, get_holidays_fingerprint
+
+logger = logging.getLogger(__name__)
+
+MSK = pytz.timezone("Europe/Moscow")
+
+REFRESH_INTERVAL_SECONDS = 600  # раз в 10 минут сверяем отпечаток таблицы holidays
+
+
+class BusinessCalendar:
+    """
+    Производственный календарь в памяти.
+
+    Праздники грузятся из таблицы holidays один раз в set, дальше is_day_off()
+    отвечает без похода в БД. Обновление — явным refresh() и фоновой сверкой
+    отпечатка таблицы (её правят руками), в боте и в воркере.
+    Все «сегодня» считаются по Москве, как и в планировщике.
+    """
+
+    def __init__(self, tz=MSK):
+        self.tz = tz
+        self._holidays: set[datetime.date] = set()
+        self._fingerprint: tuple[int, str] | None = None
+        self._loaded = False
+        self._lock = asyncio.Lock()
+
+        self._session_maker: async_sessionmaker | None = None
+        self._refresh_task: asyncio.Task | None = None
+
+    # ---------- загрузка ----------
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def set_holidays(self, dates) -> None:
+        """Подменяет набор праздников целиком (без БД)."""
+        self._holidays = set(dates)
+        self._loaded = True
+
+    async def load(self, session_maker: async_sessionmaker) -> None:
+        self._session_maker = session_maker
+        async with self._lock:
+            async with session_maker() as session:
+                dates = await get_holiday_dates(session)
+                fingerprint = await get_holidays_fingerprint(session)
+            self.set_holidays(dates)
+            self._fingerprint = fingerprint
+        logger.info("📅 Календарь загружен: праздников %s", len(self._holidays))
+
+    async def ensure_loaded(self, session_maker: async_sessionmaker) -> None:
+        if not self._loaded:
+            await self.load(session_maker)
+
+    def _require_session_maker(self) -> async_sessionmaker:
+        if self._session_maker is None:
+            raise RuntimeError("BusinessCalendar is not loaded. Call 'await calendar.load(session_maker)' first.")
+        return self._session_maker
+
+    async def refresh(self) -> None:
+        await self.load(self._require_session_maker())
+
+    async def refresh_if_changed(self) -> bool:
+        """Перечитывает праздники, только если отпечаток таблицы изменился."""
+        if self._session_maker is None:
+            return False
+        async with self._session_maker() as session:
+            fingerprint = await get_holidays_fingerprint(session)
+        if fingerprint == self._fingerprint:
+            return False
+        await self.load(self._session_maker)
+        return True
+
+    def start_auto_refresh(self, interval: float = REFRESH_INTERVAL_SECONDS) -> None:
+        if self._refresh_task is not None and not self._refresh_task.done():
+            return
+
+        async def _loop():
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    await self.refresh_if_changed()
+                except Exception as e:
+                    logger.warning("[BusinessCalendar] не удалось обновить праздники: %s", e)
+
+        self._refresh_task = asyncio.create_task(_loop())
+
+    def stop_auto_refresh(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+
+    # ---------- запросы ----------
+
+    def today(self) -> datetime.date:
+        return datetime.datetime.now(self.tz).date()
+
+    def is_holiday(self, target_date: datetime.date) -> bool:
+        return target_date in self._holidays
+
+    def is_day_off(self, target_date: datetime.date | None = None) -> bool:
+        """
+        True, если дата — суббота/воскресенье или праздник. O(1), без БД.
+        Без аргумента — «сегодня» по Москве.
+        """
+        if target_date is None:
+            target_date = self.today()
+        elif isinstance(target_date, datetime.datetime):
+            target_date = target_date.astimezone(self.tz).date() if target_date.tzinfo else target_date.date()
+        return target_date.weekday() >= 5 or target_date in self._holidays
+
+
+business_calendar = BusinessCalendar()
@@ -0,0 +1,136 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable
+
+from utils.metrics import WB_BREAKER_STATE, WB_BREAKER_REJECTED
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_STATE_VALUE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+Probe = Callable[[], Awaitable[bool]]
+
+
+class CircuitBreaker:
+    """
+    Предохранитель на пару (хост, эндпоинт) для антибота WB.
+
+    После failure_threshold подряд ответов 498/HTML-заглушки переходит в open:
+    все вызывающие сразу получают отказ (allow() == False) вместо 15 попыток
+    со сном до 90 с. Пока open, фоновая задача через open_seconds делает один
+    пробный запрос (half_open): успех закрывает предохранитель, неудача
+    открывает снова с удвоенным интервалом (не больше max_open_seconds).
+    """
+
+    def __init__(self, host: str, endpoint: str, *, failure_threshold: int = 3,
+                 open_seconds: float = 60.0, max_open_seconds: float = 600.0):
+        self.host = host
+        self.endpoint = endpoint
+        self.failure_threshold = failure_threshold
+        self.base_open_seconds = open_seconds
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe: Probe | None = None
+        self._probe_task: asyncio.Task | None = None
+        self._set_state(CLOSED)
+
+    def _set_state(self, state: str) -> None:
+        self.state = state
+        WB_BREAKER_STATE.labels(self.host, self.endpoint).set(_STATE_VALUE[state])
+
+    @property
+    def is_open(self) -> bool:
+        return self.state != CLOSED
+
+    def retry_in(self) -> float:
+        """Сколько осталось до пробного запроса (для сообщений)."""
+        if self.state == CLOSED:
+            return 0.0
+        return max(0.0, self.opened_at + self.open_seconds - time.monotonic())
+
+    def allow(self) -> bool:
+        if self.state == CLOSED:
+            return True
+        WB_BREAKER_REJECTED.labels(self.endpoint).inc()
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        if self.state != CLOSED:
+            self._close()
+
+    def record_antibot(self, probe: Probe | None = None) -> bool:
+        """Учитывает ответ антибота. True — предохранитель (уже) открыт."""
+        if probe is not None:
+            self._probe = probe
+        if self.state != CLOSED:
+            return True
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            self._open()
+            return True
+        return False
+
+    def _open(self) -> None:
+        self.opened_at = time.monotonic()
+        self._set_state(OPEN)
+        logger.warning(
+            "🔌 Предохранитель %s %s открыт после %s ответов антибота — пауза %.0fs",
+            self.host, self.endpoint, self.failures, self.open_seconds,
+        )
+        if self._probe_task is None or self._probe_task.done():
+            self._probe_task = asyncio.create_task(self._probe_loop())
+
+    def _close(self) -> None:
+        self.failures = 0
+        self.open_seconds = self.base_open_seconds
+        self._set_state(CLOSED)
+        logger.info("🔌 Предохранитель %s %s закрыт", self.host, self.endpoint)
+
+    async def _probe_loop(self) -> None:
+        while self.state != CLOSED:
+            await asyncio.sleep(self.retry_in())
+            if self.state == CLOSED:
+                return
+            if self._probe is None:
+                # пробовать нечем — просто даём трафику один шанс
+                self._close()
+                return
+
+            self._set_state(HALF_OPEN)
+            try:
+                ok = await self._probe()
+            except Exception as e:
+                logger.debug("Пробный запрос %s %s упал: %s", self.host, self.endpoint, e)
+                ok = False
+
+            if ok:
+                self._close()
+                return
+
+            self.open_seconds = min(self.open_seconds * 2, self.max_open_seconds)
+            self.opened_at = time.monotonic()
+            self._set_state(OPEN)
+            logger.warning(
+                "🔌 Пробный запрос %s %s не прошёл — пауза %.0fs", self.host, self.endpoint, self.open_seconds,
+            )
+
+
+# общие на процесс: блокировка хоста видна всем клиентам и всем компаниям запуска
+_breakers: dict[tuple[str, str], CircuitBreaker] = {}
+
+
+def get_breaker(host: str, endpoint: str) -> CircuitBreaker:
+    breaker = _breakers.get((host, endpoint))
+    if breaker is None:
+        breaker = _breakers[(host, endpoint)] = CircuitBreaker(host, endpoint)
+    return breaker
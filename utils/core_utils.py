@@ -1,8 +1,8 @@
-import datetime
+from collections import Counter
 from typing import Any
 from config import config
 
-from services.holiday_service import is_date_in_holidays
+from utils.business_calendar import business_calendar
 
 
 def split_into_batches(items: list[dict], batch_size: int) -> list[list[dict]]:
@@ -11,13 +11,11 @@ def split_into_batches(items: list[dict], batch_size: int) -> list[list[dict]]:
 
 async def is_weekend() -> bool:
     """
-    True, если сегодня суббота/воскресенье ИЛИ дата есть в таблице holidays.
+    True, если сегодня (по МСК) суббота/воскресенье ИЛИ дата есть в таблице holidays.
+    Праздники берутся из календаря в памяти — БД трогаем только при первой загрузке.
     """
-    today = datetime.datetime.today()
-    if today.weekday() in (5, 6):  # 5=СБ, 6=ВС
-        return True
-    async with config.AsyncSessionLocal() as session:
-        return await is_date_in_holidays(session, today)
+    await business_calendar.ensure_loaded(config.AsyncSessionLocal)
+    return business_calendar.is_day_off(business_calendar.today())
 
 
 ALLOWED_TOP_LEVEL_FIELDS = {
@@ -44,4 +42,43 @@ def filter_card_top_level(raw_card: dict[str, Any]) -> dict[str, Any]:
     filtered = {k: raw_card[k] for k in ALLOWED_TOP_LEVEL_FIELDS if k in raw_card}
     # 2) Исключаем api_key из payload для API
     # payload_card = {k: v for k, v in filtered.items() if k != "api_key"}
-    return filtered
\ No newline at end of file
+    return filtered
+
+
+def prepare_payloads(cards: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """
+    Карточки -> payload для update_cards (с api_key для группировки).
+    Карточки без api_key отбрасываются. Чистая функция: годится для пула процессов.
+    """
+    return [filter_card_top_level(card) for card in cards if card.get("api_key")]
+
+
+class DedupIndex:
+    """
+    Что уже было в этом запуске — на весь флот, а не на одну компанию.
+
+    Ключ (api_key, root) при чтении карточек и (api_key, nmID) при отправке:
+    дубли строк номенклатуры и root, общие для кабинетов, не тратят запрос
+    повторно. Снятые дубли считаются по владельцу (имя компании / токен).
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._seen: set = set()
+        self.duplicates: Counter[str] = Counter()
+
+    def first(self, key: Any, owner: str = "") -> bool:
+        """True — ключ встретился впервые; иначе дубль засчитан owner."""
+        if key in self._seen:
+            self.duplicates[owner] += 1
+            return False
+        self._seen.add(key)
+        return True
+
+    @property
+    def removed(self) -> int:
+        return sum(self.duplicates.values())
+
+    def report(self) -> str:
+        owners = ", ".join(f"{owner or '—'}: {count}" for owner, count in self.duplicates.most_common())
+        return f"дублей {self.name} снято {self.removed} ({owners})"
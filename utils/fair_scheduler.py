@@ -0,0 +1,111 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Iterable, Iterator
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+Job = Callable[[], Awaitable[None]]
+
+
+def lane_of(cabinet_order: int | None) -> int:
+    """Полоса приоритета по cabinet_order: 0 — самая приоритетная, без порядка — последняя."""
+    if cabinet_order is None:
+        return len(Config.PRIORITY_LANES)
+    for lane, bound in enumerate(Config.PRIORITY_LANES):
+        if cabinet_order < bound:
+            return lane
+    return len(Config.PRIORITY_LANES)
+
+
+def lane_weight(lane: int) -> int:
+    """Доля слотов полосы: каждая следующая получает вдвое меньше."""
+    return 2 ** max(0, len(Config.PRIORITY_LANES) - lane)
+
+
+class _Owner:
+    def __init__(self, name: str, weight: int, jobs: Iterator[Job]):
+        self.name = name
+        self.weight = weight
+        self.jobs = jobs
+        self.vtime = 0.0       # виртуальное время: сколько слотов уже съел, с поправкой на вес
+        self.running = False
+        self.done = False
+
+
+class FairScheduler:
+    """
+    Справедливое распределение слотов между компаниями (взвешенная очередь).
+
+    Каждая компания — очередь работ (root на чтение, батч на отправку). Слот
+    достаётся компании с наименьшим виртуальным временем; работа сдвигает его
+    на 1 / вес полосы, поэтому приоритетные кабинеты получают больше слотов,
+    но крупный кабинет не держит мелкие до своего конца. У компании одна работа
+    в полёте: Content API всё равно ограничивает токен одним запросом.
+
+    Работы берутся из итератора лениво, в момент выдачи слота, — генератор
+    может решать, что делать дальше, по итогам предыдущей работы.
+    on_done(name) вызывается, когда у компании кончились работы.
+    """
+
+    def __init__(self, slots: int | None = None, on_done: Callable[[str], None] | None = None):
+        self.slots = max(1, slots or Config.FAIR_SLOTS)
+        self.on_done = on_done
+        self._owners: list[_Owner] = []
+        self._changed = asyncio.Event()
+
+    def add(self, name: str, jobs: Iterable[Job], *, lane: int = 0) -> None:
+        self._owners.append(_Owner(name, lane_weight(lane), iter(jobs)))
+
+    def _pick(self) -> tuple[_Owner, Job] | None:
+        while True:
+            ready = [owner for owner in self._owners if not owner.running and not owner.done]
+            if not ready:
+                return None
+            # min стабилен: при равенстве — раньше добавленная (порядок cabinet_order)
+            owner = min(ready, key=lambda o: o.vtime)
+            job = next(owner.jobs, None)
+            if job is not None:
+                owner.running = True
+                owner.vtime += 1.0 / owner.weight
+                return owner, job
+            self._finish(owner)
+
+    def _finish(self, owner: _Owner) -> None:
+        owner.done = True
+        if self.on_done is not None:
+            self.on_done(owner.name)
+
+    def _active(self) -> bool:
+        return any(not owner.done for owner in self._owners)
+
+    async def _worker(self) -> None:
+        while True:
+            picked = self._pick()
+            if picked is None:
+                if not self._active():
+                    return
+                # все оставшиеся компании заняты — ждём, пока чья-то работа закончится
+                self._changed.clear()
+                await self._changed.wait()
+                continue
+
+            owner, job = picked
+            try:
+                await job()
+            finally:
+                owner.running = False
+                self._changed.set()
+
+    async def run(self) -> None:
+        if not self._owners:
+            return
+        workers = [asyncio.create_task(self._worker()) for _ in range(min(self.slots, len(self._owners)))]
+        try:
+            await asyncio.gather(*workers)
+        except BaseException:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            raise
@@ -1,11 +1,30 @@
+import asyncio
+import logging
+import os
+
 from aiogram import Bot
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
-from aiogram.types import Message
+from aiogram.types import Message, FSInputFile
 
 from config import config
-from core import run_all_to, run_all_from
-from errors import AuthorizationError
+from core import run_all_to, run_all_from, build_plan, execute_plan
+from errors import AuthorizationError, DeadlineExceeded
+from models.work_queue import QUEUED, RUNNING, DONE, FAILED
+from models.run_plan import PLAN_DONE, PLAN_FAILED
+from services.company_service import get_sorted_companies, get_company_ids_with_nomenclature
+from services.work_queue_service import (
+    enqueue_job, get_job_progress, get_job_units, finish_job, job_picked_up, cancel_job_units, iter_job_rows,
+)
+from utils.core_utils import is_weekend
+from utils.run_export import RunExport
+from utils.run_stats import RunStats
+from services.run_stat_service import save_run_stat, get_last_run_stats, phase_percentiles
+from services.run_plan_service import create_plan, approve_plan, finish_plan
+from utils.run_plan import format_plan
+from utils.run_scope import RunScope
+
+logger = logging.getLogger(__name__)
 
 from typing import List
 
@@ -100,10 +119,18 @@ async def send_long_text(
                 disable_web_page_preview=True
             )
 
-async def run_action(message: Message | int, action: str, *, bot: Bot | None = None, weekend_override: bool | None = None):
+async def run_action(
+    message: Message | int,
+    action: str,
+    *,
+    bot: Bot | None = None,
+    weekend_override: bool | None = None,
+    scope: RunScope | None = None,
+):
     """
     Универсальный запуск экшенов как по Message, так и по user_id.
-    weekend_override применяется только для all_from.
+    weekend_override применяется только для all_from. scope — выборочный запуск
+    (компания, бренд, список root); None — весь флот.
     """
     if isinstance(message, Message):
         send = message.answer
@@ -113,20 +140,40 @@ async def run_action(message: Message | int, action: str, *, bot: Bot | None = N
         user_id = message
         send = lambda text: bot.send_message(chat_id=user_id, text=text)
 
+    export = RunExport(action)
+    stats = RunStats(action)
+    scope = scope or RunScope()
+    scope_txt = "" if scope.is_full else f" 🎯 {scope.describe()}"
+
     try:
         if action == "all_to":
-            await send("Запущен процесс All To...")
-            errors = await run_all_to()
+            await send(f"Запущен процесс All To...{scope_txt}")
+            if config.RUN_MODE == "queue":
+                errors = await run_via_queue(action, None, user_id, export, stats, send, scope=scope)
+            else:
+                errors = await run_all_to(
+                    export=export, stats=stats, company_ids=scope.company_ids, company_roots=scope.company_roots,
+                )
             await send("✅ All To завершено.")
         elif action == "all_from":
             mode_txt = "Режим: выходные" if weekend_override else ("Режим: будни" if weekend_override is False else "Режим: авто")
-            await send(f"Запущен процесс All From... ({mode_txt})")
-            errors = await run_all_from(weekend_override=weekend_override)
+            await send(f"Запущен процесс All From... ({mode_txt}){scope_txt}")
+            if config.RUN_MODE == "queue":
+                errors = await run_via_queue(action, weekend_override, user_id, export, stats, send, scope=scope)
+            else:
+                errors = await run_all_from(
+                    weekend_override=weekend_override, export=export, stats=stats,
+                    company_ids=scope.company_ids, company_roots=scope.company_roots,
+                )
             await send("✅ All From завершено.")
         else:
             await send("Неизвестная команда.")
             return
 
+        stats.finish("ok")
+
+        await send_run_export(message if isinstance(message, Message) else user_id, export, bot=bot)
+
         if errors:
             errors_str = "\n".join(map(str, errors))
             # поддержка длинных сообщений
@@ -137,4 +184,206 @@ async def run_action(message: Message | int, action: str, *, bot: Bot | None = N
                 await send_long_text(user_id, f"Ошибки:\n{errors_str}", bot=bot)
 
     except AuthorizationError as e:
-        await send(f"Ошибка авторизации\n{e}")
\ No newline at end of file
+        stats.finish("error", str(e))
+        await send(f"Ошибка авторизации\n{e}")
+    except DeadlineExceeded as e:
+        # срок запуска вышел — то, что успели, всё равно отдаём отчётом
+        stats.finish("deadline", str(e))
+        await send(f"⌛ Запуск остановлен: истёк срок ({config.RUN_DEADLINE_SECONDS}s).")
+        await send_run_export(message if isinstance(message, Message) else user_id, export, bot=bot)
+    except Exception as e:
+        stats.finish("error", str(e))
+        raise
+    finally:
+        if stats.finished_at is not None:
+            await _save_run_stats(stats)
+
+
+async def plan_action(
+    message: Message, action: str, *, weekend_override: bool | None = None, scope: RunScope | None = None
+):
+    """Считает план запуска по кэшу карточек и присылает его на подтверждение."""
+    scope = scope or RunScope()
+    await message.answer("⏳ Считаю план по кэшу карточек (без запросов к WB)...")
+    summary, cards = await build_plan(
+        action, weekend=weekend_override, company_ids=scope.company_ids, company_roots=scope.company_roots,
+    )
+    if not scope.is_full:
+        summary["scope_label"] = scope.describe()
+
+    async with config.AsyncSessionLocal() as session:
+        history = phase_percentiles(await get_last_run_stats(session, 20, action)).get("total")
+        summary["history_p50"] = history[0] if history else None
+        plan = await create_plan(
+            session, action,
+            weekend=summary["weekend"], summary=summary, cards=cards,
+            created_by=message.from_user.id, ttl_seconds=config.PLAN_TTL_SECONDS,
+        )
+
+    text = format_plan(plan.id, summary)
+    if cards:
+        text += (
+            f"\n\nВыполнить: /approve_{plan.id}\nОтменить: /cancel_{plan.id}\n"
+            f"План действует {config.PLAN_TTL_SECONDS // 60} мин."
+        )
+    else:
+        text += "\n\nМенять нечего."
+    await send_long_text(message, text)
+
+
+async def run_plan_action(message: Message, plan_id: int):
+    """Выполняет подтверждённый план: отправка без повторной загрузки карточек."""
+    async with config.AsyncSessionLocal() as session:
+        plan = await approve_plan(session, plan_id, message.from_user.id)
+    if plan is None:
+        await message.answer(f"План #{plan_id} не найден, уже выполнен, отменён или устарел.")
+        return
+
+    export = RunExport(plan.action)
+    stats = RunStats(plan.action)
+    await message.answer(f"▶️ Выполняю план #{plan.id}: карточек {len(plan.cards or [])}")
+    try:
+        errors = await execute_plan(plan, export=export, stats=stats)
+        stats.finish("ok")
+        await message.answer(f"✅ План #{plan.id} выполнен.")
+        await send_run_export(message, export)
+        if errors:
+            await send_long_text(message, "Ошибки:\n" + "\n".join(map(str, errors)))
+    except AuthorizationError as e:
+        stats.finish("error", str(e))
+        await message.answer(f"Ошибка авторизации\n{e}")
+    except DeadlineExceeded as e:
+        stats.finish("deadline", str(e))
+        await message.answer(f"⌛ План остановлен: истёк срок ({config.RUN_DEADLINE_SECONDS}s).")
+        await send_run_export(message, export)
+    except Exception as e:
+        stats.finish("error", str(e))
+        raise
+    finally:
+        async with config.AsyncSessionLocal() as session:
+            await finish_plan(session, plan.id, PLAN_DONE if stats.status == "ok" else PLAN_FAILED)
+        if stats.finished_at is not None:
+            await _save_run_stats(stats)
+
+
+async def run_via_queue(
+    action: str,
+    weekend_override: bool | None,
+    user_id: int,
+    export: RunExport,
+    stats: RunStats,
+    send,
+    *,
+    scope: RunScope | None = None,
+) -> list[str]:
+    """
+    Режим очереди: ставим задание (по единице на компанию), ждём, пока воркеры
+    его выполнят, и собираем ошибки, строки отчёта и статистику единиц.
+    Выборочный запуск ставит единицы только отобранных компаний.
+
+    Ждём не бесконечно: если за QUEUE_PICKUP_SECONDS ни одна единица не взята —
+    воркеров нет, задание снимаем; общий предел — срок запуска (+ запас на
+    доклад воркеров) или QUEUE_WAIT_SECONDS. Незакрытые единицы уходят в failed.
+    """
+    scope = scope or RunScope()
+    weekend = None
+    if action == "all_from":
+        weekend = await is_weekend() if weekend_override is None else weekend_override
+
+    async with config.AsyncSessionLocal() as session:
+        company_ids = await get_company_ids_with_nomenclature(session)
+        if scope.company_ids is not None:
+            company_ids = [company_id for company_id in company_ids if company_id in scope.company_ids]
+        job = await enqueue_job(
+            session, action, company_ids,
+            weekend=weekend, requested_by=user_id, deadline_seconds=config.RUN_DEADLINE_SECONDS or None,
+            company_roots=scope.company_roots,
+        )
+    await send(f"📥 Задание #{job.id} в очереди: компаний {len(company_ids)}")
+
+    errors: list[str] = []
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    if config.RUN_DEADLINE_SECONDS:
+        wait_limit = config.RUN_DEADLINE_SECONDS + config.QUEUE_PICKUP_SECONDS
+    else:
+        wait_limit = config.QUEUE_WAIT_SECONDS
+    picked_up = False
+    no_worker = False
+
+    while True:
+        await asyncio.sleep(config.QUEUE_POLL_SECONDS)
+        async with config.AsyncSessionLocal() as session:
+            progress = await get_job_progress(session, job.id)
+            if not progress.get(QUEUED) and not progress.get(RUNNING):
+                break
+            picked_up = picked_up or await job_picked_up(session, job.id)
+
+            waited = loop.time() - started
+            if not picked_up and waited >= config.QUEUE_PICKUP_SECONDS:
+                await cancel_job_units(session, job.id, "ни один воркер не взял задание")
+                no_worker = True
+                errors.append(
+                    f"⏳ Задание #{job.id}: ни один воркер не взял его за {waited:.0f}с — запущен ли worker.py?"
+                )
+                break
+            if waited >= wait_limit:
+                cancelled = await cancel_job_units(session, job.id, "бот не дождался единицы")
+                errors.append(f"⏳ Задание #{job.id}: не дождались {cancelled} единиц за {waited:.0f}с")
+                break
+
+    async with config.AsyncSessionLocal() as session:
+        units = await get_job_units(session, job.id)
+        failed = [unit for unit in units if unit.status == FAILED]
+        # строки отчёта — потоком, по мере чтения курсора, сразу в write-only лист
+        async for row in iter_job_rows(session, job.id):
+            export.append_row(row)
+        await finish_job(session, job.id, FAILED if failed else DONE)
+
+    for unit in units:
+        result = unit.result or {}
+        errors.extend(result.get("errors") or [])
+        stats.absorb(result.get("stats") or {})
+    if not no_worker:
+        # снятые без воркеров единицы по одной не перечисляем — хватит сообщения выше
+        for unit in failed:
+            errors.append(f"❌ Компания id={unit.company_id}, фаза {unit.phase}: {unit.error}")
+
+    logger.info("📦 Задание #%s: единиц %s, с ошибкой %s", job.id, len(units), len(failed))
+    return errors
+
+
+async def _save_run_stats(stats: RunStats):
+    logger.info("⏱️ %s", stats.summary())
+    try:
+        async with config.AsyncSessionLocal() as session:
+            await save_run_stat(session, stats)
+    except Exception as e:
+        logger.warning("[run_stats] Не удалось сохранить статистику запуска: %s", e)
+
+
+async def send_run_export(target: int | Message, export: RunExport, *, bot: Bot | None = None):
+    """
+    Сохраняет итоги запуска в XLSX (+ текущее состояние брендов) и отправляет файлом.
+    """
+    if not export.rows:
+        return
+
+    async with config.AsyncSessionLocal() as session:
+        companies = await get_sorted_companies(session)
+    export.write_brand_state(companies)
+
+    path = export.save()
+    try:
+        document = FSInputFile(path, filename=export.filename)
+        caption = f"Итоги: {export.summary()}"
+        if isinstance(target, Message):
+            await target.answer_document(document, caption=caption)
+        else:
+            if bot is None:
+                bot = Bot(token=config.BOT_TOKEN)
+            await bot.send_document(chat_id=target, document=document, caption=caption)
+    except Exception as e:
+        logger.warning("[send_run_export] Не удалось отправить отчёт: %s", e)
+    finally:
+        os.remove(path)
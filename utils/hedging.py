@@ -0,0 +1,124 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Awaitable, Callable, TypeVar
+
+from utils.metrics import WB_HEDGED
+from utils.run_stats import percentile
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class LatencyWindow:
+    """Скользящее окно латентностей (с) для выбора порога хеджирования."""
+
+    def __init__(self, size: int = 200, min_samples: int = 20):
+        self.samples: deque[float] = deque(maxlen=size)
+        self.min_samples = min_samples
+
+    def observe(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def percentile(self, q: float) -> float | None:
+        if len(self.samples) < self.min_samples:
+            return None
+        return percentile(list(self.samples), q)
+
+
+class HedgeBudget:
+    """
+    Бюджет дублей: каждый основной запрос добавляет ratio «жетона», каждый дубль
+    тратит один. При ratio=0.1 дублей не больше ~10% от основных запросов
+    (плюс стартовый запас burst).
+    """
+
+    def __init__(self, ratio: float = 0.1, burst: float = 5.0):
+        self.ratio = ratio
+        self.burst = burst
+        self.tokens = burst
+
+    def on_request(self) -> None:
+        self.tokens = min(self.burst, self.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+async def hedged(
+    primary: Callable[[], Awaitable[T]],
+    fallback: Callable[[], Awaitable[T]],
+    *,
+    delay: float,
+    budget: HedgeBudget,
+    endpoint: str,
+    ok: Callable[[T], bool] = bool,
+    timeout: float | None = None,
+) -> T:
+    """
+    Запускает primary; если за delay он не ответил и бюджет позволяет — дублирует
+    запрос через fallback и возвращает первый успешный (ok) результат, второй
+    запрос отменяется. Исключение primary (например, открытый предохранитель)
+    сразу переводит на fallback. Без бюджета primary ждём не дольше timeout
+    от старта, дальше он отменяется и идём на fallback.
+    """
+    budget.on_request()
+    first = asyncio.ensure_future(primary())
+    second: asyncio.Future | None = None
+    try:
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if not done and not budget.try_spend():
+            WB_HEDGED.labels(endpoint, "budget_exhausted").inc()
+            wait_more = None if timeout is None else max(0.0, timeout - delay)
+            done, _ = await asyncio.wait({first}, timeout=wait_more)
+            if not done:
+                first.cancel()
+                await asyncio.gather(first, return_exceptions=True)
+                logger.debug("Основной запрос %s не ответил за %.0fs — идём на фолбэк", endpoint, timeout)
+                WB_HEDGED.labels(endpoint, "primary_timeout").inc()
+                return await fallback()
+
+        if done:
+            try:
+                result = first.result()
+                if ok(result):
+                    return result
+            except Exception as e:
+                logger.debug("Основной запрос %s упал (%s) — идём на фолбэк", endpoint, e)
+            WB_HEDGED.labels(endpoint, "primary_failed").inc()
+            return await fallback()
+
+        WB_HEDGED.labels(endpoint, "sent").inc()
+        second = asyncio.ensure_future(fallback())
+        pending = {first, second}
+        result = None
+        error: Exception | None = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                try:
+                    value = task.result()
+                except Exception as e:
+                    logger.debug("Хедж-запрос %s упал: %s", endpoint, e)
+                    error = e
+                    continue
+                if ok(value):
+                    WB_HEDGED.labels(endpoint, "won_fallback" if task is second else "won_primary").inc()
+                    return value
+                result = value
+        # оба упали исключением — отдаём его вызывающему (например, CircuitOpenError)
+        if result is None and error is not None:
+            raise error
+        return result
+    finally:
+        # проигравший запрос (или оба — если отменили нас самих) снимаем и дожидаемся,
+        # чтобы он успел вернуть слот лимитера до следующей страницы
+        losers = [task for task in (first, second) if task is not None and not task.done()]
+        for task in losers:
+            task.cancel()
+        if losers:
+            await asyncio.gather(*losers, return_exceptions=True)
@@ -1,13 +1,19 @@
 # helpers_rate.py
 import asyncio, time
-from email.utils import parsedate_to_datetime
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+
+from utils.metrics import LIMITER_WAIT_SECONDS, key_label
 
 class HostRateLimiter:
     """
     Ограничивает одновременность и темп запросов к одному хосту.
     Адаптивно увеличивает минимальный интервал после 429.
     """
-    def __init__(self, max_concurrent: int = 2, base_min_interval: float = 0.4, max_min_interval: float = 3.0):
+    def __init__(self, max_concurrent: int = 2, base_min_interval: float = 0.4, max_min_interval: float = 3.0,
+                 *, scope: str = "host", name: str = ""):
+        self.scope = scope
+        self.name = name
         self.sem = asyncio.BoundedSemaphore(max_concurrent)
         self.base_min_interval = base_min_interval
         self._min_interval = base_min_interval
@@ -17,16 +23,35 @@ class HostRateLimiter:
 
     async def __aenter__(self):
         await self.sem.acquire()
-        async with self._lock:
-            now = time.monotonic()
-            wait = max(0.0, self._min_interval - (now - self._last_ts))
-        if wait:
-            await asyncio.sleep(wait)
+        # отмена во время ожидания темпа (проигравший хедж-запрос, срок запуска) не должна
+        # уносить слот: лимитеры общие на процесс, утечка копилась бы до полной блокировки
+        try:
+            async with self._lock:
+                now = time.monotonic()
+                wait = max(0.0, self._min_interval - (now - self._last_ts))
+            if wait:
+                await asyncio.sleep(wait)
+        except BaseException:
+            self.sem.release()
+            raise
 
     async def __aexit__(self, exc_type, exc, tb):
-        async with self._lock:
-            self._last_ts = time.monotonic()
-        self.sem.release()
+        try:
+            async with self._lock:
+                self._last_ts = time.monotonic()
+        finally:
+            self.sem.release()
+
+    @asynccontextmanager
+    async def limit(self, _key: str | None = None):
+        """async with limiter.limit(url): ... — то же, что async with limiter, плюс метрика ожидания."""
+        started = time.monotonic()
+        await self.__aenter__()
+        LIMITER_WAIT_SECONDS.labels(self.scope, self.name).observe(time.monotonic() - started)
+        try:
+            yield self
+        finally:
+            await self.__aexit__(None, None, None)
 
     def punish(self):
         # после 429 повышаем интервал (но не выше max_min_interval)
@@ -37,22 +62,26 @@ class HostRateLimiter:
         self._min_interval = max(self.base_min_interval, self._min_interval * 0.9)
 
 
-def parse_retry_after(value: str | None) -> float | None:
-    if not value:
-        return None
-    value = value.strip()
-    if value.isdigit():
-        return float(value)
-    try:
-        dt = parsedate_to_datetime(value)
-        # сервер дал абсолютное время
-        delay = (dt - parsedate_to_datetime(parsedate_to_datetime(time.strftime('%a, %d %b %Y %H:%M:%S GMT')))).total_seconds()  # not used
-    except Exception:
-        # более корректно: сравнить с now в UTC
-        try:
-            dt = parsedate_to_datetime(value)
-            delay = (dt.timestamp() - time.time())
-            return max(0.0, delay)
-        except Exception:
-            return None
-    return None
+# общие на процесс лимитеры: новый WBClientAPI на каждый запрос не сбрасывает темп
+_host_limiters: dict[str, HostRateLimiter] = {}
+_key_limiters: dict[str, HostRateLimiter] = {}
+
+
+def get_host_limiter(url: str) -> HostRateLimiter:
+    host = urlsplit(url).netloc or url
+    limiter = _host_limiters.get(host)
+    if limiter is None:
+        limiter = _host_limiters[host] = HostRateLimiter(
+            max_concurrent=2, base_min_interval=0.5, max_min_interval=2.5, scope="host", name=host,
+        )
+    return limiter
+
+
+def get_key_limiter(api_key: str) -> HostRateLimiter:
+    """Лимитер Content API на один токен продавца (лимиты WB считаются по токену)."""
+    limiter = _key_limiters.get(api_key)
+    if limiter is None:
+        limiter = _key_limiters[api_key] = HostRateLimiter(
+            max_concurrent=1, base_min_interval=0.6, max_min_interval=6.0, scope="key", name=key_label(api_key),
+        )
+    return limiter
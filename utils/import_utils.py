@@ -0,0 +1,226 @@
+import csv
+import os
+import re
+import zipfile
+from dataclasses import dataclass, field
+from itertools import chain
+from typing import Any, Iterator
+
+# заголовки колонок, которые понимаем (в нижнем регистре)
+COLUMN_ALIASES = {
+    "root_id": {"root_id", "root", "imtid", "imt_id"},
+    "wb_article": {"wb_article", "article", "nmid", "nm_id", "артикул", "артикул wb"},
+    "original_brand": {"original_brand", "brand", "бренд"},
+    "company_id": {"company_id", "supplier", "supplier_id", "поставщик"},
+}
+
+MAX_REPORTED_ERRORS = 50
+
+
+@dataclass
+class NomenclatureRecord:
+    company_id: int  # WB supplier id (Company.company_id)
+    root_id: int
+    wb_article: str
+    original_brand: str | None
+
+
+@dataclass
+class ImportReport:
+    rows_total: int = 0
+    valid: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    inserted: int = 0
+    updated: int = 0
+    errors: list[str] = field(default_factory=list)
+
+    def add_error(self, message: str) -> None:
+        self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(message)
+
+    def summary(self) -> str:
+        lines = [
+            f"Строк в файле: {self.rows_total}",
+            f"Корректных: {self.valid}",
+            f"Дубликатов root_id: {self.duplicates}",
+            f"Ошибочных: {self.invalid}",
+            f"Добавлено: {self.inserted}",
+            f"Обновлено: {self.updated}",
+        ]
+        if self.errors:
+            lines.append("Ошибки:")
+            lines.extend(self.errors)
+            if self.invalid > len(self.errors):
+                lines.append(f"... и ещё {self.invalid - len(self.errors)}")
+        return "\n".join(lines)
+
+
+def _map_header(header: list[Any]) -> dict[str, int]:
+    mapping: dict[str, int] = {}
+    for idx, name in enumerate(header):
+        key = str(name or "").strip().lower()
+        for column, aliases in COLUMN_ALIASES.items():
+            if key in aliases and column not in mapping:
+                mapping[column] = idx
+    return mapping
+
+
+def _iter_xlsx(path: str) -> Iterator[tuple]:
+    from openpyxl import load_workbook
+    from openpyxl.utils.exceptions import InvalidFileException
+
+    # read_only — строки читаются потоком, файл целиком в память не грузится
+    try:
+        wb = load_workbook(path, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, InvalidFileException, KeyError, OSError) as e:
+        # битый или не-XLSX файл с расширением .xlsx — ошибка файла, а не бота
+        raise ValueError(f"файл не читается как XLSX ({type(e).__name__})") from e
+    try:
+        yield from wb.active.iter_rows(values_only=True)
+    finally:
+        wb.close()
+
+
+def _iter_csv(path: str) -> Iterator[list]:
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        try:
+            sample = f.read(4096)
+            f.seek(0)
+            try:
+                dialect = csv.Sniffer().sniff(sample, delimiters=";,\t")
+            except csv.Error:
+                dialect = csv.excel
+            yield from csv.reader(f, dialect)
+        except (UnicodeDecodeError, csv.Error) as e:
+            raise ValueError(f"файл не читается как CSV в UTF-8 ({type(e).__name__})") from e
+
+
+def iter_table_rows(path: str) -> Iterator[tuple[int, dict[str, Any]]]:
+    """
+    Потоково читает XLSX/CSV и отдаёт (номер строки, {колонка: значение}).
+    Первая строка — заголовок.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".xlsx", ".xlsm"):
+        rows = _iter_xlsx(path)
+    elif ext in (".csv", ".txt"):
+        rows = _iter_csv(path)
+    else:
+        raise ValueError(f"Неподдерживаемый формат файла: {ext or path}")
+
+    header = next(rows, None)
+    if header is None:
+        return
+    mapping = _map_header(list(header))
+    if "root_id" not in mapping or "wb_article" not in mapping:
+        raise ValueError("В файле нет колонок root_id и wb_article")
+
+    for line_no, row in enumerate(rows, start=2):
+        if row is None or all(v in (None, "") for v in row):
+            continue
+        yield line_no, {
+            column: (row[idx] if idx < len(row) else None)
+            for column, idx in mapping.items()
+        }
+
+
+def parse_root_ids(text: str) -> set[int]:
+    """root id из текста сообщения: числа через пробелы, запятые или с новой строки."""
+    return {int(token) for token in re.findall(r"\d+", text or "") if int(token) > 0}
+
+
+def read_root_ids(path: str) -> set[int]:
+    """
+    root id из файла выборочного запуска (XLSX/CSV/TXT): колонка root_id, если
+    первая строка — заголовок, иначе первая колонка каждой строки.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".xlsx", ".xlsm"):
+        rows = _iter_xlsx(path)
+    elif ext in (".csv", ".txt"):
+        rows = _iter_csv(path)
+    else:
+        raise ValueError(f"Неподдерживаемый формат файла: {ext or path}")
+
+    root_ids: set[int] = set()
+    header = next(rows, None)
+    if header is None:
+        return root_ids
+    idx = _map_header(list(header)).get("root_id")
+    if idx is None:
+        idx = 0
+        rows = chain([header], rows)  # заголовка нет — первая строка тоже данные
+
+    for row in rows:
+        value = _to_int(row[idx]) if row is not None and idx < len(row) else None
+        if value is not None and value > 0:
+            root_ids.add(value)
+    return root_ids
+
+
+def _to_int(value: Any) -> int | None:
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return int(value) if value.is_integer() else None
+    text = str(value).strip()
+    if text.endswith(".0"):
+        text = text[:-2]
+    return int(text) if text.isdigit() else None
+
+
+def _to_text(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+def parse_nomenclature_rows(
+    rows: Iterator[tuple[int, dict[str, Any]]],
+    report: ImportReport,
+    *,
+    default_company_id: int | None = None,
+) -> list[NomenclatureRecord]:
+    """
+    Валидирует строки и убирает дубликаты root_id внутри компании
+    (побеждает последняя строка файла).
+    """
+    unique: dict[tuple[int, int], NomenclatureRecord] = {}
+
+    for line_no, row in rows:
+        report.rows_total += 1
+
+        company_id = _to_int(row.get("company_id")) if "company_id" in row else None
+        if company_id is None:
+            company_id = default_company_id
+        if company_id is None:
+            report.add_error(f"Строка {line_no}: не указана компания (company_id)")
+            continue
+
+        root_id = _to_int(row.get("root_id"))
+        if root_id is None or root_id <= 0:
+            report.add_error(f"Строка {line_no}: некорректный root_id={row.get('root_id')!r}")
+            continue
+
+        wb_article = _to_text(row.get("wb_article"))
+        if not wb_article:
+            report.add_error(f"Строка {line_no}: пустой wb_article")
+            continue
+
+        brand = _to_text(row.get("original_brand")) or None
+
+        key = (company_id, root_id)
+        if key in unique:
+            report.duplicates += 1
+        unique[key] = NomenclatureRecord(company_id, root_id, wb_article, brand)
+
+    report.valid = len(unique)
+    return list(unique.values())
@@ -0,0 +1,157 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+
+# атрибуты LogRecord, которые не считаем «структурными» полями
+_STANDARD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+DEFAULT_LEVELS = {
+    # SQL-эхо выключено, пока явно не попросят LOG_LEVELS=sqlalchemy.engine=INFO
+    "sqlalchemy.engine": "WARNING",
+    "aiogram.event": "WARNING",
+}
+
+_listener: logging.handlers.QueueListener | None = None
+
+
+class StructuredFormatter(logging.Formatter):
+    """
+    text: 2025-01-01 12:00:00 INFO core: сообщение company_id=1 root_id=2
+    json: {"ts": ..., "level": ..., "logger": ..., "msg": ..., "company_id": 1, ...}
+    Поля берутся из extra={...}.
+    """
+
+    def __init__(self, fmt: str = "text"):
+        super().__init__(datefmt="%Y-%m-%d %H:%M:%S")
+        self.json = fmt == "json"
+
+    def _fields(self, record: logging.LogRecord) -> dict:
+        return {k: v for k, v in vars(record).items() if k not in _STANDARD_ATTRS and not k.startswith("_")}
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = record.getMessage()
+        fields = self._fields(record)
+
+        if self.json:
+            payload = {
+                "ts": self.formatTime(record, self.datefmt),
+                "level": record.levelname,
+                "logger": record.name,
+                "msg": message,
+                **fields,
+            }
+            if record.exc_info:
+                payload["exc"] = self.formatException(record.exc_info)
+            return json.dumps(payload, ensure_ascii=False, default=str)
+
+        line = f"{self.formatTime(record, self.datefmt)} {record.levelname} {record.name}: {message}"
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+def _parse_levels(spec: str | None) -> dict[str, str]:
+    levels: dict[str, str] = {}
+    for item in (spec or "").split(","):
+        if "=" not in item:
+            continue
+        name, level = item.split("=", 1)
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging(
+    level: str | None = None,
+    levels: str | None = None,
+    fmt: str | None = None,
+) -> None:
+    """
+    Настраивает логирование один раз на процесс.
+
+    Запись из event loop — только put в очередь (QueueHandler), сам вывод в stdout
+    делает поток QueueListener. Уровни по модулям: LOG_LEVELS="core=DEBUG,api_client=WARNING".
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    level = (level or os.getenv("LOG_LEVEL") or "INFO").upper()
+    fmt = fmt or os.getenv("LOG_FORMAT") or "text"
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(StructuredFormatter(fmt))
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.handlers.clear()
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(level)
+
+    for name, lvl in {**DEFAULT_LEVELS, **_parse_levels(levels or os.getenv("LOG_LEVELS"))}.items():
+        logging.getLogger(name).setLevel(lvl)
+
+    _listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Дописывает очередь и останавливает поток вывода."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+class LogSampler:
+    """
+    Прореживание логов на горячих путях (на каждую карточку / root_id).
+
+    every_n — пишем 1 сообщение из n по ключу;
+    throttle — не чаще раза в interval секунд по ключу, с числом пропущенных.
+    """
+
+    def __init__(self):
+        self._counts: dict[str, int] = {}
+        self._last: dict[str, float] = {}
+        self._suppressed: dict[str, int] = {}
+
+    def every_n(self, logger: logging.Logger, key: str, n: int, level: int, msg: str, *args, **kwargs) -> None:
+        if not logger.isEnabledFor(level):
+            return
+        count = self._counts.get(key, 0)
+        self._counts[key] = count + 1
+        if count % n == 0:
+            extra = dict(kwargs.pop("extra", None) or {})
+            extra["sampled"] = f"1/{n}"
+            logger.log(level, msg, *args, extra=extra, **kwargs)
+
+    def throttle(self, logger: logging.Logger, key: str, interval: float, level: int, msg: str, *args, **kwargs) -> None:
+        if not logger.isEnabledFor(level):
+            return
+        now = time.monotonic()
+        if now - self._last.get(key, float("-inf")) < interval:
+            self._suppressed[key] = self._suppressed.get(key, 0) + 1
+            return
+        self._last[key] = now
+        suppressed = self._suppressed.pop(key, 0)
+        if suppressed:
+            extra = dict(kwargs.pop("extra", None) or {})
+            extra["suppressed"] = suppressed
+            kwargs["extra"] = extra
+        logger.log(level, msg, *args, **kwargs)
+
+    def reset(self) -> None:
+        self._counts.clear()
+        self._last.clear()
+        self._suppressed.clear()
+
+
+sampler = LogSampler()
@@ -0,0 +1,283 @@
+import functools
+import hashlib
+import logging
+import math
+import time
+from typing import Iterable
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple, object] = {}
+
+    def labels(self, *values):
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name}: ожидаются метки {self.labelnames}, получено {values}")
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            child = self._children[key] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _default(self):
+        return self.labels()
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for key, child in sorted(self._children.items()):
+            lines.extend(self._render_child(key, child))
+        return lines
+
+    def _render_child(self, key: tuple, child) -> list[str]:
+        raise NotImplementedError
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default().inc(amount)
+
+    def _render_child(self, key, child):
+        return [f"{self.name}{_fmt_labels(self.labelnames, key)} {_fmt_value(child.value)}"]
+
+
+class Gauge(Counter):
+    type_name = "gauge"
+
+    def set(self, value: float) -> None:
+        self._default().set(value)
+
+
+class _HistogramValue:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def quantile(self, q: float) -> float | None:
+        """Грубая оценка квантиля по корзинам (верхняя граница корзины)."""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= target:
+                return bound
+        return self.buckets[-2] if len(self.buckets) > 1 else None
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default().observe(value)
+
+    def _render_child(self, key, child):
+        lines = []
+        cumulative = 0
+        for bound, n in zip(child.buckets, child.counts):
+            cumulative += n
+            le = f'le="{_fmt_value(bound)}"'
+            lines.append(f"{self.name}_bucket{_fmt_labels(self.labelnames, key, le)} {cumulative}")
+        labels = _fmt_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_fmt_value(child.sum)}")
+        lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name: str) -> _Metric | None:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# ---------- метрики ----------
+
+WB_REQUEST_SECONDS = registry.histogram(
+    "wb_request_duration_seconds", "Латентность запросов к WB", ("endpoint", "status"),
+)
+WB_RETRIES = registry.counter(
+    "wb_retries_total", "Повторы запросов к WB", ("endpoint", "reason"),
+)
+WB_ANTIBOT = registry.counter(
+    "wb_antibot_total", "Ответы 498 / HTML-заглушка антибота", ("endpoint",),
+)
+WB_RATE_LIMITED = registry.counter(
+    "wb_rate_limited_total", "Ответы 429", ("endpoint",),
+)
+WB_BREAKER_STATE = registry.gauge(
+    "wb_circuit_breaker_state", "Состояние предохранителя: 0 closed, 1 half_open, 2 open", ("host", "endpoint"),
+)
+WB_BREAKER_REJECTED = registry.counter(
+    "wb_circuit_breaker_rejected_total", "Запросы, отклонённые открытым предохранителем", ("endpoint",),
+)
+WB_HEDGED = registry.counter(
+    "wb_hedged_requests_total", "Хеджирование страниц каталога по исходам", ("endpoint", "outcome"),
+)
+WB_PROXY_REQUESTS = registry.counter(
+    "wb_proxy_requests_total", "Запросы к каталогу через выход (прокси или direct)", ("proxy", "outcome"),
+)
+WB_PROXY_HEALTH = registry.gauge(
+    "wb_proxy_health", "Оценка здоровья выхода, 0..1", ("proxy",),
+)
+WB_BATCH_SIZE = registry.gauge(
+    "wb_update_batch_size", "Текущий размер батча cards/update на токен", ("key",),
+)
+LIMITER_WAIT_SECONDS = registry.histogram(
+    "limiter_wait_seconds", "Ожидание в лимитере перед запросом", ("scope", "name"),
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+DB_QUERY_SECONDS = registry.histogram(
+    "db_query_duration_seconds", "Латентность сервисных функций БД", ("function",),
+)
+BOT_STARTUP_SECONDS = registry.gauge(
+    "bot_startup_seconds", "Старт бота по этапам; total — от запуска процесса до поллинга", ("stage",),
+)
+LOOP_LAG_SECONDS = registry.histogram(
+    "event_loop_lag_seconds", "Опоздание event loop (перебор asyncio.sleep)",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+OFFLOAD_SECONDS = registry.histogram(
+    "cpu_offload_seconds", "CPU-работа в пуле (с ожиданием пула)", ("kind",),
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+PIPELINE_CARDS = registry.counter(
+    "pipeline_cards_total", "Карточки по стадиям пайплайна", ("company", "stage"),
+)
+
+
+def key_label(api_key: str | None) -> str:
+    """Метка для api_key — короткий хэш, сам ключ в метрики не попадает."""
+    if not api_key:
+        return "none"
+    return hashlib.sha1(api_key.encode()).hexdigest()[:8]
+
+
+def db_timed(func):
+    """Декоратор для async-функций services/*: пишет латентность в db_query_duration_seconds."""
+    child = DB_QUERY_SECONDS.labels(func.__name__)
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            child.observe(time.perf_counter() - started)
+
+    return wrapper
+
+
+# ---------- HTTP ----------
+
+async def _metrics_handler(request: web.Request) -> web.Response:
+    return web.Response(
+        body=registry.render().encode(),
+        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+    )
+
+
+async def start_metrics_server(host: str, port: int) -> web.AppRunner:
+    app = web.Application()
+    app.router.add_get("/metrics", _metrics_handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info("📈 Метрики доступны на http://%s:%s/metrics", host, port)
+    return runner
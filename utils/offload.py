@@ -0,0 +1,164 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from config import config
+from utils.metrics import LOOP_LAG_SECONDS, OFFLOAD_SECONDS
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_executor: Executor | None = None
+
+
+def get_executor() -> Executor | None:
+    """
+    Пул под CPU-работу вне event loop: CPU_EXECUTOR=thread | process | inline.
+
+    thread — дёшево передавать данные, но json и фильтрация держат GIL: спасает
+    только нарезка на куски (loop получает управление между кусками).
+    process — настоящий параллелизм, платим pickle туда-обратно; выгоден на
+    больших страницах каталога. inline — как раньше, на loop.
+    """
+    global _executor
+    if _executor is None and config.CPU_EXECUTOR != "inline":
+        workers = config.CPU_WORKERS or min(4, os.cpu_count() or 1)
+        if config.CPU_EXECUTOR == "process":
+            _executor = ProcessPoolExecutor(max_workers=workers)
+        else:
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cpu")
+        logger.info("🧮 CPU-пул: %s × %s", config.CPU_EXECUTOR, workers)
+    return _executor
+
+
+def shutdown_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def run_cpu(kind: str, func: Callable[..., T], *args) -> T:
+    """func(*args) в пуле (или на loop при CPU_EXECUTOR=inline). Для process func должна быть модульной."""
+    started = time.perf_counter()
+    executor = get_executor()
+    try:
+        if executor is None:
+            return func(*args)
+        return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+    finally:
+        OFFLOAD_SECONDS.labels(kind).observe(time.perf_counter() - started)
+
+
+def chunked(items: list, size: int) -> list[list]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+async def map_chunks(kind: str, func: Callable[[list], list], items: list, chunk_size: int | None = None) -> list:
+    """
+    func(chunk) по кускам items, результаты склеиваются в исходном порядке.
+    Куски уходят в пул по одному, между ними loop обслуживает другие задачи.
+    """
+    size = chunk_size or config.OFFLOAD_CHUNK
+    if len(items) <= size:
+        return await run_cpu(kind, func, items)
+
+    result: list = []
+    for chunk in chunked(items, size):
+        result.extend(await run_cpu(kind, func, chunk))
+    return result
+
+
+# ---------- JSON ----------
+
+def _encode_chunk(chunk: list) -> str:
+    # тело массива без скобок — куски склеиваются через запятую
+    return json.dumps(chunk)[1:-1]
+
+
+async def encode_json_array(items: list[Any], chunk_size: int | None = None) -> bytes:
+    """
+    json.dumps(items).encode() кусками: тот же результат, что aiohttp делает для
+    json=payload, но ни один кусок не держит loop дольше нескольких миллисекунд.
+    """
+    size = chunk_size or config.OFFLOAD_CHUNK
+    parts = []
+    for chunk in chunked(items, size):
+        parts.append(await run_cpu("encode", _encode_chunk, chunk))
+    return ("[" + ", ".join(part for part in parts if part) + "]").encode()
+
+
+def _decode(raw: bytes) -> Any:
+    return json.loads(raw)
+
+
+async def decode_json(raw: bytes) -> Any:
+    """Большие ответы (страницы каталога) разбираем в пуле, мелкие — сразу."""
+    if len(raw) < config.OFFLOAD_MIN_BYTES:
+        return json.loads(raw)
+    return await run_cpu("decode", _decode, raw)
+
+
+# ---------- задержка event loop ----------
+
+class LagWindow:
+    """Пик задержки loop за время окна (фаза запуска, бенчмарк)."""
+
+    def __init__(self):
+        self.peak = 0.0
+        self.samples = 0
+
+
+class LoopLagMonitor:
+    """
+    Меряет, насколько event loop опаздывает разбудить задачу: спим interval и
+    смотрим перебор. Перебор = сколько ждал бы апдейт Telegram-поллинга.
+    """
+
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        self.last = 0.0
+        self._windows: set[LagWindow] = set()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if not self.running:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    @contextmanager
+    def window(self):
+        """Окна независимы: параллельные запуски не сбрасывают пики друг друга."""
+        lag_window = LagWindow()
+        self._windows.add(lag_window)
+        try:
+            yield lag_window
+        finally:
+            self._windows.discard(lag_window)
+
+    async def _run(self) -> None:
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.last = max(0.0, time.perf_counter() - started - self.interval)
+            LOOP_LAG_SECONDS.observe(self.last)
+            for lag_window in self._windows:
+                lag_window.peak = max(lag_window.peak, self.last)
+                lag_window.samples += 1
+
+
+loop_lag = LoopLagMonitor()
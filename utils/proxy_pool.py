@@ -0,0 +1,171 @@
+import logging
+import random
+import time
+from urllib.parse import urlsplit
+
+import aiohttp
+from aiohttp_socks import ProxyConnector
+
+from config import Config
+from errors import CircuitOpenError
+from utils.circuit_breaker import CircuitBreaker, get_breaker
+from utils.helpers_rate import HostRateLimiter
+from utils.metrics import WB_PROXY_HEALTH, WB_PROXY_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+DIRECT = "direct"
+
+OK = "ok"
+ANTIBOT = "antibot"
+RATE_LIMITED = "rate_limited"
+ERROR = "error"  # таймаут / обрыв соединения — чаще всего лежит сам прокси
+
+HEALTH_ALPHA = 0.2          # вес последнего исхода в оценке здоровья
+COOLDOWN_SECONDS = 5.0      # пауза выхода после ошибки соединения, растёт вдвое подряд
+MAX_COOLDOWN_SECONDS = 120.0
+
+
+def proxy_label(url: str | None) -> str:
+    """Имя выхода для логов и метрик — без логина/пароля."""
+    if not url or url == DIRECT:
+        return DIRECT
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.hostname}:{parts.port}" if parts.port else f"{parts.scheme}://{parts.hostname}"
+
+
+class EgressProxy:
+    """
+    Один выход в интернет для каталога: прокси (http/socks4/socks5 через
+    aiohttp_socks) или direct.
+
+    У каждого выхода свой адаптивный лимитер на хост и свои предохранители:
+    антибот WB считает запросы по IP, поэтому темп и блокировки — на выход,
+    а не на хост целиком. health — скользящее среднее исходов (1 — успех).
+    """
+
+    def __init__(self, url: str | None):
+        self.url = None if url in (None, DIRECT) else url
+        self.label = proxy_label(url)
+        self.health = 1.0
+        self.inflight = 0
+        self.failures = 0
+        self.cooldown_until = 0.0
+        self._limiters: dict[str, HostRateLimiter] = {}
+        WB_PROXY_HEALTH.labels(self.label).set(self.health)
+
+    @property
+    def is_direct(self) -> bool:
+        return self.url is None
+
+    def cooling_down(self) -> bool:
+        return time.monotonic() < self.cooldown_until
+
+    def limiter(self, host: str) -> HostRateLimiter:
+        # те же числа, что у get_host_limiter: один IP — один «вежливый» клиент
+        limiter = self._limiters.get(host)
+        if limiter is None:
+            limiter = self._limiters[host] = HostRateLimiter(
+                max_concurrent=2, base_min_interval=0.5, max_min_interval=2.5,
+                scope="proxy", name=f"{self.label} {host}",
+            )
+        return limiter
+
+    def breaker(self, host: str, endpoint: str) -> CircuitBreaker:
+        return get_breaker(f"{host}@{self.label}", endpoint)
+
+    def connector(self) -> aiohttp.TCPConnector:
+        if self.is_direct:
+            return aiohttp.TCPConnector(limit=10, limit_per_host=2, ttl_dns_cache=300)
+        return ProxyConnector.from_url(self.url, limit=10, limit_per_host=2, ttl_dns_cache=300)
+
+    def record(self, outcome: str) -> None:
+        WB_PROXY_REQUESTS.labels(self.label, outcome).inc()
+        self.health = (1 - HEALTH_ALPHA) * self.health + HEALTH_ALPHA * (1.0 if outcome == OK else 0.0)
+        WB_PROXY_HEALTH.labels(self.label).set(self.health)
+
+        if outcome == OK:
+            self.failures = 0
+        elif outcome == ERROR:
+            self.failures += 1
+            pause = min(COOLDOWN_SECONDS * 2 ** (self.failures - 1), MAX_COOLDOWN_SECONDS)
+            self.cooldown_until = time.monotonic() + pause
+            logger.warning("🧦 Выход %s: ошибка соединения (%s подряд) — пауза %.0fs", self.label, self.failures, pause)
+
+
+class ProxyPool:
+    """
+    Пул выходов для страниц каталога. pick() выбирает из двух случайных
+    доступных выходов тот, у кого выше health / (1 + запросов в полёте) —
+    страницы расходятся по здоровым прокси, больной выход получает меньше.
+
+    Недоступен выход с открытым предохранителем для (хост, эндпоинт) или на
+    паузе после ошибок соединения. Если на паузе все — берём тот, чья пауза
+    кончится раньше; если у всех открыт предохранитель — CircuitOpenError.
+    """
+
+    def __init__(self, urls: list[str]):
+        self.proxies = [EgressProxy(url) for url in urls]
+        self._rnd = random.Random()
+
+    def __len__(self) -> int:
+        return len(self.proxies)
+
+    def width(self) -> int:
+        """Сколько страниц каталога имеет смысл запрашивать одновременно."""
+        return max(1, sum(1 for proxy in self.proxies if not proxy.cooling_down()))
+
+    def _available(self, host: str, endpoint: str, exclude: EgressProxy | None = None) -> list[EgressProxy]:
+        return [
+            proxy for proxy in self.proxies
+            if proxy is not exclude and not proxy.breaker(host, endpoint).is_open
+        ]
+
+    def has_alternative(self, host: str, endpoint: str, current: EgressProxy) -> bool:
+        return any(not proxy.cooling_down() for proxy in self._available(host, endpoint, exclude=current))
+
+    def pick(self, host: str, endpoint: str) -> EgressProxy:
+        candidates = self._available(host, endpoint)
+        if not candidates:
+            retry_in = min(proxy.breaker(host, endpoint).retry_in() for proxy in self.proxies)
+            raise CircuitOpenError(
+                f"{endpoint} на {host} заблокирован антиботом на всех выходах ({len(self.proxies)}), "
+                f"проба через {retry_in:.0f}s"
+            )
+
+        ready = [proxy for proxy in candidates if not proxy.cooling_down()]
+        if not ready:
+            chosen = min(candidates, key=lambda proxy: proxy.cooldown_until)
+        elif len(ready) == 1:
+            chosen = ready[0]
+        else:
+            first, second = self._rnd.sample(ready, 2)
+            chosen = max(first, second, key=lambda proxy: proxy.health / (1 + proxy.inflight))
+
+        chosen.inflight += 1
+        return chosen
+
+    @staticmethod
+    def release(proxy: EgressProxy) -> None:
+        proxy.inflight = max(0, proxy.inflight - 1)
+
+
+# общий на процесс, как лимитеры и предохранители: здоровье выходов переживает клиентов
+_pool: ProxyPool | None = None
+_pool_initialized = False
+
+
+def get_proxy_pool() -> ProxyPool | None:
+    """Пул из Config.CATALOG_PROXIES; None — прокси не настроены, каталог идёт напрямую."""
+    global _pool, _pool_initialized
+    if not _pool_initialized:
+        _pool_initialized = True
+        if Config.CATALOG_PROXIES:
+            _pool = ProxyPool(Config.CATALOG_PROXIES)
+            logger.info("🧦 Выходы каталога: %s", ", ".join(proxy.label for proxy in _pool.proxies))
+    return _pool
+
+
+def set_proxy_pool(pool: ProxyPool | None) -> None:
+    global _pool, _pool_initialized
+    _pool, _pool_initialized = pool, True
@@ -0,0 +1,127 @@
+import asyncio
+import hashlib
+import logging
+import time
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from services.quota_service import reserve_key_slot, penalize_key, relax_key
+from utils.metrics import LIMITER_WAIT_SECONDS, key_label
+
+logger = logging.getLogger(__name__)
+
+# темп Content API на токен — те же числа, что у get_key_limiter
+KEY_BASE_INTERVAL = 0.6
+KEY_MAX_INTERVAL = 6.0
+PENALTY_FACTOR = 1.6
+RELAX_FACTOR = 0.9
+
+# пауза между батчами cards/update одного токена: растёт после 429/5xx/таймаутов
+UPDATE_BASE_INTERVAL = 2.0
+UPDATE_MAX_INTERVAL = 30.0
+
+
+class QuotaManager:
+    """
+    Квоты на api_key поверх лимитеров процесса.
+
+    В одном процессе всё делает get_key_limiter, поэтому базовый менеджер ничего
+    не ждёт. Воркеры очереди ставят DbQuotaManager: слоты запросов к токену
+    бронируются в БД, и несколько процессов вместе не превышают лимит продавца.
+
+    Отдельная квота — пауза между батчами cards/update (reserve_update): её
+    держит сам менеджер, адаптивно, вместо фиксированной паузы в send_cards.
+    """
+
+    def __init__(self):
+        # api_key -> [следующий слот (monotonic), текущий интервал]
+        self._update_slots: dict[str, list[float]] = {}
+
+    async def reserve(self, api_key: str) -> None:
+        return None
+
+    async def penalize(self, api_key: str) -> None:
+        return None
+
+    async def relax(self, api_key: str) -> None:
+        return None
+
+    def _update_slot(self, api_key: str) -> list[float]:
+        slot = self._update_slots.get(api_key)
+        if slot is None:
+            slot = self._update_slots[api_key] = [0.0, UPDATE_BASE_INTERVAL]
+        return slot
+
+    async def reserve_update(self, api_key: str) -> None:
+        slot = self._update_slot(api_key)
+        now = time.monotonic()
+        wait = max(0.0, slot[0] - now)
+        slot[0] = max(slot[0], now) + slot[1]
+        LIMITER_WAIT_SECONDS.labels("update", key_label(api_key)).observe(wait)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def penalize_update(self, api_key: str) -> None:
+        slot = self._update_slot(api_key)
+        slot[1] = min(slot[1] * PENALTY_FACTOR, UPDATE_MAX_INTERVAL)
+
+    async def relax_update(self, api_key: str) -> None:
+        slot = self._update_slot(api_key)
+        slot[1] = max(slot[1] * RELAX_FACTOR, UPDATE_BASE_INTERVAL)
+
+
+class DbQuotaManager(QuotaManager):
+    def __init__(self, session_maker: async_sessionmaker):
+        super().__init__()
+        self.session_maker = session_maker
+
+    @staticmethod
+    def _hash(api_key: str) -> str:
+        return hashlib.sha1(api_key.encode()).hexdigest()
+
+    @staticmethod
+    def _update_hash(api_key: str) -> str:
+        # батчи update — своя строка api_key_quotas со своим интервалом
+        return hashlib.sha1(f"update:{api_key}".encode()).hexdigest()
+
+    async def reserve(self, api_key: str) -> None:
+        async with self.session_maker() as session:
+            wait = await reserve_key_slot(session, self._hash(api_key), KEY_BASE_INTERVAL)
+        LIMITER_WAIT_SECONDS.labels("quota", key_label(api_key)).observe(wait)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def penalize(self, api_key: str) -> None:
+        async with self.session_maker() as session:
+            await penalize_key(session, self._hash(api_key), PENALTY_FACTOR, KEY_MAX_INTERVAL)
+
+    async def relax(self, api_key: str) -> None:
+        async with self.session_maker() as session:
+            await relax_key(session, self._hash(api_key), RELAX_FACTOR, KEY_BASE_INTERVAL)
+
+    async def reserve_update(self, api_key: str) -> None:
+        async with self.session_maker() as session:
+            wait = await reserve_key_slot(session, self._update_hash(api_key), UPDATE_BASE_INTERVAL)
+        LIMITER_WAIT_SECONDS.labels("update", key_label(api_key)).observe(wait)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def penalize_update(self, api_key: str) -> None:
+        async with self.session_maker() as session:
+            await penalize_key(session, self._update_hash(api_key), PENALTY_FACTOR, UPDATE_MAX_INTERVAL)
+
+    async def relax_update(self, api_key: str) -> None:
+        async with self.session_maker() as session:
+            await relax_key(session, self._update_hash(api_key), RELAX_FACTOR, UPDATE_BASE_INTERVAL)
+
+
+_quota_manager: QuotaManager = QuotaManager()
+
+
+def get_quota_manager() -> QuotaManager:
+    return _quota_manager
+
+
+def set_quota_manager(manager: QuotaManager) -> None:
+    global _quota_manager
+    _quota_manager = manager
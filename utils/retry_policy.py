@@ -0,0 +1,209 @@
+import asyncio
+import contextvars
+import logging
+import random
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+
+from aiohttp import ClientTimeout
+
+from errors import DeadlineExceeded
+from utils.metrics import WB_RETRIES
+
+logger = logging.getLogger(__name__)
+
+# причины повторов (то же, что метка reason в wb_retries_total)
+ANTIBOT = "antibot"
+RATE_LIMITED = "429"
+TIMEOUT = "timeout"
+SERVER_ERROR = "5xx"
+
+TRANSIENT_STATUSES = (408, 425, 500, 502, 503, 504)
+
+
+class Deadline:
+    """Абсолютный срок запуска (по monotonic). Все запросы внутри запуска не живут дольше него."""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+_current_deadline: contextvars.ContextVar[Deadline | None] = contextvars.ContextVar("run_deadline", default=None)
+
+
+@contextmanager
+def deadline_scope(seconds: float | None):
+    """
+    with deadline_scope(3600): ... — срок для всех запросов к WB внутри блока
+    (в том числе в задачах, созданных из него: contextvars копируются в Task).
+    None/0 — без срока; вложенный срок не может быть позже внешнего.
+    """
+    outer = _current_deadline.get()
+    deadline = Deadline(seconds) if seconds else None
+    if outer is not None and (deadline is None or outer.expires_at < deadline.expires_at):
+        deadline = outer
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def current_deadline() -> Deadline | None:
+    return _current_deadline.get()
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Retry-After: секунды или HTTP-дата (RFC 9110). None — заголовка нет или он битый."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def retry_after_from(headers) -> float | None:
+    """Подсказка сервера о паузе: Retry-After или X-Ratelimit-Retry (Content API WB)."""
+    return parse_retry_after(headers.get("Retry-After")) or parse_retry_after(headers.get("X-Ratelimit-Retry"))
+
+
+@dataclass(frozen=True)
+class Backoff:
+    base: float
+    cap: float
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    Правила повторов: число попыток и экспоненциальный backoff с джиттером
+    на каждую причину. Причины без правила не повторяются.
+    """
+    max_attempts: int
+    rules: dict[str, Backoff] = field(default_factory=dict)
+    request_timeout: float = 40.0
+
+    def should_retry(self, reason: str) -> bool:
+        return reason in self.rules
+
+    def delay(self, reason: str, attempt: int, retry_after: float | None = None) -> float:
+        """
+        «Equal jitter»: половина экспоненты гарантированно, половина — случайно.
+        Retry-After сервера важнее расчёта, но не выше cap.
+        """
+        rule = self.rules[reason]
+        if retry_after is not None:
+            return min(retry_after, rule.cap) + random.random() * 0.5
+        exp = min(rule.cap, rule.base * 2 ** (attempt - 1))
+        return exp / 2 + random.uniform(0, exp / 2)
+
+
+def reason_for_status(status: int) -> str | None:
+    if status == 429:
+        return RATE_LIMITED
+    if status == 498:
+        return ANTIBOT
+    if status in TRANSIENT_STATUSES:
+        return SERVER_ERROR
+    return None
+
+
+class Retrier:
+    """
+    Состояние повторов одного запроса:
+
+        retry = Retrier(CONTENT_POLICY, "cards_list")
+        while True:
+            retry.check_deadline()
+            async with session.post(..., timeout=retry.timeout()) ...
+            if await retry.backoff(RATE_LIMITED, retry_after=...):
+                continue
+            ...  # повторы кончились или упрёмся в срок запуска
+
+    backoff() возвращает False, когда попытки исчерпаны или пауза не укладывается
+    в оставшийся срок запуска — тогда вызывающий отрабатывает отказ как раньше.
+    """
+
+    def __init__(self, policy: RetryPolicy, endpoint: str):
+        self.policy = policy
+        self.endpoint = endpoint
+        self.attempt = 1
+        self.deadline = current_deadline()
+
+    def check_deadline(self) -> None:
+        if self.deadline is not None and self.deadline.expired:
+            raise DeadlineExceeded(f"Истёк срок запуска ({self.deadline.seconds:.0f}s) на {self.endpoint}")
+
+    def timeout(self) -> ClientTimeout:
+        total = self.policy.request_timeout
+        if self.deadline is not None:
+            total = max(0.1, min(total, self.deadline.remaining()))
+        return ClientTimeout(total=total, connect=min(10.0, total), sock_read=min(30.0, total))
+
+    @property
+    def exhausted(self) -> bool:
+        return self.attempt >= self.policy.max_attempts
+
+    async def backoff(self, reason: str, *, retry_after: float | None = None) -> bool:
+        if not self.policy.should_retry(reason) or self.exhausted:
+            return False
+
+        delay = self.policy.delay(reason, self.attempt, retry_after)
+        if self.deadline is not None and delay >= self.deadline.remaining():
+            logger.warning("⌛ %s: пауза %.1fs не укладывается в срок запуска", self.endpoint, delay)
+            return False
+
+        WB_RETRIES.labels(self.endpoint, reason).inc()
+        logger.debug("↻ %s: %s, попытка %s/%s через %.1fs",
+                     self.endpoint, reason, self.attempt, self.policy.max_attempts, delay)
+        self.attempt += 1
+        await asyncio.sleep(delay)
+        return True
+
+    def switch(self, reason: str) -> bool:
+        """Повтор сразу через другой выход (прокси): попытка засчитывается, паузы нет."""
+        if not self.policy.should_retry(reason) or self.exhausted:
+            return False
+        WB_RETRIES.labels(self.endpoint, reason).inc()
+        logger.debug("⇄ %s: %s, попытка %s/%s через другой выход",
+                     self.endpoint, reason, self.attempt, self.policy.max_attempts)
+        self.attempt += 1
+        return True
+
+
+# каталог: антибот отдыхает дольше; сам антибот отсекает предохранитель
+CATALOG_POLICY = RetryPolicy(
+    max_attempts=8,
+    rules={
+        ANTIBOT: Backoff(base=10.0, cap=90.0),
+        RATE_LIMITED: Backoff(base=2.0, cap=60.0),
+        SERVER_ERROR: Backoff(base=2.0, cap=60.0),
+        TIMEOUT: Backoff(base=2.0, cap=60.0),
+    },
+)
+
+# Content API: лимиты по токену, 5xx и таймауты — короткие повторы
+CONTENT_POLICY = RetryPolicy(
+    max_attempts=8,
+    rules={
+        RATE_LIMITED: Backoff(base=2.0, cap=30.0),
+        SERVER_ERROR: Backoff(base=2.0, cap=30.0),
+        TIMEOUT: Backoff(base=2.0, cap=30.0),
+    },
+)
@@ -0,0 +1,169 @@
+import json
+import os
+import tempfile
+from collections import Counter
+from datetime import datetime
+from typing import Any, Iterator
+
+from openpyxl import Workbook
+
+STATUS_FLIPPED = "изменён"
+STATUS_SKIPPED = "пропущен"
+STATUS_FAILED = "ошибка"
+STATUS_NOT_SENT = "не отправлен"
+
+CARD_HEADER = ["Компания", "root", "nmID", "vendorCode", "Бренд до", "Бренд после", "Статус", "Причина"]
+BRAND_HEADER = ["Компания", "WB id поставщика", "Бренд", "wbID", "Тип", "Базовый"]
+
+
+class RunExport:
+    """
+    Итоги запуска в XLSX.
+
+    Workbook открыт в write-only режиме: каждая строка сразу уходит во временный
+    файл листа, поэтому память не растёт с числом карточек. До отправки держим
+    только компактную запись по nmID (кто ждёт результата update_cards).
+    """
+
+    def __init__(self, action: str, *, spool_rows: bool = False):
+        self.action = action
+        self.started_at = datetime.now()
+        self.counters: Counter[str] = Counter()
+        # воркер очереди XLSX не собирает: строки идут в JSON Lines на диске, а оттуда —
+        # в БД потоком (spooled_rows), так что память не растёт с числом карточек и у него
+        self._spool = tempfile.TemporaryFile("w+", encoding="utf-8") if spool_rows else None
+
+        if self._spool is None:
+            self._wb = Workbook(write_only=True)
+            self._cards = self._wb.create_sheet("Карточки")
+            self._cards.append(CARD_HEADER)
+            self._brands = self._wb.create_sheet("Бренды")
+            self._brands.append(BRAND_HEADER)
+
+        # nmID -> (company, root, vendorCode, brand_before, brand_after)
+        self._pending: dict[Any, tuple] = {}
+        self._company_names: dict[Any, str] = {}
+
+    @property
+    def rows(self) -> int:
+        return sum(self.counters.values())
+
+    def set_company_name(self, company_id: Any, name: str) -> None:
+        self._company_names[company_id] = name
+
+    def _company(self, card: dict) -> str:
+        company_id = card.get("company_id")
+        return self._company_names.get(company_id, str(company_id or ""))
+
+    def record(
+        self,
+        status: str,
+        *,
+        company: str = "",
+        root: Any = None,
+        nm_id: Any = None,
+        vendor_code: str = "",
+        brand_before: str = "",
+        brand_after: str = "",
+        reason: str = "",
+    ) -> None:
+        row = [company, root, nm_id, vendor_code, brand_before, brand_after, status, reason]
+        self.counters[status] += 1
+        if self._spool is not None:
+            self._spool.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+        else:
+            self._cards.append(row)
+
+    def spooled_rows(self) -> Iterator[list]:
+        """Строки из спула воркера — по одной, с начала файла."""
+        if self._spool is None:
+            return
+        self._spool.flush()
+        self._spool.seek(0)
+        for line in self._spool:
+            yield json.loads(line)
+
+    def close_spool(self) -> None:
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
+
+    def append_row(self, row: list) -> None:
+        """Строка, записанная воркером (run_export_rows), в отчёт бота."""
+        self._cards.append(row)
+        self.counters[row[6]] += 1
+
+    def record_card(self, card: dict, status: str, reason: str = "", *, brand_before: str | None = None) -> None:
+        brand = card.get("brand") or ""
+        self.record(
+            status,
+            company=self._company(card),
+            root=card.get("root"),
+            nm_id=card.get("nmID"),
+            vendor_code=card.get("vendorCode") or "",
+            brand_before=brand if brand_before is None else brand_before,
+            brand_after=brand,
+            reason=reason,
+        )
+
+    def mark_pending(self, card: dict, brand_before: str) -> None:
+        """Карточка идёт на отправку — статус запишем после ответа update_cards."""
+        self._pending[card.get("nmID")] = (
+            self._company(card),
+            card.get("root"),
+            card.get("vendorCode") or "",
+            brand_before,
+            card.get("brand") or "",
+        )
+
+    def record_sent(self, batch: list[dict], success: bool, reason: str = "") -> None:
+        status = STATUS_FLIPPED if success else STATUS_FAILED
+        for card in batch:
+            pending = self._pending.pop(card.get("nmID"), None)
+            if pending is None:
+                self.record_card(card, status, reason)
+                continue
+            company, root, vendor_code, before, after = pending
+            self.record(
+                status, company=company, root=root, nm_id=card.get("nmID"),
+                vendor_code=vendor_code, brand_before=before, brand_after=after, reason=reason,
+            )
+
+    def write_brand_state(self, companies: list) -> None:
+        """Текущее состояние брендов (компании должны быть загружены с brands)."""
+        for company in companies:
+            for brand in company.brands:
+                self._brands.append([
+                    company.name,
+                    company.company_id,
+                    brand.name,
+                    brand.wbID,
+                    "дневной" if brand.is_daytime else "ночной",
+                    "да" if brand.id == company.default_brand_id else "",
+                ])
+
+    def summary(self) -> str:
+        parts = [f"{status}: {count}" for status, count in self.counters.items()]
+        return ", ".join(parts) if parts else "нет карточек"
+
+    def flush_pending(self) -> None:
+        """Карточки, так и не дождавшиеся ответа update_cards, — «не отправлен»."""
+        for nm_id, (company, root, vendor_code, before, after) in list(self._pending.items()):
+            self.record(
+                STATUS_NOT_SENT, company=company, root=root, nm_id=nm_id,
+                vendor_code=vendor_code, brand_before=before, brand_after=after,
+            )
+        self._pending.clear()
+
+    def save(self) -> str:
+        """Сохраняет во временный файл и возвращает путь (удаляет вызывающий)."""
+        self.flush_pending()
+
+        fd, path = tempfile.mkstemp(prefix=f"{self.action}_", suffix=".xlsx")
+        os.close(fd)
+        self._wb.save(path)
+        return path
+
+    @property
+    def filename(self) -> str:
+        return f"{self.action}_{self.started_at:%Y-%m-%d_%H-%M}.xlsx"
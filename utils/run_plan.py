@@ -0,0 +1,60 @@
+from utils.metrics import WB_REQUEST_SECONDS
+
+# латентность по умолчанию, пока в процессе мало своих замеров, с
+DEFAULT_LATENCY = {"cards_list": 0.5, "cards_update": 2.0, "catalog": 1.0, "filters": 0.5, "cards_errors": 0.5}
+MIN_SAMPLES = 5
+
+
+def endpoint_latency(endpoint: str) -> float:
+    """Средняя латентность успешных ответов эндпоинта по метрикам процесса."""
+    total, count = 0.0, 0
+    for (name, status), child in WB_REQUEST_SECONDS._children.items():
+        if name == endpoint and status == "200":
+            total += child.sum
+            count += child.count
+    if count < MIN_SAMPLES:
+        return DEFAULT_LATENCY.get(endpoint, 1.0)
+    return total / count
+
+
+def _duration(seconds: float) -> str:
+    if seconds < 90:
+        return f"{seconds:.0f}s"
+    if seconds < 5400:
+        return f"{seconds / 60:.0f} мин"
+    return f"{seconds / 3600:.1f} ч"
+
+
+def format_plan(plan_id: int, summary: dict) -> str:
+    """Текст плана для оператора (Telegram)."""
+    action = summary["action"]
+    mode = ""
+    if action == "all_from":
+        mode = " (выходные)" if summary.get("weekend") else " (будни)"
+    totals, full = summary["totals"], summary["full_run"]
+
+    lines = [f"📋 План #{plan_id}: {action}{mode}", ""]
+    if summary.get("scope_label"):
+        lines[-1:] = [f"🎯 Отбор: {summary['scope_label']}", ""]
+    for row in summary["companies"]:
+        age = f", кэш {_duration(row['cache_age_s'])} назад" if row.get("cache_age_s") is not None else ""
+        missing = row["roots"] - row["roots_cached"]
+        lines.append(
+            f"• {row['name']}: изменится {row['changes']} карт., "
+            f"запросов {row['requests']}, ~{_duration(row['seconds'])}{age}"
+            + (f"; нет в кэше root: {missing}" if missing else "")
+        )
+
+    lines += [
+        "",
+        f"Итого изменится карточек: {totals['changes']}",
+        f"По плану: запросов {totals['requests']}, ~{_duration(totals['seconds'])}",
+        f"Обычный запуск (с загрузкой): запросов {full['requests']}, ~{_duration(full['seconds'])}",
+    ]
+    if summary.get("history_p50") is not None:
+        lines.append(f"Прошлые запуски {action}: p50 {_duration(summary['history_p50'])}")
+    if summary.get("missing_roots"):
+        lines.append(
+            f"⚠️ root без кэша: {summary['missing_roots']} — в план не вошли; обычный запуск их загрузит"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,42 @@
+class RunScope:
+    """
+    Отбор выборочного запуска: компании и (необязательно) root в них.
+
+    Запуск идёт тем же пайплайном, что и полный, только по отобранному:
+    company_ids — какие компании грузить, company_roots — какие root читать и
+    отправлять у каждой из них (None — все). root привязан к своей компании:
+    тот же root у другой компании в отбор не попадает. Запросов к WB — по
+    размеру отбора, а не флота.
+    """
+
+    def __init__(
+        self,
+        company_ids: set[int] | None = None,
+        company_roots: dict[int, set[int]] | None = None,
+        label: str = "",
+    ):
+        self.company_roots = (
+            {company_id: set(roots) for company_id, roots in company_roots.items()}
+            if company_roots is not None else None
+        )
+        if company_ids is None and self.company_roots is not None:
+            company_ids = set(self.company_roots)
+        self.company_ids = set(company_ids) if company_ids is not None else None
+        self.label = label or "весь флот"
+
+    @property
+    def is_full(self) -> bool:
+        return self.company_ids is None and self.company_roots is None
+
+    @property
+    def roots_count(self) -> int:
+        """Пар (компания, root) в отборе."""
+        return sum(len(roots) for roots in (self.company_roots or {}).values())
+
+    def describe(self) -> str:
+        parts = [self.label]
+        if self.company_ids is not None:
+            parts.append(f"компаний {len(self.company_ids)}")
+        if self.company_roots is not None:
+            parts.append(f"root {self.roots_count}")
+        return ", ".join(parts)
@@ -0,0 +1,134 @@
+import math
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from utils.metrics import WB_REQUEST_SECONDS, WB_RETRIES
+from utils.offload import loop_lag
+
+PHASES_ALL_FROM = ("fetch", "decide", "send", "wait", "verify")
+PHASES_ALL_TO = ("prefilter", "fetch", "send")
+
+
+def _requests_total() -> int:
+    return sum(child.count for child in WB_REQUEST_SECONDS._children.values())
+
+
+def _retries_total() -> int:
+    return int(sum(child.value for child in WB_RETRIES._children.values()))
+
+
+def percentile(values: list[float], q: float) -> float | None:
+    """Перцентиль по методу nearest-rank (q в [0, 100])."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class RunStats:
+    """
+    Статистика одного запуска: длительность фаз, число запросов/повторов к WB
+    и счётчики карточек. Запросы/повторы берутся как разница счётчиков метрик
+    до и после запуска.
+    """
+
+    def __init__(self, action: str):
+        self.action = action
+        self.started_at = datetime.now(timezone.utc)
+        self.finished_at: datetime | None = None
+        self.status = "running"
+        self.error: str | None = None
+
+        self.phases: dict[str, float] = {}
+        # пик задержки event loop по фазам (если запущен loop_lag) — отзывчивость бота под нагрузкой
+        self.loop_lag: dict[str, float] = {}
+        self.cards: dict[str, int] = {"fetched": 0, "decided": 0, "sent": 0, "failed": 0}
+        # когда компания закончила последнюю работу запуска, с от старта (SLA мелких кабинетов)
+        self.companies: dict[str, float] = {}
+        self.requests = 0
+        self.retries = 0
+
+        self._started = time.perf_counter()
+        self._duration = 0.0
+        self._requests_start = _requests_total()
+        self._retries_start = _retries_total()
+        # запросы/повторы, сделанные в других процессах (воркеры очереди)
+        self._requests_extra = 0
+        self._retries_extra = 0
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        with loop_lag.window() as lag:
+            try:
+                yield
+            finally:
+                self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - started
+                if lag.samples:
+                    self.loop_lag[name] = max(self.loop_lag.get(name, 0.0), lag.peak)
+
+    def add_cards(self, kind: str, count: int) -> None:
+        self.cards[kind] = self.cards.get(kind, 0) + count
+
+    def company_done(self, name: str) -> None:
+        """Компания закончила работы фазы; итог — по последней фазе."""
+        self.companies[name] = time.perf_counter() - self._started
+
+    @property
+    def duration(self) -> float:
+        return time.perf_counter() - self._started if self.finished_at is None else self._duration
+
+    def finish(self, status: str = "ok", error: str | None = None) -> None:
+        self._duration = time.perf_counter() - self._started
+        self.finished_at = datetime.now(timezone.utc)
+        self.status = status
+        self.error = error
+        self.requests = _requests_total() - self._requests_start + self._requests_extra
+        self.retries = _retries_total() - self._retries_start + self._retries_extra
+
+    def to_dict(self) -> dict:
+        """Итоги для передачи между процессами (результат единицы очереди)."""
+        return {
+            "phases": self.phases,
+            "loop_lag": self.loop_lag,
+            "cards": self.cards,
+            "companies": self.companies,
+            "requests": self.requests,
+            "retries": self.retries,
+        }
+
+    def absorb(self, data: dict) -> None:
+        """Добавляет итоги единицы, выполненной воркером. Фазы складываются (суммарное время воркеров)."""
+        for name, seconds in (data.get("phases") or {}).items():
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+        for name, peak in (data.get("loop_lag") or {}).items():
+            self.loop_lag[name] = max(self.loop_lag.get(name, 0.0), peak)
+        for kind, count in (data.get("cards") or {}).items():
+            self.add_cards(kind, count)
+        for name, seconds in (data.get("companies") or {}).items():
+            self.companies[name] = max(self.companies.get(name, 0.0), seconds)
+        self._requests_extra += data.get("requests", 0)
+        self._retries_extra += data.get("retries", 0)
+
+    def summary(self) -> str:
+        phases = ", ".join(f"{name} {seconds:.1f}s" for name, seconds in self.phases.items())
+        text = (
+            f"{self.action}: {self.duration:.1f}s ({phases}); "
+            f"запросов {self.requests}, повторов {self.retries}; "
+            f"карточек: получено {self.cards['fetched']}, к изменению {self.cards['decided']}, "
+            f"отправлено {self.cards['sent']}, ошибок {self.cards['failed']}"
+        )
+        if self.companies:
+            slowest = max(self.companies, key=self.companies.get)
+            text += (
+                f"; компании готовы: p50 {percentile(list(self.companies.values()), 50):.1f}s, "
+                f"последняя {slowest} {self.companies[slowest]:.1f}s"
+            )
+        if self.cards.get("duplicates"):
+            text += f"; снято дублей {self.cards['duplicates']}"
+        if self.loop_lag:
+            lags = ", ".join(f"{name} {peak * 1000:.0f}ms" for name, peak in self.loop_lag.items())
+            text += f"; пик задержки loop: {lags}"
+        return text
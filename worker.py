@@ -0,0 +1,171 @@
+"""
+Воркер очереди работ: забирает единицы (компания, фаза) из work_units через
+SELECT ... FOR UPDATE SKIP LOCKED и выполняет их тем же пайплайном core.
+
+    RUN_MODE=queue python main.py                 # бот только ставит задания и собирает итоги
+    python worker.py --id host-a --concurrency 2   # воркеров сколько угодно, на любых хостах
+
+Квоты Content API на токен общие для всех воркеров (api_key_quotas в БД).
+Упавший воркер перестаёт слать heartbeat — его единицу заберёт другой.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+from datetime import datetime, timezone
+
+import core
+from config import Config, config
+from errors import AuthorizationError, DeadlineExceeded
+from models.work_queue import PHASE_APPLY, PHASE_VERIFY
+from services.work_queue_service import claim_unit, complete_unit, fail_unit, heartbeat_unit
+from utils.business_calendar import business_calendar
+from utils.log_utils import setup_logging, shutdown_logging
+from utils.metrics import start_metrics_server
+from utils.offload import loop_lag, shutdown_executor
+from utils.quota_manager import DbQuotaManager, set_quota_manager
+from utils.retry_policy import deadline_scope
+from utils.run_export import RunExport
+from utils.run_stats import RunStats
+
+logger = logging.getLogger("worker")
+
+HEARTBEAT_SECONDS = 30
+STALE_AFTER_SECONDS = 120
+
+
+async def _heartbeat(unit_id: int, worker_id: str) -> None:
+    while True:
+        await asyncio.sleep(HEARTBEAT_SECONDS)
+        async with config.AsyncSessionLocal() as session:
+            if not await heartbeat_unit(session, unit_id, worker_id):
+                logger.warning("💔 Единица %s перехвачена другим воркером", unit_id)
+                return
+
+
+def _unit_roots(unit, job) -> dict[int, set[int]] | None:
+    """Отбор root задания для компании единицы (None — все её root)."""
+    if job.root_ids is None:
+        return None
+    return {unit.company_id: set(job.root_ids.get(str(unit.company_id), []))}
+
+
+async def run_claimed(unit, job, worker_id: str) -> None:
+    export = RunExport(job.action, spool_rows=True)
+    stats = RunStats(job.action)
+
+    remaining = None
+    if job.deadline_at is not None:
+        remaining = (job.deadline_at - datetime.now(timezone.utc)).total_seconds()
+        if remaining <= 0:
+            async with config.AsyncSessionLocal() as session:
+                await fail_unit(session, unit, worker_id, "истёк срок запуска", retry=False)
+            return
+
+    logger.info("▶️ Единица %s: задание %s, %s/%s, компания %s (попытка %s)",
+                unit.id, job.id, job.action, unit.phase, unit.company_id, unit.attempts)
+    heartbeat = asyncio.create_task(_heartbeat(unit.id, worker_id))
+    try:
+        with deadline_scope(remaining):
+            errors = await core.run_unit(
+                job.action, unit.phase, unit.company_id, weekend=job.weekend, export=export, stats=stats,
+                since=job.created_at, company_roots=_unit_roots(unit, job),
+            )
+        stats.finish("ok")
+        export.flush_pending()
+        # готовность компаний — от постановки задания, а не от старта единицы
+        offset = (stats.started_at - job.created_at).total_seconds()
+        stats.companies = {name: seconds + offset for name, seconds in stats.companies.items()}
+
+        follow_up = PHASE_VERIFY if job.action == "all_from" and unit.phase == PHASE_APPLY else None
+        result = {"errors": errors or [], "stats": stats.to_dict()}
+        async with config.AsyncSessionLocal() as session:
+            saved = await complete_unit(
+                session, unit, worker_id, result, rows=export.spooled_rows(),
+                follow_up_phase=follow_up, follow_up_delay=core.VERIFY_DELAY_SECONDS,
+            )
+        if saved:
+            logger.info("✅ Единица %s готова за %.1fs", unit.id, stats.duration)
+        else:
+            logger.warning("⚠️ Единица %s уже у другого воркера — результат отброшен", unit.id)
+
+    except (AuthorizationError, DeadlineExceeded) as e:
+        # повтор не поможет: токен не тот или время запуска вышло
+        async with config.AsyncSessionLocal() as session:
+            await fail_unit(session, unit, worker_id, f"{type(e).__name__}: {e}", retry=False)
+    except Exception as e:
+        logger.exception("❌ Единица %s упала: %s", unit.id, e)
+        async with config.AsyncSessionLocal() as session:
+            await fail_unit(session, unit, worker_id, f"{type(e).__name__}: {e}")
+    finally:
+        heartbeat.cancel()
+        export.close_spool()
+
+
+async def worker_loop(worker_id: str, stop: asyncio.Event, poll_seconds: float) -> None:
+    while not stop.is_set():
+        async with config.AsyncSessionLocal() as session:
+            claimed = await claim_unit(session, worker_id, STALE_AFTER_SECONDS)
+        if claimed is None:
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        unit, job = claimed
+        await run_claimed(unit, job, worker_id)
+
+
+async def run_worker(worker_id: str, concurrency: int, poll_seconds: float, metrics_port: int) -> None:
+    set_quota_manager(DbQuotaManager(config.AsyncSessionLocal))
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        # текущие единицы доделываем, новые не берём
+        loop.add_signal_handler(sig, stop.set)
+
+    metrics_runner = None
+    if metrics_port:
+        metrics_runner = await start_metrics_server(Config.METRICS_HOST, metrics_port)
+
+    # календарь как у бота: загружен заранее и сверяется с таблицей holidays, а не живёт
+    # со старта воркера в том виде, в каком его прочитал первый is_weekend
+    await business_calendar.load(config.AsyncSessionLocal)
+    business_calendar.start_auto_refresh()
+
+    logger.info("🛠 Воркер %s запущен, параллельно единиц: %s", worker_id, concurrency)
+    loop_lag.start()
+    try:
+        await asyncio.gather(*(
+            worker_loop(f"{worker_id}/{n}", stop, poll_seconds) for n in range(concurrency)
+        ))
+    finally:
+        business_calendar.stop_auto_refresh()
+        loop_lag.stop()
+        shutdown_executor()
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        await config.engine.dispose()
+        logger.info("🛠 Воркер %s остановлен", worker_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Воркер очереди работ all_from/all_to")
+    parser.add_argument("--id", default=f"{socket.gethostname()}-{os.getpid()}")
+    parser.add_argument("--concurrency", type=int, default=1, help="единиц одновременно")
+    parser.add_argument("--poll", type=float, default=2.0, help="пауза при пустой очереди, с")
+    parser.add_argument("--metrics-port", type=int, default=0)
+    args = parser.parse_args()
+
+    setup_logging()
+    try:
+        asyncio.run(run_worker(args.id, args.concurrency, args.poll, args.metrics_port))
+    finally:
+        shutdown_logging()
+
+
+if __name__ == "__main__":
+    main()